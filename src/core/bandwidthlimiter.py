@@ -0,0 +1,96 @@
+from multiprocessing import Lock, RawArray
+import time, zlib
+
+__author__ = "C. Wilhelm"
+___license___ = "GPL v3"
+
+
+class BandwidthLimiter(object):
+	"""
+	token buckets in shared memory, so the downloads of all processes together stay below the speed limits
+	create it before the worker processes are started and pass it to them; it is used as bandwidth_limiter by youtube_dl
+	each download pays for the bytes it has read, and sleeps for as long as its bucket is in debt, which spreads the
+	traffic evenly over all downloads; the buckets only hold a fraction of a second worth of bytes, so there are no bursts
+	"""
+	MAX_HOSTS = 16
+	BURST = 0.1  # seconds of traffic that may pass without pause, also the time per block (see block_size())
+	MIN_BLOCK_SIZE = 1024
+	# each bucket is a slot of 4 doubles: host id (0 := empty, -1 := global bucket), rate in bytes/s (0 := unlimited),
+	# tokens in bytes (negative := debt), time of the last update
+	_SLOT = 4
+
+	def __init__(self, rate=0, host_rates=None):
+		self._lock = Lock()
+		self._slots = RawArray('d', self._SLOT * (1 + self.MAX_HOSTS))
+		self._slots[0] = -1
+		self._host_ids = {}  # {host: ids of host and its parent domains}, filled lazily within each process
+		self.change_rate(rate)
+		self.change_host_rates(host_rates or {})
+
+	def __getstate__(self):
+		# the cache of host ids is not shared between processes
+		state = self.__dict__.copy()
+		state["_host_ids"] = {}
+		return state
+
+	@staticmethod
+	def _host_id(host):
+		return zlib.crc32(host.lower().encode("utf-8")) + 1
+
+	def _ids_of_host(self, host):
+		""" ids of the domain names a limit for host may be given for, e.g. r1.example.com and example.com """
+		ids = self._host_ids.get(host)
+		if ids is None:
+			parts = (host or "").split(".")
+			ids = self._host_ids[host] = set(self._host_id(".".join(parts[i:])) for i in range(len(parts) - 1))
+		return ids
+
+	def _set_slot(self, num_slot, host_id, rate):
+		offset = num_slot * self._SLOT
+		self._slots[offset:offset + self._SLOT] = [host_id, max(float(rate), 0), 0, time.monotonic()]
+
+	def _buckets(self, host):
+		""" offsets of the slots that limit host, the global one first """
+		ids = self._ids_of_host(host)
+		return [offset for offset in range(0, len(self._slots), self._SLOT)
+						if self._slots[offset] == -1 or self._slots[offset] in ids]
+
+	def change_rate(self, rate):
+		""" @param rate: global limit in bytes/s, 0 := unlimited """
+		with self._lock:
+			self._set_slot(0, -1, rate)
+
+	def change_host_rates(self, host_rates):
+		""" @param host_rates: {domain name: limit in bytes/s}, applies to the domain and its subdomains """
+		if len(host_rates) > self.MAX_HOSTS:
+			raise ValueError("at most %d hosts may be limited" % self.MAX_HOSTS)
+		with self._lock:
+			for num_slot in range(1, self.MAX_HOSTS + 1):
+				self._set_slot(num_slot, 0, 0)
+			for num_slot, (host, rate) in enumerate(sorted(host_rates.items()), 1):
+				self._set_slot(num_slot, self._host_id(host), rate)
+
+	def consume(self, byte_count, host):
+		""" draw byte_count bytes from the global bucket and from that of host, and sleep while either is in debt """
+		slots = self._slots
+		wait = 0
+		with self._lock:
+			now = time.monotonic()
+			for offset in self._buckets(host):
+				rate = slots[offset + 1]
+				if rate <= 0:
+					continue
+				tokens = min(slots[offset + 2] + (now - slots[offset + 3]) * rate, rate * self.BURST) - byte_count
+				slots[offset + 2] = tokens
+				slots[offset + 3] = now
+				if tokens < 0:
+					wait = max(wait, -tokens / rate)
+		if wait > 0:
+			time.sleep(wait)
+
+	def block_size(self, host):
+		""" the number of bytes to read at once, so downloads do not sleep longer than BURST; None := unlimited """
+		rates = [self._slots[offset + 1] for offset in self._buckets(host) if self._slots[offset + 1] > 0]
+		if not rates:
+			return None
+		return max(int(min(rates) * self.BURST), self.MIN_BLOCK_SIZE)
@@ -8,9 +8,9 @@ class ClipBoardProcess(QueueProcess):
 	def __init__(self, task_queue, result_queue):
 		QueueProcess.__init__(self, task_queue, result_queue, function=self.extract)
 
-	def extract(self, url):
+	def extract(self, task_id, url):
 		# print("PLUGINS:", self.Plugins)
-		self.Plugins[0](self).extract(url)
+		self.plugin().extract(task_id, url)
 
 
 class ClipBoardPool(QueuePool):
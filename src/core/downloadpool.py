@@ -1,20 +1,55 @@
 from .poolbase import *
+from .bandwidthlimiter import BandwidthLimiter
+import json
 
 __author__ = "C. Wilhelm"
 ___license___ = "GPL v3"
 
 
 class DownloadProcess(QueueProcess):
-	def __init__(self, task_queue, result_queue):
+	def __init__(self, task_queue, result_queue, bandwidth_limiter=None):
 		QueueProcess.__init__(self, task_queue, result_queue, function=self.download)
+		self.bandwidth_limiter = bandwidth_limiter  # shared by all download processes of the pool
 
-	def download(self, url, path, filename, download_url, player_url, plugin_specific):
-		# TODO: download_url als identifier instead of URL
-		self.Plugins[0](self).download(url, path, filename, download_url, player_url, plugin_specific)
+	def download(self, task_id, url, path, filename, download_url, player_url, plugin_specific, info=None):
+		self.plugin().download(task_id, url, path, filename, download_url, player_url, plugin_specific, info)
 
 
 class DownloadPool(QueuePool):
 	Process = DownloadProcess
 
-	def add_task(self, url, path, filename, download_url, player_url, plugin_specific):
-		self.task_queue.put([url, path, filename, download_url, player_url, plugin_specific])
+	def __init__(self, callback, pool_size=1, check_intervall=0, speed_limit=0, host_speed_limits=None):
+		"""
+		@param speed_limit: limit for all downloads together in kb/s; 0 := infinite
+		@param host_speed_limits: {domain name: limit in kb/s} for the downloads from a domain and its subdomains,
+			or the same as JSON string (as stored in the settings)
+		"""
+		# must exist before the processes are started, they share its memory
+		self.bandwidth_limiter = BandwidthLimiter()
+		self.change_speed_limit(speed_limit)
+		self.change_host_speed_limits(host_speed_limits or {})
+		QueuePool.__init__(self, callback, pool_size, check_intervall)
+
+	def _start_process(self):
+		process = self.Process(self.task_queue, self.result_queue, self.bandwidth_limiter)
+		self._pool[process.name] = process
+		process.start()
+
+	def change_speed_limit(self, new_limit_in_kb):
+		try:
+			limit = float(new_limit_in_kb)
+		except (TypeError, ValueError):
+			return
+		self.bandwidth_limiter.change_rate(limit * 1024)
+
+	def change_host_speed_limits(self, new_limits_in_kb):
+		try:
+			if isinstance(new_limits_in_kb, str):
+				new_limits_in_kb = json.loads(new_limits_in_kb)
+			limits = dict((host, float(limit) * 1024) for host, limit in new_limits_in_kb.items())
+			self.bandwidth_limiter.change_host_rates(limits)
+		except (AttributeError, TypeError, ValueError) as e:
+			print("Ignoring host speed limits: %s" % e)
+
+	def add_task(self, task_id, url, path, filename, download_url, player_url, plugin_specific, info=None):
+		self.task_queue.put([task_id, url, path, filename, download_url, player_url, plugin_specific, info])
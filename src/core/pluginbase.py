@@ -19,6 +19,8 @@ class Plugin(object, metaclass=PluginMeta):
 	subclass this and put it into a python file within the plugin directory
 	the file name must contain the word "plugin" and must end with ".py"
 	check out plugins/youtubedlplugin.py for a working example
+	each process creates one object per plugin and reuses it for all of its tasks (see QueueProcess.plugin()),
+	so expensive setup may be done once in __init__() or lazily within extract() and download()
 	"""
 	implements_extract = False
 	implements_download = False
@@ -31,17 +33,20 @@ class Plugin(object, metaclass=PluginMeta):
 	def send_result(self, task_id, result_object, is_ready=False):
 		self._process.send_result(task_id, result_object, is_ready=is_ready)
 
-	def extract(self, url):
+	def extract(self, task_id, url):
 		"""
 		calls send_result() either with an <item> or <package> xml fragment (string)
+		the <item> may carry an "info" attribute with the serialized extraction result, which is passed to download()
 		if extraction process takes long time, this method shall check for self.interrupt.is_set() from time to time
-		@param url: url (string) to extract information from; used as task_id
+		@param task_id: id (string) the model knows the task by; must be passed to send_result()
+		@param url: url (string) to extract information from
 		"""
 		raise NotImplementedError
 
-	def download(self, url, path, filename, download_url, player_url, plugin_specific):
+	def download(self, task_id, url, path, filename, download_url, player_url, plugin_specific, info=None):
 		"""
-		calls send_result() with a dictionary containing the following keys: [...]
+		calls send_result() with task_id and a dictionary containing the following keys: [...]
 		an implementation of this method shall check for self.interrupt.is_set() periodically
+		@param info: "info" attribute of the <item> as set by extract(), if any; allows to skip extracting url again
 		"""
 		raise NotImplementedError
@@ -18,9 +18,19 @@ class QueueProcess(Process):
 		self.result_queue = result_queue
 		self.soft_interrupt = Event()
 		self.hard_interrupt = Event()
+		self._plugins = {}  # {plugin_class: plugin_object}, filled lazily within the worker process
 		# if daemon is true, python will handle termination of the process
 		self.daemon = False
 
+	def plugin(self, plugin_class=None):
+		""" return the plugin object that stays alive as long as this process, so it may keep warm caches """
+		if plugin_class is None:
+			plugin_class = self.Plugins[0]
+		plugin = self._plugins.get(plugin_class)
+		if plugin is None:
+			plugin = self._plugins[plugin_class] = plugin_class(self)
+		return plugin
+
 	def send_result(self, task_id, result_object, is_exception=False, is_ready=False):
 		# always send process name to inform the pool which process is responsible for the task
 		self.result_queue.put([self.name, task_id, result_object, is_exception, is_ready])
@@ -53,20 +63,41 @@ class QueueProcess(Process):
 class QueuePool(object):
 	Process = QueueProcess
 
-	def __init__(self, callback, pool_size=1, check_intervall=2):
+	def __init__(self, callback, pool_size=1, check_intervall=0):
+		"""
+		@param callback: called with (task_id, result_object, is_exception, is_ready) for each result
+		@param check_intervall: seconds between polls of the result queue; 0 := deliver results as soon as they arrive
+		"""
 		self.task_queue = SimpleQueue()
 		self.result_queue = SimpleQueue()
 		self._callback = callback
 		self._pool = {}  # {process_name: process}
 		self._tasks = {}  # {task_id: process_name}
 		for _ in range(pool_size):
-			process = self.Process(self.task_queue, self.result_queue)
-			self._pool[process.name] = process
-			process.start()
-		# Check for progress periodically TODO: stop timer when queue is empty!
+			self._start_process()
+		# either get woken up by the event loop whenever a worker writes into the result pipe,
+		# or check for progress periodically (fallback for platforms where pipes can't be watched)
+		self.notifier = None
 		self.timer = QTimer()
 		self.timer.timeout.connect(self._check_for_results)
-		self.timer.start(check_intervall * 1000)
+		self.change_check_interval(check_intervall)
+
+	def _start_process(self):
+		process = self.Process(self.task_queue, self.result_queue)
+		self._pool[process.name] = process
+		process.start()
+
+	def _create_notifier(self):
+		if sys.platform == "win32":
+			# QSocketNotifier only supports sockets on windows, but the result queue is backed by a pipe
+			return None
+		try:
+			fileno = self.result_queue._reader.fileno()
+		except (AttributeError, OSError):
+			return None
+		notifier = QSocketNotifier(fileno, QSocketNotifier.Read)
+		notifier.activated.connect(self._check_for_results)
+		return notifier
 
 	def _check_for_results(self):
 		while not self.result_queue.empty():
@@ -81,10 +112,20 @@ class QueuePool(object):
 	def change_check_interval(self, new_interval_in_seconds):
 		try:
 			interval = float(new_interval_in_seconds)
-		except ValueError:
+		except (TypeError, ValueError):
 			return
 		self.timer.stop()
-		self.timer.start(interval * 1000)
+		if interval <= 0:
+			if self.notifier is None:
+				self.notifier = self._create_notifier()
+			if self.notifier is not None:
+				self.notifier.setEnabled(True)
+				self._check_for_results()  # results might have arrived before the notifier was enabled
+				return
+			interval = 0.1  # event driven delivery is not available -> poll frequently instead
+		elif self.notifier is not None:
+			self.notifier.setEnabled(False)
+		self.timer.start(int(interval * 1000))
 
 	def change_pool_size(self, new_pool_size):
 		try:
@@ -97,9 +138,7 @@ class QueuePool(object):
 				process.soft_interrupt.set()
 		else:
 			for _ in range(diff):
-				process = QueueProcess(self.task_queue, self.result_queue, function=compute)
-				self._pool[process.name] = process
-				process.start()
+				self._start_process()
 
 	def add_task(self, task_id, *params):
 		self.task_queue.put([task_id] + list(params))
@@ -132,6 +132,8 @@ class MainWindow(QMainWindow):
 		self.addToolBar(Qt.TopToolBarArea, self.toolBar)
 		self.initMenus()
 		self.initTabs()
+		# e.g. the speed limit applies to running downloads, too
+		self.settingsModel.settingChanged.connect(self.downloadView.model().applySetting)
 
 		self.loadSettings()
 		self.aboutToQuit.connect(self.writeSettings)
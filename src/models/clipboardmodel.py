@@ -1,5 +1,3 @@
-from PyQt5.QtWidgets import QComboBox
-
 from .modelbase import *
 from core.clipboardpool import ClipBoardPool
 import json
@@ -17,85 +15,98 @@ class ClipBoardModel(QueueModel):
 		self.pool = ClipBoardPool(callback=self.handleProgress)
 		main_window.aboutToQuit.connect(self.pool.shutdown)
 
-	def _init_internal_dict(self):
-		# this variant of ElementTreeModel has additional dicts to manage:
-		self.combo_boxes_format = {}  # format (=extension) combobox for each item
-		self.combo_boxes_quality = {}  # quality combobox for each item
-		QueueModel._init_internal_dict(self)
-
 	def _add_to_internal_dict(self, element, parent, num_row):
 		QueueModel._add_to_internal_dict(self, element, parent, num_row)
 		if element.tag == "item":
-			# each row gets one combobox for the extension and one for the quality options
-			format_combobox = QComboBox()  # see ComboBoxDelegate.createEditor()
-			quality_combobox = QComboBox()  # see ComboBoxDelegate.createEditor()
-			self.combo_boxes_format[element] = format_combobox
-			self.combo_boxes_quality[element] = quality_combobox
-			selected_extension = self.getSelectedExtension(element)
-			selected_quality = self.getSelectedQuality(element, selected_extension)
-			for format in element.findall("format"):
-				format_combobox.addItem(format.get("extension"))
-			for option in element.findall("format[@extension='%s']/option" % selected_extension):
-				quality_combobox.addItem(option.get("quality"))
-			format_combobox.setCurrentIndex(format_combobox.findText(selected_extension))
-			quality_combobox.setCurrentIndex(quality_combobox.findText(selected_quality))
+			# the extension and quality columns are edited with comboboxes, see ComboBoxDelegate
+			self.getSelectedQuality(element, self.getSelectedExtension(element))
 
 			# setup defaults for path and filename
-			if "path" not in element.attrib:
-				path = self.settings.value("DefaultDownloadFolder")
-				element.attrib["path"] = path
-			if "filename" not in element.attrib:
+			if element.get("path") is None:
+				element.set("path", self.settings.value("DefaultDownloadFolder"))
+			if element.get("filename") is None:
 				filename = self.settings.value("DefaultFileName")
 				# some of the template-filling will happen when an Item is moved to DownloadModel, as
 				# quality and extension will most probably change until then
 				mapping = dict(title=element.get("title"), url=element.get("url"), host=element.get("host"))
-				element.attrib["filename"] = fill_filename_template(filename, mapping)
+				element.set("filename", fill_filename_template(filename, mapping))
+
+	def flags(self, index):
+		flags = QueueModel.flags(self, index)
+		if index.column() in (8, 9) and index.internalPointer().tag == "item":
+			flags |= Qt.ItemIsEditable
+		return flags
+
+	def data(self, index, role):
+		if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+			element = index.internalPointer()
+			num_col = index.column()
+			if element.tag == 'item':
+				if num_col == 8:
+					return element.get("selected")
+				elif num_col == 9:
+					return element.format(element.get("selected")).get("selected")
+			return QueueModel.data(self, index, role)
+
+	def setData(self, index, value, role):
+		element = index.internalPointer()
+		num_col = index.column()
+		if role != Qt.EditRole or element.tag != 'item' or num_col not in (8, 9):
+			return QueueModel.setData(self, index, value, role)
+		if num_col == 8:
+			element.set("selected", value)
+			self.getSelectedQuality(element, value)  # the quality options differ from extension to extension
+		else:
+			element.format(element.get("selected")).set("selected", value)
+		self.dataChanged.emit(self.createIndex(index.row(), 8, element), self.createIndex(index.row(), 9, element))
+		return True
 
 	def getSelectedExtension(self, element):
 		format_priorities = json.loads(self.settings.value("PreferredExtensionOrder"))
 		selected_extension = element.get("selected")
 		if selected_extension is None:  # fallback1: get first found item from priority list
 			for preferred_extension in format_priorities:
-				found = element.find("format[@extension='%s']" % preferred_extension)
-				if found is not None:
-					selected_extension = found.attrib["extension"]
+				if element.format(preferred_extension) is not None:
+					selected_extension = preferred_extension
 					break
 			if selected_extension is None:  # fallback 2: get first format which got parsed from XML
-				selected_extension = element.find("format").attrib["extension"]
-			element.attrib["selected"] = selected_extension
+				selected_extension = element.formats[0].extension
+			element.set("selected", selected_extension)
 		return selected_extension
 
 	def getSelectedQuality(self, element, selected_extension):
 		quality_priorities = json.loads(self.settings.value("PreferredQualityOrder"))
-		selected_format = element.find("format[@extension='%s']" % selected_extension)
+		selected_format = element.format(selected_extension)
 		selected_quality = selected_format.get("selected")
 		if selected_quality is None:  # fallback1: get first found item from priority list
 			for preferred_quality in quality_priorities:
-				found = selected_format.find("option[@quality='%s']" % preferred_quality)
-				if found is not None:
-					selected_quality = found.attrib["quality"]
+				if selected_format.option(preferred_quality) is not None:
+					selected_quality = preferred_quality
 					break
 			if selected_quality is None:  # fallback 2: get first format which got parsed from XML
-				selected_quality = selected_format.find("option").attrib["quality"]
-			selected_format.attrib["selected"] = selected_quality
+				selected_quality = selected_format.options[0].quality
+			selected_format.set("selected", selected_quality)
 		return selected_quality
 
 	def addURL(self, url):
 		""" add URL to queue -> add temporary item that will be replaced when the information is fetched """
-		self.addElement(etree.Element('task', url=url, status="Extracting"))
+		task = queuestore.Task(url=url, status="Extracting")
+		self.addElement(task)
 		# self.pool.apply_async(func=extract_url, args=(url,))
-		self.pool.add_task(url)
+		self.pool.add_task(self.taskId(task), url)
 
-	def handleProgress(self, url, result, failed, finished):
-		task = self._root.find("task[@url='%s']" % url)
+	def handleProgress(self, task_id, result, failed, finished):
+		task = self.elementByTaskId(task_id)
+		if task is None:
+			return  # task got deleted in the GUI
 		parent, num_row = self._n[task]
-		if isinstance(result, Exception):
+		if failed or isinstance(result, Exception):
+			task.set("status", str(result))
 			index = self.createIndex(num_row, 2, task)
-			self.setData(index, str(result), Qt.EditRole)
+			self.dataChanged.emit(index, index)
 			return
 		self.removeRow(num_row)
-		element = etree.fromstring(result)
-		self.addElement(element)
+		self.addElement(queuestore.from_string(result))
 
 
 def fill_filename_template(filename, mapping):
@@ -1,5 +1,3 @@
-from PyQt5.QtWidgets import QProgressBar
-
 from .modelbase import *
 from core.downloadpool import DownloadPool
 from .clipboardmodel import fill_filename_template
@@ -11,37 +9,42 @@ ___license___ = "GPL v3"
 class DownloadModel(QueueModel):
 	def __init__(self, main_window, qsettings_object):
 		QueueModel.__init__(self, main_window, qsettings_object, "downloads.xml")
-		self.pool = DownloadPool(callback=self.handleProgress)
+		self.pool = DownloadPool(callback=self.handleProgress, speed_limit=self.settings.value("DownloadSpeedLimit", 0),
+														 host_speed_limits=self.settings.value("HostSpeedLimits", "{}"))
 		main_window.aboutToQuit.connect(self.pool.shutdown)
 
+	def applySetting(self, key, value):
+		if key == "DownloadSpeedLimit":
+			self.pool.change_speed_limit(value)
+		elif key == "HostSpeedLimits":
+			self.pool.change_host_speed_limits(value)
+
 	def _init_internal_dict(self):
 		# this variant of ElementTreeModel has additional dicts to manage:
-		self.progress_bars = {}  # progressbar for each item and package
-		self.option_elements = {}  # selected option element for easy access
+		self.progress = {}  # percentage of each item, painted by ProgressBarDelegate
 		QueueModel._init_internal_dict(self)
 
 	def _add_to_internal_dict(self, element, parent, num_row):
 		QueueModel._add_to_internal_dict(self, element, parent, num_row)
 		if element.tag == "item":
 			# TODO: check if file exists and if so, initialize percentage
-			progressbar = QProgressBar()
-			progressbar.setValue(0)
-			self.progress_bars[element] = progressbar
+			self.progress[element] = 0
 			selected_extension = element.get("selected")
 			if selected_extension is None:
-				element.attrib["status"] = "Error: No Extension selected"
+				element.set("status", "Error: No Extension selected")
 				return
-			selected_format = element.find("format[@extension='%s']" % selected_extension)
-			if selected_format is None:
-				element.attrib["status"] = "Error: No Quality selected"
+			option = element.selected_option()
+			if option is None:
+				element.set("status", "Error: No Quality selected")
 				return
-			selected_quality = selected_format.get("selected")
-			option = element.find("format[@extension='%s']/option[@quality='%s']" % (selected_extension, selected_quality))
-			self.option_elements[element] = option
 			# fill remaining filename template, extension and quality shall not change within DownloadModel
 			mapping = dict(title=element.get("title"), url=element.get("url"), host=element.get("host"),
-										 extension=selected_extension, quality=selected_quality)
-			element.attrib["filename"] = fill_filename_template(element.attrib["filename"], mapping)
+										 extension=selected_extension, quality=option.quality)
+			element.set("filename", fill_filename_template(element.get("filename"), mapping))
+
+	def _remove_from_internal_dict(self, element):
+		QueueModel._remove_from_internal_dict(self, element)
+		self.progress.pop(element, None)
 
 	def data(self, index, role):
 		if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
@@ -50,36 +53,48 @@ class DownloadModel(QueueModel):
 			num_col = index.column()
 			if element.tag == 'item':
 				if num_col == 8:
-					return element.attrib.get("selected")
+					return element.get("selected")
 				elif num_col == 9:
-					# data() is called VERY often, even when the column ain't visible -> avoid xpath queries here
-					option = self.option_elements[element]
-					return option.attrib.get("quality")
+					option = element.selected_option()
+					return option.quality if option is not None else None
+				elif num_col == 10:
+					return self.progress.get(element, 0)
 			return QueueModel.data(self, index, role)
 
 	def start(self):
-		for item in self._root.findall("item[@status='Queued']"):
-			item.attrib["status"] = "Progressing"  # TODO: self.dataChanged.emit(index, index)
-			option = self.option_elements[item]
+		for num_row, item in enumerate(self._root):
+			if item.tag != "item" or item.get("status") != "Queued":
+				continue
+			item.set("status", "Progressing")
+			index = self.createIndex(num_row, 7, item)
+			self.dataChanged.emit(index, index)
+			option = item.selected_option()
 			# self.pool.apply_async(func=download, args=args)
-			self.pool.add_task(item.get("url"), item.get("path"), item.get("filename"),
+			self.pool.add_task(self.taskId(item), item.get("url"), item.get("path"), item.get("filename"),
 												 option.get("download_url"), option.get("player_url"),
-												 option.get("plugin_specific"))
+												 option.get("plugin_specific"), item.get("info"))
 
 	def pause(self):
 		pass
 
-	def handleProgress(self, url, result_dict, failed, finished):
-		item = self._root.find("item[@url='%s']" % url)
+	def handleProgress(self, task_id, result_dict, failed, finished):
+		item = self.elementByTaskId(task_id)
 		if item is None:
 			# TODO: item might have gotten deleted in the GUI, send abort signal!
 			return
-		progressbar = self.progress_bars[item]
+		num_row = self._n[item][1]
+		if failed:  # result_dict is the error message of the process
+			item.set("status", str(result_dict))
+			index = self.createIndex(num_row, 7, item)
+			self.dataChanged.emit(index, index)
+			return
 		print(result_dict)
 		if result_dict["status"] == "downloading":
 			# TODO: Bandwidth
-			percentage = result_dict.get("downloaded_bytes", 0) / result_dict.get("total_bytes", 1) * 100
-			progressbar.setValue(percentage)
+			self.progress[item] = result_dict.get("downloaded_bytes", 0) / result_dict.get("total_bytes", 1) * 100
+			index = self.createIndex(num_row, 10, item)
+			self.dataChanged.emit(index, index)
 		elif result_dict["status"] == "finished":
-			item.attrib["status"] = "Ready"  # TODO: datachanged()
-			progressbar.setValue(100)
+			item.set("status", "Ready")
+			self.progress[item] = 100
+			self.dataChanged.emit(self.createIndex(num_row, 0, item), self.createIndex(num_row, 10, item))
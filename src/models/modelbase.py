@@ -1,6 +1,9 @@
 from PyQt5.QtCore import *
 from xml.etree import ElementTree as etree
+from . import queuestore
+from .queuejournal import QueueJournal
 import os
+import uuid
 
 __author__ = "C. Wilhelm"
 ___license___ = "GPL v3"
@@ -29,12 +32,21 @@ class ElementTreeModel(QAbstractItemModel):
 
 	def _add_to_internal_dict(self, element, parent, num_row):
 		""" override this if something shall happen with newly added elements """
-		# initially i implemented a _remove_from_internal_dict() counterpart, but that doesn't make sense since
-		# usually dozens of row-numbers must change if an element is removed -> index shall be rebuilt, then!
 		self._n[element] = (parent, num_row)
 		for num_row, child in enumerate(element):
 			self._add_to_internal_dict(child, element, num_row)
 
+	def _remove_from_internal_dict(self, element):
+		""" counterpart of _add_to_internal_dict(), override this if something shall happen with removed elements """
+		del self._n[element]
+		for child in element:
+			self._remove_from_internal_dict(child)
+
+	def _update_row_numbers(self, parent, first_row):
+		""" after rows were inserted or removed, only the siblings behind them get new row numbers """
+		for num_row in range(first_row, len(parent)):
+			self._n[parent[num_row]] = (parent, num_row)
+
 	def data(self, index, role):
 		""" data is retrieved via data(), implement setData() for data to be written! """
 		# index.internalPointer() -> internal data for requested row
@@ -89,9 +101,17 @@ class ElementTreeModel(QAbstractItemModel):
 	def mimeTypes(self):
 		return ['text/xml']
 
+	def _element_to_string(self, element):
+		""" serialization of dragged elements, override this along with _element_from_xml() """
+		return etree.tostring(element, encoding="unicode")
+
+	def _element_from_xml(self, xml_element):
+		""" counterpart of _element_to_string(), gets the parsed ElementTree element of a dropped element """
+		return xml_element
+
 	def mimeData(self, indexes):
 		elements = [index.internalPointer() for index in indexes if index.column() == 0]
-		strings = [etree.tostring(element, encoding="unicode") for element in elements]
+		strings = [self._element_to_string(element) for element in elements]
 		clipboard = "<clipboard>%s</clipboard>" % "".join(strings)
 		mimedata = QMimeData()
 		mimedata.setData('text/xml', clipboard)
@@ -101,13 +121,13 @@ class ElementTreeModel(QAbstractItemModel):
 		if "text/xml" not in mimedata.formats():
 			return False
 		parent_element = parent.internalPointer() if parent.isValid() else self._root
-		elements = list(etree.fromstring(str(mimedata.data("text/xml"))))
+		elements = [self._element_from_xml(e) for e in etree.fromstring(str(mimedata.data("text/xml")))]
 		row = len(parent_element) if row == -1 else row
 		self.beginInsertRows(parent, row, row + len(elements) - 1)
-		for element in reversed(elements):
-			parent_element.insert(row, element)
-		# the internal dict must be rebuilt, as row-numbers might have changed!
-		self._init_internal_dict()
+		parent_element[row:row] = elements
+		for num_row, element in enumerate(elements, row):
+			self._add_to_internal_dict(element, parent_element, num_row)
+		self._update_row_numbers(parent_element, row + len(elements))
 		self.endInsertRows()
 		return True
 
@@ -119,12 +139,11 @@ class ElementTreeModel(QAbstractItemModel):
 		self._remove_rows_active = True  # flag for exception in index()
 		self.beginRemoveRows(parent, row, row + count - 1)
 		self._remove_rows_active = False
-		indexes = [self.index(row + i, 0, parent) for i in range(count)]
-		elements = [index.internalPointer() for index in indexes]
+		elements = parent_element[row:row + count]
+		del parent_element[row:row + count]
 		for element in elements:
-			parent_element.remove(element)
-		# the internal dict must be rebuilt, as row-numbers have changed!
-		self._init_internal_dict()
+			self._remove_from_internal_dict(element)
+		self._update_row_numbers(parent_element, row)
 		self.endRemoveRows()
 		return True
 
@@ -194,17 +213,53 @@ class ElementTreeModel(QAbstractItemModel):
 class QueueModel(ElementTreeModel):
 	_columns = ['Filename', 'Path', 'Host', 'Description', 'Thumbnail', 'Title', 'Url',
 							'Status', 'Extension', 'Quality', 'Progress']
+	_unsaved_columns = ['Progress']  # changes of these columns are not written to the journal
 
 	def __init__(self, main_window, qsettings_object, name_of_xml_file="queue.xml"):
 		self.settings = qsettings_object
 		self.pathToXMLFile = os.path.join(QFileInfo(qsettings_object.fileName()).absolutePath(), name_of_xml_file)
-		root = etree.parse(self.pathToXMLFile).getroot() if os.path.exists(self.pathToXMLFile) else etree.Element("queue")
-		ElementTreeModel.__init__(self, root)
+		# the rows are queuestore records instead of ElementTree elements, they take a fraction of the memory
+		# changes are saved as they happen, see QueueJournal
+		self.journal = QueueJournal(self.pathToXMLFile)
+		ElementTreeModel.__init__(self, self.journal.load())
+		self.journal.attach(self)
 		main_window.aboutToQuit.connect(self.writeXML)
 
+	def _init_internal_dict(self):
+		self._tasks = {}  # {task id: task or item element}, so results of the pool are assigned without xpath queries
+		ElementTreeModel._init_internal_dict(self)
+
+	def _add_to_internal_dict(self, element, parent, num_row):
+		ElementTreeModel._add_to_internal_dict(self, element, parent, num_row)
+		if element.tag in ("task", "item"):
+			self._tasks[self.taskId(element)] = element
+
+	def _remove_from_internal_dict(self, element):
+		ElementTreeModel._remove_from_internal_dict(self, element)
+		if self._tasks.get(element.get("id")) is element:
+			del self._tasks[element.get("id")]
+
+	def taskId(self, element):
+		""" the id that identifies element in the pool, kept when the element is moved or saved """
+		task_id = element.get("id")
+		if task_id is None:
+			task_id = uuid.uuid4().hex
+			element.set("id", task_id)
+		return task_id
+
+	def elementByTaskId(self, task_id):
+		""" @return: task or item element, None if it was removed in the meantime """
+		return self._tasks.get(task_id)
+
 	def writeXML(self):
-		with open(self.pathToXMLFile, 'w') as file:
-			file.write(etree.tostring(self._root, encoding="unicode"))
+		""" the xml file is kept up to date by the journal, only its last changes remain to be written """
+		self.journal.close()
+
+	def _element_to_string(self, element):
+		return queuestore.to_string(element)
+
+	def _element_from_xml(self, xml_element):
+		return queuestore.from_element(xml_element)
 
 	def flags(self, index):
 		return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled | Qt.ItemIsDropEnabled
@@ -215,29 +270,29 @@ class QueueModel(ElementTreeModel):
 			num_col = index.column()
 			if element.tag == 'item':
 				if num_col == 0:
-					return element.attrib.get("filename")
+					return element.get("filename")
 				elif num_col == 1:
-					return element.attrib.get("path")
+					return element.get("path")
 				elif num_col == 2:
-					return element.attrib.get("host")
+					return element.get("host")
 				elif num_col == 3:
-					return element.attrib.get("description")
+					return element.get("description")
 				elif num_col == 4:
-					return element.attrib.get("thumbnail")
+					return element.get("thumbnail")
 				elif num_col == 5:
-					return element.attrib.get("title")
+					return element.get("title")
 				elif num_col == 6:
-					return element.attrib.get("url")
+					return element.get("url")
 				elif num_col == 7:
-					return element.attrib.get("status")
+					return element.get("status")
 			elif element.tag == 'package':
 				if num_col == 0:
-					return element.attrib["name"]
+					return element.get("name")
 			elif element.tag == 'task':
 				if num_col == 0:
-					return element.attrib["url"]
+					return element.get("url")
 				elif num_col == 2:
-					return element.attrib.get("status")
+					return element.get("status")
 
 	def setData(self, index, value, role):
 		if role != Qt.EditRole:
@@ -246,16 +301,16 @@ class QueueModel(ElementTreeModel):
 		num_col = index.column()
 		if element.tag == 'item':
 			if num_col == 0:
-				element.attrib["filename"] = value
+				element.set("filename", value)
 			elif num_col == 1:
-				element.attrib["path"] = value
+				element.set("path", value)
 			if num_col == 5:
-				element.attrib["title"] = value
+				element.set("title", value)
 			elif num_col == 3:
-				element.attrib["description"] = value
+				element.set("description", value)
 		elif element.tag == 'package':
 			if num_col == 0:
-				element.attrib["name"] = value
+				element.set("name", value)
 		self.dataChanged.emit(index, index)
 		return True
 
@@ -273,7 +328,7 @@ class QueueModel(ElementTreeModel):
 			element = parent_element
 			parent = parent.parent()
 			parent_element = parent.internalPointer() if parent.isValid() else self._root
-			row = list(parent_element).index(element)
+			row = self._n[element][1]
 		return ElementTreeModel.dropMimeData(self, mimedata, action, row, column, parent)
 
 
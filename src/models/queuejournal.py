@@ -0,0 +1,291 @@
+from PyQt5.QtCore import QObject, QTimer
+from . import queuestore
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+__author__ = "C. Wilhelm"
+___license___ = "GPL v3"
+
+"""
+persistence of a QueueModel as a snapshot of the queue (e.g. downloads.xml) plus a journal of the changes since
+(downloads.xml.journal), which has one json list per line:
+["snapshot", id]  first line, the journal is ignored unless the id is that of the snapshot
+["insert", path of the parent, row, [xml of the inserted records]]
+["remove", path of the parent, row, count]
+["update", path, {attribute: value}]  attribute changes, null := removed
+["clear"]
+a path is the list of row numbers from the root down to a record, for an update it may end with the index of a format
+of an item
+"""
+
+
+def record_at(root, path):
+	for row in path:
+		root = root.formats[row] if root.tag == "item" else root[row]
+	return root
+
+
+def apply(root, operation):
+	""" apply an operation of the journal to the Queue record root """
+	action = operation[0]
+	if action == "insert":
+		parent, row = record_at(root, operation[1]), operation[2]
+		parent[row:row] = [queuestore.from_string(xml) for xml in operation[3]]
+	elif action == "remove":
+		parent, row = record_at(root, operation[1]), operation[2]
+		del parent[row:row + operation[3]]
+	elif action == "update":
+		record_at(root, operation[1]).update(operation[2])
+	elif action == "clear":
+		root.clear()
+	else:
+		raise ValueError("unknown operation %s in journal" % action)
+
+
+def read(path, journal_path):
+	"""
+	@return: Queue record of the snapshot at path with the changes of the journal applied, the number of operations in
+	the journal and its size without a line that was cut off by a crash, None if the journal does not belong to the snapshot
+	"""
+	root = queuestore.load(path) if os.path.exists(path) else queuestore.Queue()
+	num_operations, size = 0, None
+	if os.path.exists(journal_path):
+		with open(journal_path, "rb") as file:
+			header = file.readline()
+			try:
+				belongs = header.endswith(b"\n") and json.loads(header.decode("utf-8")) == ["snapshot", root.get("id")]
+			except ValueError:
+				belongs = False
+			if belongs:
+				size = len(header)
+				for line in file:
+					try:
+						operation = json.loads(line.decode("utf-8")) if line.endswith(b"\n") else None
+					except ValueError:
+						operation = None
+					if operation is None:
+						break  # cut off by a crash
+					apply(root, operation)
+					num_operations += 1
+					size += len(line)
+	return root, num_operations, size
+
+
+class QueueJournal(QObject):
+	"""
+	saves the changes of a QueueModel as they happen, see the module docstring for the files
+	the changes are handed to a background thread once per FLUSH_INTERVAL, so a crash loses at most that much; when the
+	journal has grown to COMPACT_SIZE operations, the same thread replaces the snapshot with one that includes the journal
+	and starts a new journal, so neither saving nor quitting ever has to serialize the whole queue in the gui thread
+	if the writer fails (e.g. the disk is full), the changes are dropped, and the whole queue is written as a new
+	snapshot once per RECOVER_INTERVAL until that works again, and at the latest by close()
+	"""
+	FLUSH_INTERVAL = 1000  # ms
+	COMPACT_SIZE = 10000  # operations
+	RECOVER_INTERVAL = 60  # seconds
+
+	def __init__(self, path_to_xml_file):
+		QObject.__init__(self)
+		self.path = path_to_xml_file
+		self.journal_path = path_to_xml_file + ".journal"
+		self._model = None
+		self._operations = []  # lines that were not handed to the writer yet
+		self._updated = {}  # records with attribute changes since the last flush: {record: None}, ordered
+		self._writes = queue.Queue()  # lists of lines for the writer, None := stop
+		self._writer = threading.Thread(target=self._write, daemon=True)
+		self._error = None  # set by the writer when it failed, it has stopped then
+		self._last_recovery = 0
+		self._timer = QTimer(self)
+		self._timer.setInterval(self.FLUSH_INTERVAL)
+		self._timer.timeout.connect(self.flush)
+
+	def load(self):
+		""" @return: Queue record with the state of the last session, to be passed to attach() along with the model """
+		root, self._num_operations, self._journal_size = read(self.path, self.journal_path)
+		self._snapshot_id = root.get("id")
+		return root
+
+	def attach(self, model):
+		""" start saving the changes of model, a QueueModel that was created with the Queue record of load() """
+		self._model = model
+		model.rowsAboutToBeInserted.connect(self._flushUpdates)
+		model.rowsInserted.connect(self._rowsInserted)
+		model.rowsAboutToBeRemoved.connect(self._flushUpdates)
+		model.rowsRemoved.connect(self._rowsRemoved)
+		model.modelAboutToBeReset.connect(self._flushUpdates)
+		model.modelReset.connect(self._modelReset)
+		model.dataChanged.connect(self._dataChanged)
+		self._writer.start()
+		self._timer.start()
+
+	def close(self):
+		""" write the remaining changes and stop the writer """
+		self._timer.stop()
+		self.flush()
+		self._writes.put(None)
+		self._writer.join()
+		if self._error is not None:
+			self._recover()
+			self._writes.put(None)
+			self._writer.join()
+
+	def _path(self, record):
+		path = []
+		while record is not self._model._root:
+			record, num_row = self._model._n[record]
+			path.append(num_row)
+		return path[::-1]
+
+	def _parent(self, index):
+		return index.internalPointer() if index.isValid() else self._model._root
+
+	def _add(self, *operation):
+		self._operations.append(json.dumps(operation) + "\n")
+
+	def _flushUpdates(self, *args):
+		""" the updates are written before other operations, whose row numbers would not apply to them """
+		for record in self._updated:
+			if record not in self._model._n:  # removed in the meantime
+				continue
+			path = self._path(record)
+			changes = record.pop_changes()
+			if changes:
+				self._add("update", path, changes)
+			if record.tag == "item":  # e.g. the selected quality is an attribute of a format
+				for num_format, format in enumerate(record.formats):
+					changes = format.pop_changes()
+					if changes:
+						self._add("update", path + [num_format], changes)
+		self._updated.clear()
+
+	def _inserted(self, records):
+		""" @return: xml of the inserted records, changes made before are part of it and need no update """
+		strings = []
+		for record in records:
+			strings.append(queuestore.to_string(record))
+			self._discardChanges(record)
+		return strings
+
+	def _discardChanges(self, record):
+		record.pop_changes()
+		for format in getattr(record, "formats", ()):
+			format.pop_changes()
+		for child in record:
+			self._discardChanges(child)
+
+	def _rowsInserted(self, parent, first, last):
+		parent_record = self._parent(parent)
+		self._add("insert", self._path(parent_record), first, self._inserted(parent_record[first:last + 1]))
+
+	def _rowsRemoved(self, parent, first, last):
+		self._add("remove", self._path(self._parent(parent)), first, last - first + 1)
+
+	def _modelReset(self):
+		self._add("clear")
+		if len(self._model._root):
+			self._add("insert", [], 0, self._inserted(self._model._root))
+
+	def _dataChanged(self, top_left, bottom_right, roles=()):
+		if not top_left.isValid():
+			return
+		columns = self._model._columns[top_left.column():bottom_right.column() + 1]
+		if all(column in self._model._unsaved_columns for column in columns):
+			return
+		self._updated[top_left.internalPointer()] = None
+
+	def flush(self):
+		""" hand the changes to the writer thread """
+		self._flushUpdates()
+		if self._error is not None:
+			self._operations = []  # the snapshot of _recover() will contain them
+			if time.monotonic() - self._last_recovery >= self.RECOVER_INTERVAL:
+				self._recover()
+			return
+		if self._operations:
+			self._writes.put(self._operations)
+			self._operations = []
+
+	def _recover(self):
+		""" after the writer failed, write the whole queue as a new snapshot and restart the writer with a new journal """
+		self._last_recovery = time.monotonic()
+		self._writer.join()
+		try:
+			self._writeSnapshot(self._model._root)
+		except Exception:
+			self._report()
+			return
+		self._error = None
+		self._journal_size = None
+		self._writes = queue.Queue()
+		self._writer = threading.Thread(target=self._write, daemon=True)
+		self._writer.start()
+
+	def _report(self):
+		print("saving %s failed, the whole queue will be written again:\n%s" % (self.path, traceback.format_exc()))
+
+	def _openJournal(self):
+		""" continue the journal of the snapshot, start a new one if there is none """
+		if self._journal_size is None:
+			return self._newJournal()
+		file = open(self.journal_path, "r+b")
+		file.truncate(self._journal_size)  # a line cut off by a crash would spoil the following ones
+		file.seek(self._journal_size)
+		return file
+
+	def _newJournal(self):
+		file = open(self.journal_path, "wb")
+		file.write((json.dumps(["snapshot", self._snapshot_id]) + "\n").encode("utf-8"))
+		self._sync(file)
+		self._num_operations = 0
+		return file
+
+	@staticmethod
+	def _sync(file):
+		file.flush()
+		os.fsync(file.fileno())
+
+	def _write(self):
+		""" runs in the writer thread """
+		file = None
+		try:
+			file = self._openJournal()
+			while True:
+				lines = self._writes.get()
+				if lines is None:
+					break
+				file.write("".join(lines).encode("utf-8"))
+				self._sync(file)
+				self._num_operations += len(lines)
+				if self._num_operations >= self.COMPACT_SIZE:
+					file.close()
+					file = None
+					self._compact()
+					file = self._newJournal()
+		except Exception as e:
+			self._report()
+			self._error = e
+		finally:
+			if file is not None:
+				try:
+					file.close()
+				except OSError:
+					pass  # the error has been reported already
+
+	def _compact(self):
+		""" replace the snapshot with snapshot + journal, the journal is restarted by the caller """
+		self._writeSnapshot(read(self.path, self.journal_path)[0])
+
+	def _writeSnapshot(self, root):
+		self._snapshot_id = uuid.uuid4().hex
+		root.update({"id": self._snapshot_id})
+		temporary_path = self.path + ".tmp"
+		with open(temporary_path, "w", encoding="utf-8") as file:
+			queuestore.write(root, file)
+			self._sync(file)
+		# until the new journal is written, its header refers to the old snapshot, so it would be ignored after a crash
+		os.replace(temporary_path, self.path)
@@ -0,0 +1,262 @@
+from xml.etree import ElementTree as etree
+from xml.sax.saxutils import quoteattr
+import sys
+
+__author__ = "C. Wilhelm"
+___license___ = "GPL v3"
+
+"""
+compact in-memory records for the queues of ClipBoardModel and DownloadModel (see queue.xsd)
+
+each element of queue.xsd becomes a record with __slots__ instead of an ElementTree element with an attribute dict,
+and strings that repeat in most records (host, status, path, extension, quality) are interned, so all records share
+one copy of them; the records keep the part of the ElementTree API the models and views use: tag, get(), set(),
+items() and for queue and package records len(), iteration and indexing of their children
+the attributes changed by set() are remembered until pop_changes(), so the journal only has to write those
+"""
+
+
+class Record(object):
+	__slots__ = ("extra", "_changed")
+	tag = None
+	_attributes = ()  # xml attributes, in the order of queue.xsd
+	_interned = frozenset()  # attributes whose values are shared by many records
+	_known = frozenset()  # set of _attributes, see __init_subclass__()
+
+	def __init__(self, **attributes):
+		get = attributes.get
+		for key in self._attributes:
+			setattr(self, key, get(key))
+		for key in self._interned:
+			value = get(key)
+			if value is not None:
+				setattr(self, key, sys.intern(value))
+		# attributes that are not in queue.xsd (e.g. of another version) are kept, so they are written back
+		if self._known.issuperset(attributes):
+			self.extra = None
+		else:
+			self.extra = dict((key, value) for key, value in attributes.items() if key not in self._known)
+		self._changed = None  # set of the attributes changed by set() since pop_changes()
+
+	def __init_subclass__(cls):
+		cls._known = frozenset(cls._attributes)
+
+	def get(self, key, default=None):
+		if key in self._known:
+			value = getattr(self, key)
+		else:
+			value = self.extra.get(key) if self.extra else None
+		return default if value is None else value
+
+	def set(self, key, value):
+		self._assign(key, value)
+		if self._changed is None:
+			self._changed = set()
+		self._changed.add(key)
+
+	def update(self, attributes):
+		""" set the attributes without remembering them as changes """
+		for key, value in attributes.items():
+			self._assign(key, value)
+
+	def _assign(self, key, value):
+		if key not in self._known:
+			if self.extra is None:
+				self.extra = {}
+			self.extra[key] = value
+			return
+		if value is not None and key in self._interned:
+			value = sys.intern(value)
+		setattr(self, key, value)
+
+	def items(self):
+		items = [(key, getattr(self, key)) for key in self._attributes if getattr(self, key) is not None]
+		if self.extra:
+			items.extend((key, value) for key, value in self.extra.items() if value is not None)
+		return items
+
+	def pop_changes(self):
+		""" @return: {attribute: value} of the attributes changed by set() since the last call, None := removed """
+		changed, self._changed = self._changed, None
+		return dict((key, self.get(key)) for key in changed) if changed else {}
+
+	def __len__(self):
+		return 0
+
+	def __iter__(self):
+		return iter(())
+
+	def _child_elements(self):
+		return []
+
+	def to_element(self):
+		""" @return: ElementTree element as in queue.xsd """
+		element = etree.Element(self.tag, dict(self.items()))
+		element.extend(self._child_elements())
+		return element
+
+
+class Container(Record):
+	""" record whose children are rows of the models """
+	__slots__ = ("children",)
+
+	def __init__(self, children=(), **attributes):
+		Record.__init__(self, **attributes)
+		self.children = list(children)
+
+	def __len__(self):
+		return len(self.children)
+
+	def __iter__(self):
+		return iter(self.children)
+
+	def __getitem__(self, row):
+		return self.children[row]
+
+	def __setitem__(self, row, records):
+		self.children[row] = records
+
+	def __delitem__(self, row):
+		del self.children[row]
+
+	def append(self, record):
+		self.children.append(record)
+
+	def clear(self):
+		del self.children[:]
+
+	def _child_elements(self):
+		return [child.to_element() for child in self.children]
+
+
+class Queue(Container):
+	__slots__ = ("id",)
+	tag = "queue"
+	_attributes = ("id",)
+
+
+class Package(Container):
+	__slots__ = ("name",)
+	tag = "package"
+	_attributes = ("name",)
+
+
+class Task(Record):
+	__slots__ = ("id", "url", "status")
+	tag = "task"
+	_attributes = __slots__
+	_interned = frozenset(("status",))
+
+
+class Option(Record):
+	__slots__ = ("quality", "download_url", "player_url", "plugin_specific")
+	tag = "option"
+	_attributes = __slots__
+	_interned = frozenset(("quality", "plugin_specific"))
+
+
+class Format(Record):
+	__slots__ = ("extension", "selected", "options")
+	tag = "format"
+	_attributes = ("extension", "selected")
+	_interned = frozenset(_attributes)
+
+	def __init__(self, options=(), **attributes):
+		Record.__init__(self, **attributes)
+		self.options = tuple(options)
+
+	def option(self, quality):
+		""" @return: Option with quality, None if there is none """
+		for option in self.options:
+			if option.quality == quality:
+				return option
+
+	def _child_elements(self):
+		return [option.to_element() for option in self.options]
+
+
+class Item(Record):
+	__slots__ = ("id", "title", "url", "status", "host", "description", "thumbnail", "path", "filename", "selected",
+							 "info", "formats", "subtitles")
+	tag = "item"
+	_attributes = __slots__[:-2]
+	_interned = frozenset(("status", "host", "path", "selected"))
+
+	def __init__(self, formats=(), subtitles=(), **attributes):
+		Record.__init__(self, **attributes)
+		self.formats = tuple(formats)
+		self.subtitles = tuple(subtitles)  # ((language, url), ...)
+
+	def format(self, extension):
+		""" @return: Format with extension, None if there is none """
+		for format in self.formats:
+			if format.extension == extension:
+				return format
+
+	def selected_option(self):
+		""" @return: Option of the selected extension and quality, None if either is not selected """
+		format = self.format(self.selected)
+		return format.option(format.selected) if format is not None else None
+
+	def _child_elements(self):
+		subtitles = [etree.Element("subtitle", dict((k, v) for k, v in (("language", language), ("url", url)) if v))
+								 for language, url in self.subtitles]
+		return subtitles + [format.to_element() for format in self.formats]
+
+
+def from_element(element):
+	""" @return: record for an ElementTree element as in queue.xsd """
+	if element.tag == "item":
+		formats = [Format((Option(**option.attrib) for option in format.iter("option")), **format.attrib)
+							 for format in element.iter("format")]
+		subtitles = [(subtitle.get("language"), subtitle.get("url")) for subtitle in element.iter("subtitle")]
+		return Item(formats, subtitles, **element.attrib)
+	elif element.tag == "task":
+		return Task(**element.attrib)
+	elif element.tag == "package":
+		return Package(_rows(element), **element.attrib)
+	elif element.tag == "queue":
+		return Queue(_rows(element), **element.attrib)
+	raise ValueError("unexpected element <%s> in queue" % element.tag)
+
+
+def _rows(element):
+	""" @return: records for the children of a <queue> or <package> element, without elements not in queue.xsd """
+	return [record for record in map(_row, element) if record is not None]
+
+
+def _row(element):
+	if element.tag not in ("package", "task", "item"):
+		print("Ignoring unexpected element <%s> in queue" % element.tag)
+		return None
+	return from_element(element)
+
+
+def from_string(text):
+	return from_element(etree.fromstring(text))
+
+
+def to_string(record):
+	return etree.tostring(record.to_element(), encoding="unicode")
+
+
+def load(path):
+	""" @return: Queue record read from the xml file at path, one child of <queue> after another """
+	events = iter(etree.iterparse(path, events=("start", "end")))
+	event, root = next(events)
+	queue = Queue(**root.attrib)
+	for event, element in events:
+		if event == "end" and len(root) and root[0] is element:
+			record = _row(element)
+			if record is not None:
+				queue.append(record)
+			del root[0]  # the tree of the file is not kept in memory
+	return queue
+
+
+def write(queue, file):
+	""" write the Queue record into the file object as xml, one child of <queue> after another """
+	file.write("<queue%s>" % "".join(" %s=%s" % (key, quoteattr(value)) for key, value in queue.items()))
+	for record in queue:
+		file.write(to_string(record))
+	file.write("</queue>")
@@ -8,12 +8,15 @@ class SettingsModel(QAbstractTableModel):
 	Model for those items in a QSettings object, that are used in the Preferences Dialog.
 	This models sole purpose is to be able to use QDataWidgetMapper!
 	For internal purposes, the QSettings object should be used directly, instead.
+	Objects that have to apply changes immediately may connect to settingChanged(key, value).
 	"""
+	settingChanged = pyqtSignal(str, object)
 
 	_entries = OrderedDict((
 		("DefaultDownloadFolder", "Default Download Folder:"),
 		("DefaultFileName", "Default File Name:"),
 		("DownloadSpeedLimit", "Download Speed Limit:"),
+		("HostSpeedLimits", "Speed Limits per Host:"),
 		("PoolUpdateFrequency", "Update Interval:"),
 		("DownloadProcesses", "Download Processes:"),
 		("ExtractionProcesses", "Extraction Processes:"),
@@ -34,6 +37,8 @@ class SettingsModel(QAbstractTableModel):
 			self.settings.setValue("DefaultFileName", "%Title%.%extension%")
 		if "DownloadSpeedLimit" not in keys:
 			self.settings.setValue("DownloadSpeedLimit", 0)
+		if "HostSpeedLimits" not in keys:
+			self.settings.setValue("HostSpeedLimits", "{}")
 		if "PoolUpdateFrequency" not in keys:
 			self.settings.setValue("PoolUpdateFrequency", 1)
 		if "DownloadProcesses" not in keys:
@@ -61,7 +66,7 @@ class SettingsModel(QAbstractTableModel):
 			return False
 		num_col = index.column()
 		key = self._keys[num_col]
-		# print(key, value) # TODO: apply changes on the models!!!
 		self.settings.setValue(key, value)
 		self.dataChanged.emit(index, index)
+		self.settingChanged.emit(key, value)
 		return True
@@ -1,7 +1,12 @@
 from __future__ import unicode_literals, print_function
 
 from inspect import getsource
+import dis
 import io
+try:
+	import builtins
+except ImportError:  # Python 2
+	import __builtin__ as builtins
 import os
 from os.path import dirname as dirn
 import sys
@@ -14,26 +19,34 @@ lazy_extractors_filename = sys.argv[1]
 if os.path.exists(lazy_extractors_filename):
 	os.remove(lazy_extractors_filename)
 
+from youtube_dl import compat, utils
 from youtube_dl.extractor import _ALL_CLASSES
 from youtube_dl.extractor.common import InfoExtractor, SearchInfoExtractor
 
-with open('devscripts/lazy_load_template.py', 'rt') as f:
+with open(os.path.join(dirn(os.path.abspath(__file__)), 'lazy_load_template.py'), 'rt') as f:
 	module_template = f.read()
 
 module_contents = [
 	module_template + '\n' + getsource(InfoExtractor.suitable) + '\n',
-	'class LazyLoadSearchExtractor(LazyLoadExtractor):\n    pass\n']
+	'class LazyLoadSearchExtractor(LazyLoadExtractor):\n\tpass\n']
 
+# indented with tabs like the sources of InfoExtractor.suitable() overrides
 ie_template = '''
 class {name}({bases}):
-    _VALID_URL = {valid_url!r}
-    _module = '{module}'
+	_VALID_URL = {valid_url!r}
+	_module = '{module}'
+'''
+
+delegate_suitable_template = '''
+	@classmethod
+	def suitable(cls, url):
+		return cls._get_real_class().suitable(url)
 '''
 
 make_valid_template = '''
-    @classmethod
-    def _make_valid_url(cls):
-        return {valid_url!r}
+	@classmethod
+	def _make_valid_url(cls):
+		return {valid_url!r}
 '''
 
 
@@ -46,6 +59,22 @@ def get_base_name(base):
 		return base.__name__
 
 
+def global_names(code):
+	names = set(
+		i.argval for i in dis.get_instructions(code) if i.opname == 'LOAD_GLOBAL')
+	for const in code.co_consts:
+		if isinstance(const, type(code)):
+			names |= global_names(const)
+	return names
+
+
+def is_portable(func, namespace):
+	# Only copy functions that refer to nothing but what the lazy module has
+	if not hasattr(dis, 'get_instructions'):  # Python < 3.4
+		return False
+	return global_names(func.__code__) <= namespace
+
+
 def build_lazy_ie(ie, name):
 	valid_url = getattr(ie, '_VALID_URL', None)
 	s = ie_template.format(
@@ -54,7 +83,10 @@ def build_lazy_ie(ie, name):
 		valid_url=valid_url,
 		module=ie.__module__)
 	if ie.suitable.__func__ is not InfoExtractor.suitable.__func__:
-		s += '\n' + getsource(ie.suitable)
+		if is_portable(ie.suitable.__func__, lazy_namespace):
+			s += '\n' + getsource(ie.suitable)
+		else:
+			s += delegate_suitable_template
 	if hasattr(ie, '_make_valid_url'):
 		# search extractors
 		s += make_valid_template.format(valid_url=ie._make_valid_url())
@@ -83,6 +115,10 @@ while classes:
 			break
 ordered_cls.append(_ALL_CLASSES[-1])
 
+lazy_namespace = set(dir(builtins)) | set(compat.__all__) | set(
+	n for n in dir(utils) if not n.startswith('_')) | set(
+	c.__name__ for c in ordered_cls) | set(['re', 'LazyLoadExtractor', 'LazyLoadSearchExtractor'])
+
 names = []
 for ie in ordered_cls:
 	name = ie.__name__
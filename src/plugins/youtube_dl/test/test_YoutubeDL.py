@@ -11,6 +11,9 @@ import unittest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import copy
+import itertools
+import threading
+import time
 
 from test.helper import FakeYDL, assertRegexpMatches
 from youtube_dl import YoutubeDL
@@ -18,7 +21,7 @@ from youtube_dl.compat import compat_str, compat_urllib_error
 from youtube_dl.extractor import YoutubeIE
 from youtube_dl.extractor.common import InfoExtractor
 from youtube_dl.postprocessor.common import PostProcessor
-from youtube_dl.utils import ExtractorError, match_filter_func
+from youtube_dl.utils import ExtractorError, match_filter_func, WorkerPool
 
 TEST_URL = 'http://localhost/sample.mp4'
 
@@ -858,6 +861,131 @@ class TestYoutubeDL(unittest.TestCase):
 		result = get_ids({'playlist_items': '2-4,3-4,3'})
 		self.assertEqual(result, [2, 3, 4])
 
+	def test_lazy_playlist(self):
+		def make_playlist(ydl, entries):
+			def gen_entries():
+				for i in entries:
+					ydl.msgs.append('listed %d' % i)
+					yield {'id': compat_str(i), 'title': compat_str(i), 'url': TEST_URL}
+			return {
+				'_type': 'playlist',
+				'id': 'test',
+				'entries': gen_entries(),
+				'extractor': 'test:playlist',
+				'extractor_key': 'test:playlist',
+				'webpage_url': 'http://example.com',
+			}
+
+		def process(params, entries=range(1, 5), download=True):
+			ydl = YDL(dict(params, lazy_playlist=True))
+			res = ydl.process_ie_result(make_playlist(ydl, entries), download=download)
+			msgs = [msg for msg in ydl.msgs if msg.startswith(('listed', '[download] Downloading video'))]
+			return ydl, res, msgs
+
+		ydl, res, msgs = process({})
+		self.assertEqual([v['id'] for v in ydl.downloaded_info_dicts], ['1', '2', '3', '4'])
+		self.assertEqual([v['n_entries'] for v in ydl.downloaded_info_dicts], [None] * 4)
+		self.assertEqual(res['entries'], [])
+		self.assertEqual(msgs, [
+			'listed 1', '[download] Downloading video 1', 'listed 2', '[download] Downloading video 2',
+			'listed 3', '[download] Downloading video 3', 'listed 4', '[download] Downloading video 4'])
+
+		ydl, res, msgs = process({}, download=False)
+		self.assertEqual([v['id'] for v in res['entries']], ['1', '2', '3', '4'])
+
+		ydl, res, msgs = process({'playliststart': 2, 'playlistend': 3})
+		self.assertEqual([v['id'] for v in ydl.downloaded_info_dicts], ['2', '3'])
+		self.assertEqual([v['playlist_index'] for v in ydl.downloaded_info_dicts], [2, 3])
+		self.assertEqual(msgs[-1], '[download] Downloading video 2')
+
+		ydl, res, msgs = process({'playlist_items': '3,1'})
+		self.assertEqual([v['id'] for v in ydl.downloaded_info_dicts], ['3', '1'])
+		self.assertEqual([v['n_entries'] for v in ydl.downloaded_info_dicts], [2, 2])
+
+		ydl, res, msgs = process({'playlistreverse': True})
+		self.assertEqual([v['id'] for v in ydl.downloaded_info_dicts], ['4', '3', '2', '1'])
+
+		ydl, res, msgs = process({'playlistend': 3}, entries=itertools.count(1))
+		self.assertEqual([v['id'] for v in ydl.downloaded_info_dicts], ['1', '2', '3'])
+
+	def test_concurrent_extractions(self):
+		class Logger(object):
+			def __init__(self):
+				self.msgs = []
+
+			def debug(self, msg):
+				self.msgs.append(msg)
+
+			warning = error = debug
+
+		class ConcurrentYDL(YoutubeDL):
+			def __init__(self, params):
+				super(ConcurrentYDL, self).__init__(params, auto_init=False)
+				self.downloaded_info_dicts = []
+
+			def process_info(self, info_dict):
+				self.downloaded_info_dicts.append(info_dict)
+
+		extracting = threading.Semaphore(0)
+
+		class SlowIE(InfoExtractor):
+			_VALID_URL = r'slow:(?P<id>\d+)'
+
+			def _real_extract(self, url):
+				video_id = self._match_id(url)
+				self.to_screen('%s: Extracting' % video_id)
+				extracting.release()
+				# the first entries take longest, so they finish last
+				time.sleep(0.1 / int(video_id))
+				if video_id == '3':
+					raise ExtractorError('Unavailable', expected=True)
+				return _make_result([{'url': TEST_URL}], id=video_id, title=video_id)
+
+		playlist = {
+			'_type': 'playlist',
+			'id': 'test',
+			'extractor': 'test:playlist',
+			'extractor_key': 'test:playlist',
+			'webpage_url': 'http://example.com',
+		}
+
+		def get_ids(params):
+			logger = Logger()
+			params = dict(params, logger=logger, ignoreerrors=True)
+			ydl = ConcurrentYDL(params)
+			ydl.add_info_extractor(SlowIE(ydl))
+			entries = [{'_type': 'url', 'url': 'slow:%d' % i} for i in range(1, 7)]
+			ydl.process_ie_result(dict(playlist, entries=entries))
+			self.assertEqual(ydl._prefetched_extractions, {})
+			msgs = [msg for msg in logger.msgs if 'Extracting' in msg or 'ERROR' in msg]
+			return [v['id'] for v in ydl.downloaded_info_dicts], msgs
+
+		expected_msgs = [
+			'[Slow] 1: Extracting', '[Slow] 2: Extracting', '[Slow] 3: Extracting',
+			'ERROR: Unavailable', '[Slow] 4: Extracting', '[Slow] 5: Extracting',
+			'[Slow] 6: Extracting']
+		sequential = get_ids({})
+		self.assertEqual(sequential, (['1', '2', '4', '5', '6'], expected_msgs))
+		self.assertEqual(get_ids({'concurrent_extractions': 4}), sequential)
+
+		ids, msgs = get_ids({'concurrent_extractions': 2, 'playlist_items': '2,5'})
+		self.assertEqual(ids, ['2', '5'])
+		self.assertEqual(msgs, ['[Slow] 2: Extracting', '[Slow] 5: Extracting'])
+
+		# extractions run in parallel
+		logger = Logger()
+		ydl = ConcurrentYDL({'logger': logger, 'concurrent_extractions': 3})
+		ydl.add_info_extractor(SlowIE(ydl))
+		extracting = threading.Semaphore(0)
+		pool = WorkerPool(3)
+		key = ydl._prefetch_extraction(pool, {'_type': 'url', 'url': 'slow:1'})
+		self.assertEqual(key, ('Slow', 'slow:1'))
+		self.assertTrue(extracting.acquire(True))
+		pool.shutdown()
+		self.assertEqual(logger.msgs, [])
+		self.assertEqual(ydl.extract_info('slow:1', download=False)['id'], '1')
+		self.assertEqual(logger.msgs, ['[Slow] 1: Extracting'])
+
 	def test_urlopen_no_file_protocol(self):
 		# see https://github.com/rg3/youtube-dl/issues/8227
 		ydl = YDL()
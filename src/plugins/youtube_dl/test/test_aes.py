@@ -10,6 +10,7 @@ import unittest
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from youtube_dl.aes import aes_decrypt, aes_encrypt, aes_cbc_decrypt, aes_cbc_encrypt, aes_decrypt_text
+from youtube_dl.aes import aes_cbc_decrypt_bytes, aes_ctr_decrypt_bytes, key_expansion
 from youtube_dl.utils import bytes_to_intlist, intlist_to_bytes
 import base64
 
@@ -60,6 +61,33 @@ class TestAES(unittest.TestCase):
 		decrypted = (aes_decrypt_text(encrypted, password, 32))
 		self.assertEqual(decrypted, self.secret_msg)
 
+	def test_cbc_decrypt_bytes(self):
+		data = b"\x97\x92+\xe5\x0b\xc3\x18\x91ky9m&\xb3\xb5@\xe6'\xc2\x96.\xc8u\x88\xab9-[\x9e|\xf1\xcd"
+		decrypted = aes_cbc_decrypt_bytes(data, intlist_to_bytes(self.key), intlist_to_bytes(self.iv))
+		self.assertEqual(decrypted.rstrip(b'\x08'), self.secret_msg)
+
+		# more blocks than are decrypted at once
+		key = list(range(32))
+		msg = bytes_to_intlist(b'0123456789abcdef' * 5000 + b'tail')
+		encrypted = intlist_to_bytes(aes_cbc_encrypt(msg, key, self.iv))
+		decrypted = aes_cbc_decrypt_bytes(encrypted, intlist_to_bytes(key), intlist_to_bytes(self.iv))
+		self.assertEqual(decrypted[:len(msg)], intlist_to_bytes(msg))
+		self.assertEqual(decrypted[len(msg):], b'\x0c' * 12)
+
+	def test_ctr_decrypt_bytes(self):
+		key = intlist_to_bytes(self.key)
+		msg = b'0123456789abcdef' * 5000 + b'tail'
+		counter = b'\0' * 8 + b'\xff' * 8
+		encrypted = aes_ctr_decrypt_bytes(msg, key, counter)
+		self.assertNotEqual(encrypted, msg)
+		self.assertEqual(aes_ctr_decrypt_bytes(encrypted, key, counter), msg)
+		# the counter is carried over into the first 8 bytes
+		self.assertEqual(
+			aes_ctr_decrypt_bytes(encrypted[16:32], key, b'\0' * 7 + b'\x01' + b'\0' * 8), msg[16:32])
+		self.assertEqual(
+			intlist_to_bytes(aes_encrypt(bytes_to_intlist(counter), key_expansion(self.key))),
+			aes_ctr_decrypt_bytes(b'\0' * 16, key, counter))
+
 
 if __name__ == '__main__':
 	unittest.main()
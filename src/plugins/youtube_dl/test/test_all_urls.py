@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from test.helper import gettestcases
 
 from youtube_dl.extractor import (
+	ExtractorIndex,
 	FacebookIE,
 	gen_extractors,
 	YoutubeIE,
@@ -101,6 +102,17 @@ class TestAllURLsMatching(unittest.TestCase):
 						ie.suitable(url),
 						'%s should not match URL %r . That URL belongs to %s.' % (type(ie).__name__, url, tc['name']))
 
+	def test_extractor_index(self):
+		index = ExtractorIndex(self.ies)
+		for tc in gettestcases(include_onlymatching=True):
+			for url in (tc['url'], tc['url'].upper(), 'http://example.com/?url=' + tc['url']):
+				candidates = index.candidates(url)
+				self.assertEqual(
+					[ie for ie in candidates if ie.suitable(url)][:1],
+					[ie for ie in self.ies if ie.suitable(url)][:1],
+					'index gives another extractor for URL %r' % url)
+				self.assertEqual(type(candidates[-1]).__name__, 'GenericIE')
+
 	def test_keywords(self):
 		self.assertMatch(':ytsubs', ['youtube:subscriptions'])
 		self.assertMatch(':ytsubscriptions', ['youtube:subscriptions'])
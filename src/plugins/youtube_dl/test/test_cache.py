@@ -6,6 +6,7 @@ from __future__ import unicode_literals
 import shutil
 
 # Allow direct execution
+import io
 import os
 import sys
 import unittest
@@ -14,6 +15,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from test.helper import FakeYDL
 from youtube_dl.cache import Cache
+from youtube_dl.utils import sqlite3
 
 
 def _is_empty(d):
@@ -54,6 +56,86 @@ class TestCache(unittest.TestCase):
 		self.assertFalse(os.path.exists(self.test_dir))
 		self.assertEqual(c.load('test_cache', 'k.'), None)
 
+	def test_shared_cache(self):
+		ydl = FakeYDL({
+			'cachedir': self.test_dir,
+		})
+		c1, c2 = Cache(ydl), Cache(ydl)
+		c1.store('test_cache', 'k', [1, 2])
+		self.assertEqual(c2.load('test_cache', 'k'), [1, 2])
+		# loaded entries are kept in memory, and can not be modified there
+		c2.load('test_cache', 'k').append(3)
+		c1.store('test_cache', 'k', [4])
+		self.assertEqual(c2.load('test_cache', 'k'), [1, 2])
+		self.assertEqual(Cache(ydl).load('test_cache', 'k'), [4])
+
+	def test_expiry_and_eviction(self):
+		ydl = FakeYDL({
+			'cachedir': self.test_dir,
+		})
+		c = Cache(ydl)
+		c.SECTION_TTL = {'expiring': 60}
+		c.MAX_SIZE = 12
+		c.store('expiring', 'k', 1)
+		c._db.execute('UPDATE cache SET stored = stored - 120')
+		c._memory.clear()
+		self.assertEqual(c.load('expiring', 'k'), None)
+
+		for key in ('a', 'b', 'c'):
+			c.store('test_cache', key, '12')
+		self.assertEqual(Cache(ydl).load('test_cache', 'a'), '12')
+		c.store('test_cache', 'd', '12')
+		self.assertEqual(
+			sorted(key for key, in c._db.execute('SELECT key FROM cache')), ['a', 'c', 'd'])
+		self.assertEqual(c.load('test_cache', 'b'), None)
+
+	def test_migration(self):
+		_mkdir(self.test_dir)
+		_mkdir(os.path.join(self.test_dir, 'test_cache'))
+		with io.open(os.path.join(self.test_dir, 'test_cache', 'k.json'), 'w', encoding='utf-8') as f:
+			f.write('{"x": "\\u00e4"}')
+		ydl = FakeYDL({
+			'cachedir': self.test_dir,
+		})
+		self.assertEqual(Cache(ydl).load('test_cache', 'k'), {'x': 'ä'})
+		self.assertEqual(os.listdir(self.test_dir), ['cache.sqlite'] + [
+			fn for fn in os.listdir(self.test_dir) if fn.startswith('cache.sqlite-')])
+		self.assertEqual(Cache(ydl).load('test_cache', 'k'), {'x': 'ä'})
+
+	def test_failed_migration(self):
+		class LockedCache(Cache):
+			def _migrate_json_files(self, root_dir):
+				raise sqlite3.OperationalError('database is locked')
+
+		_mkdir(self.test_dir)
+		_mkdir(os.path.join(self.test_dir, 'test_cache'))
+		with io.open(os.path.join(self.test_dir, 'test_cache', 'k.json'), 'w', encoding='utf-8') as f:
+			f.write('{"x": 1}')
+		warnings = []
+		ydl = FakeYDL({
+			'cachedir': self.test_dir,
+		})
+		ydl.report_warning = warnings.append
+		c = LockedCache(ydl)
+		# the cache is used without the files that could not be moved
+		self.assertEqual(c.load('test_cache', 'k'), None)
+		self.assertEqual(len(warnings), 1)
+		c.store('test_cache', 'k2', [1])
+		c._memory.clear()
+		self.assertEqual(c.load('test_cache', 'k2'), [1])
+		self.assertEqual(Cache(ydl).load('test_cache', 'k'), {'x': 1})
+
+	def test_without_sqlite(self):
+		ydl = FakeYDL({
+			'cachedir': self.test_dir,
+		})
+		c = Cache(ydl)
+		c._db_failed = True
+		c.store('test_cache', 'k', {'x': 1})
+		self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'test_cache', 'k.json')))
+		c._memory.clear()
+		self.assertEqual(c.load('test_cache', 'k'), {'x': 1})
+
 
 if __name__ == '__main__':
 	unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+from __future__ import unicode_literals
+
+import shutil
+
+# Allow direct execution
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test.helper import FakeYDL
+from youtube_dl import utils
+from youtube_dl.utils import DownloadArchive
+
+
+class TestDownloadArchive(unittest.TestCase):
+	def setUp(self):
+		TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+		self.test_dir = os.path.join(TEST_DIR, 'testdata', 'archive_test')
+		self.tearDown()
+		os.makedirs(self.test_dir)
+		self.filename = os.path.join(self.test_dir, 'archive.txt')
+		self.archives = []
+
+	def tearDown(self):
+		for archive in getattr(self, 'archives', []):
+			archive.close()
+		if os.path.exists(self.test_dir):
+			shutil.rmtree(self.test_dir)
+
+	def archive(self):
+		archive = DownloadArchive(self.filename)
+		self.archives.append(archive)
+		return archive
+
+	def append(self, *lines):
+		with io.open(self.filename, 'a', encoding='utf-8') as f:
+			f.write(''.join(line + '\n' for line in lines))
+
+	def read(self):
+		with io.open(self.filename, encoding='utf-8') as f:
+			return f.read()
+
+	def test_archive(self):
+		self.append('youtube abc', 'vimeo 123')
+		archive = self.archive()
+		self.assertTrue('youtube abc' in archive)
+		self.assertTrue('vimeo 123' in archive)
+		self.assertFalse('youtube xyz' in archive)
+		archive.add('youtube xyz')
+		self.assertTrue('youtube xyz' in archive)
+		self.assertEqual(self.read(), 'youtube abc\nvimeo 123\nyoutube xyz\n')
+		self.assertTrue(os.path.exists(self.filename + '.sqlite'))
+
+	def test_missing_file(self):
+		archive = self.archive()
+		self.assertFalse('youtube abc' in archive)
+		archive.add('youtube abc')
+		self.assertTrue('youtube abc' in archive)
+		self.assertEqual(self.read(), 'youtube abc\n')
+
+	def test_shared(self):
+		first, second = self.archive(), self.archive()
+		self.assertFalse('youtube abc' in second)
+		first.add('youtube abc')
+		self.assertTrue('youtube abc' in second)
+		# appended by other programs
+		self.append('vimeo 123', 'vimeo 456')
+		self.assertTrue('vimeo 456' in first)
+		self.assertTrue('vimeo 123' in self.archive())
+
+	def test_partial_line(self):
+		archive = self.archive()
+		with io.open(self.filename, 'a', encoding='utf-8') as f:
+			f.write('youtube ab')
+		self.assertFalse('youtube ab' in archive)
+		with io.open(self.filename, 'a', encoding='utf-8') as f:
+			f.write('c\n')
+		self.assertTrue('youtube abc' in archive)
+		self.assertFalse('youtube ab' in archive)
+
+	def test_rewritten_file(self):
+		self.append('youtube abc', 'vimeo 123')
+		archive = self.archive()
+		self.assertTrue('youtube abc' in archive)
+		os.remove(self.filename)
+		self.append('vimeo 456')
+		self.assertFalse('youtube abc' in archive)
+		self.assertTrue('vimeo 456' in archive)
+
+	def test_without_sqlite(self):
+		sqlite3 = utils.sqlite3
+		utils.sqlite3 = None
+		try:
+			self.append('youtube abc')
+			archive = self.archive()
+			self.assertTrue('youtube abc' in archive)
+			archive.add('vimeo 123')
+			self.append('vimeo 456')
+			self.assertTrue('vimeo 123' in archive)
+			self.assertTrue('vimeo 456' in archive)
+			self.assertFalse(os.path.exists(self.filename + '.sqlite'))
+		finally:
+			utils.sqlite3 = sqlite3
+
+	def test_readonly_index(self):
+		self.append('youtube abc')
+		self.archive().close()
+		self.append('vimeo 123')
+		archive = self.archive()
+		archive._db.close()
+		archive._db = utils.sqlite3.connect(
+			'file:%s?mode=ro' % (self.filename + '.sqlite'), uri=True, check_same_thread=False)
+		# the lines that are not indexed yet can not be written to the index
+		self.assertTrue('vimeo 123' in archive)
+		self.assertTrue('youtube abc' in archive)
+		self.assertTrue(archive._db is None)
+		archive.add('vimeo 456')
+		self.assertTrue('vimeo 456' in archive)
+
+		archive = self.archive()
+		archive._db.close()
+		archive._db = utils.sqlite3.connect(
+			'file:%s?mode=ro' % (self.filename + '.sqlite'), uri=True, check_same_thread=False)
+		# already synchronized, so only the insert of add() fails
+		archive._file_state = archive._stat()
+		archive.add('vimeo 789')
+		self.assertTrue(archive._db is None)
+		self.assertTrue('vimeo 789' in archive)
+		self.assertTrue('youtube abc' in archive)
+
+	def test_youtubedl(self):
+		ydl = FakeYDL({'download_archive': self.filename})
+		info = {'id': 'abc', 'extractor_key': 'Youtube'}
+		self.assertFalse(ydl.in_download_archive(info))
+		ydl.record_download_archive(info)
+		self.assertTrue(ydl.in_download_archive(info))
+		self.assertEqual(self.read(), 'youtube abc\n')
+		self.archives.append(ydl._download_archive)
+
+
+if __name__ == '__main__':
+	unittest.main()
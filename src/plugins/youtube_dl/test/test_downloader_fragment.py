@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import unicode_literals
+
+# Allow direct execution
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from test.helper import http_server_port, try_rm
+from youtube_dl import YoutubeDL
+from youtube_dl.aes import aes_cbc_encrypt
+from youtube_dl.compat import compat_http_server, compat_struct_pack
+from youtube_dl.downloader.dash import DashSegmentsFD
+from youtube_dl.downloader.hls import HlsFD
+from youtube_dl.utils import (
+	bytes_to_intlist,
+	DownloadError,
+	encodeFilename,
+	intlist_to_bytes,
+)
+import threading
+
+FRAGMENT_COUNT = 20
+FRAGMENT_SIZE = 512
+
+
+def fragment_content(i):
+	return ('%04d' % i).encode('ascii') * (FRAGMENT_SIZE // 4)
+
+
+EXPECTED_CONTENT = b''.join(fragment_content(i) for i in range(FRAGMENT_COUNT))
+
+
+def fragment_key(i):
+	# the second half of the fragments is encrypted with another key
+	return [i // (FRAGMENT_COUNT // 2)] * 16
+
+
+class HTTPTestRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+	def log_message(self, format, *args):
+		pass
+
+	def send_body(self, body, content_type='video/MP2T'):
+		self.send_response(200)
+		self.send_header('Content-Type', content_type)
+		self.send_header('Content-Length', len(body))
+		self.end_headers()
+		self.wfile.write(body)
+
+	key_requests = []
+	live_requests = []
+
+	def do_GET(self):
+		if self.path == '/index.m3u8':
+			lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+			for i in range(FRAGMENT_COUNT):
+				lines.extend(['#EXTINF:2.0,', 'frag/%d' % i])
+			lines.append('#EXT-X-ENDLIST')
+			self.send_body('\n'.join(lines).encode('utf-8'), 'application/vnd.apple.mpegurl')
+		elif self.path == '/byterange.m3u8':
+			lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+			for i in range(FRAGMENT_COUNT):
+				lines.append('#EXTINF:2.0,')
+				if i == 0:
+					lines.append('#EXT-X-BYTERANGE:%d@0' % FRAGMENT_SIZE)
+				else:
+					lines.append('#EXT-X-BYTERANGE:%d' % FRAGMENT_SIZE)
+				lines.append('media')
+			lines.append('#EXT-X-ENDLIST')
+			self.send_body('\n'.join(lines).encode('utf-8'), 'application/vnd.apple.mpegurl')
+		elif self.path == '/encrypted.m3u8':
+			lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:2', '#EXT-X-MEDIA-SEQUENCE:0']
+			for i in range(FRAGMENT_COUNT):
+				if i % (FRAGMENT_COUNT // 2) == 0:
+					lines.append('#EXT-X-KEY:METHOD=AES-128,URI="key/%d"' % fragment_key(i)[0])
+				lines.extend(['#EXTINF:2.0,', 'enc/%d' % i])
+			lines.append('#EXT-X-ENDLIST')
+			self.send_body('\n'.join(lines).encode('utf-8'), 'application/vnd.apple.mpegurl')
+		elif self.path == '/live.m3u8':
+			# a window of 4 fragments, which moves on by 2 fragments with each request
+			end = min(2 * len(self.live_requests) + 4, FRAGMENT_COUNT)
+			self.live_requests.append(self.path)
+			lines = ['#EXTM3U', '#EXT-X-TARGETDURATION:0.05', '#EXT-X-MEDIA-SEQUENCE:%d' % max(end - 4, 0)]
+			for i in range(max(end - 4, 0), end):
+				lines.extend(['#EXTINF:0.05,', 'frag/%d' % i])
+			if end == FRAGMENT_COUNT:
+				lines.append('#EXT-X-ENDLIST')
+			self.send_body('\n'.join(lines).encode('utf-8'), 'application/vnd.apple.mpegurl')
+		elif self.path.startswith('/key/'):
+			self.key_requests.append(self.path)
+			self.send_body(intlist_to_bytes([int(self.path[5:])] * 16), 'application/octet-stream')
+		elif self.path.startswith('/enc/'):
+			time.sleep(random.random() * 0.02)
+			i = int(self.path[5:])
+			# without an IV attribute, the media sequence number is the IV
+			iv = bytes_to_intlist(compat_struct_pack('>8xq', i))
+			self.send_body(intlist_to_bytes(aes_cbc_encrypt(
+				bytes_to_intlist(fragment_content(i)), fragment_key(i), iv)))
+		elif self.path.startswith('/missing/'):
+			self.send_response(404)
+			self.end_headers()
+		elif self.path.startswith('/frag/'):
+			# finish fragments in random order to exercise the reorder buffer
+			time.sleep(random.random() * 0.02)
+			self.send_body(fragment_content(int(self.path[6:])))
+		elif self.path == '/media':
+			mobj = re.match(r'^bytes=(\d+)-(\d+)$', self.headers.get('Range', ''))
+			assert mobj
+			start, end = int(mobj.group(1)), int(mobj.group(2))
+			self.send_body(EXPECTED_CONTENT[start:end + 1])
+		else:
+			assert False
+
+
+class FakeLogger(object):
+	def debug(self, msg):
+		pass
+
+	def warning(self, msg):
+		pass
+
+	def error(self, msg):
+		pass
+
+
+class FragmentTestCase(unittest.TestCase):
+	filename = 'testfile.ts'
+
+	def setUp(self):
+		self.httpd = compat_http_server.HTTPServer(
+			('127.0.0.1', 0), HTTPTestRequestHandler)
+		self.port = http_server_port(self.httpd)
+		self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+		self.server_thread.daemon = True
+		self.server_thread.start()
+		self.cleanup()
+
+	def tearDown(self):
+		self.cleanup()
+
+	def cleanup(self):
+		for filename in (self.filename, self.filename + '.part', self.filename + '.ytdl'):
+			try_rm(encodeFilename(filename))
+		for filename in self.fragment_files():
+			try_rm(encodeFilename(filename))
+
+	def fragment_files(self):
+		return [f for f in os.listdir('.') if f.startswith(self.filename + '.part-Frag')]
+
+	def url(self, ep):
+		return 'http://127.0.0.1:%d/%s' % (self.port, ep)
+
+	def read_result(self):
+		with open(encodeFilename(self.filename), 'rb') as f:
+			return f.read()
+
+
+class TestHlsFD(FragmentTestCase):
+	def download(self, params, ep, is_live=False):
+		params['logger'] = FakeLogger()
+		ydl = YoutubeDL(params)
+		downloader = HlsFD(ydl, params)
+		self.assertTrue(downloader.real_download(self.filename, {
+			'url': self.url(ep),
+			'is_live': is_live,
+		}))
+		return self.read_result()
+
+	def test_sequential(self):
+		self.assertEqual(self.download({}, 'index.m3u8'), EXPECTED_CONTENT)
+
+	def test_concurrent(self):
+		content = self.download({'concurrent_fragment_downloads': 4}, 'index.m3u8')
+		self.assertEqual(content, EXPECTED_CONTENT)
+
+	def test_byterange(self):
+		for concurrency in (1, 4):
+			content = self.download({'concurrent_fragment_downloads': concurrency}, 'byterange.m3u8')
+			self.assertEqual(content, EXPECTED_CONTENT)
+			self.cleanup()
+
+	def test_resume(self):
+		resumed_frags = 7
+		with open(encodeFilename(self.filename + '.part'), 'wb') as f:
+			f.write(EXPECTED_CONTENT[:resumed_frags * FRAGMENT_SIZE])
+		with io.open(encodeFilename(self.filename + '.ytdl'), 'w', encoding='utf-8') as f:
+			f.write(json.dumps({'downloader': {'current_fragment': {'index': resumed_frags}}}))
+		content = self.download({'concurrent_fragment_downloads': 4}, 'index.m3u8')
+		self.assertEqual(content, EXPECTED_CONTENT)
+		self.assertFalse(os.path.exists(encodeFilename(self.filename + '.ytdl')))
+
+	def test_encrypted(self):
+		for concurrency in (1, 4):
+			del HTTPTestRequestHandler.key_requests[:]
+			content = self.download({'concurrent_fragment_downloads': concurrency}, 'encrypted.m3u8')
+			self.assertEqual(content, EXPECTED_CONTENT)
+			self.assertEqual(sorted(HTTPTestRequestHandler.key_requests), ['/key/0', '/key/1'])
+			self.cleanup()
+
+	def test_live(self):
+		for concurrency in (1, 4):
+			del HTTPTestRequestHandler.live_requests[:]
+			content = self.download({'concurrent_fragment_downloads': concurrency}, 'live.m3u8', is_live=True)
+			self.assertEqual(content, EXPECTED_CONTENT)
+			self.assertEqual(len(HTTPTestRequestHandler.live_requests), FRAGMENT_COUNT // 2 - 1)
+			self.cleanup()
+
+	def test_keep_fragments(self):
+		for concurrency in (1, 4):
+			content = self.download({'concurrent_fragment_downloads': concurrency}, 'index.m3u8')
+			self.assertEqual(content, EXPECTED_CONTENT)
+			self.assertEqual(self.fragment_files(), [])
+			content = self.download({
+				'concurrent_fragment_downloads': concurrency,
+				'keep_fragments': True,
+			}, 'index.m3u8')
+			self.assertEqual(content, EXPECTED_CONTENT)
+			self.assertEqual(len(self.fragment_files()), FRAGMENT_COUNT)
+			self.cleanup()
+
+
+class TestDashSegmentsFD(FragmentTestCase):
+	filename = 'testfile.mp4'
+
+	def download(self, params, fragments):
+		params.update({
+			'logger': FakeLogger(),
+			'fragment_retries': 1,
+		})
+		ydl = YoutubeDL(params)
+		downloader = DashSegmentsFD(ydl, params)
+		return downloader.real_download(self.filename, {
+			'url': self.url('manifest.mpd'),
+			'fragment_base_url': self.url(''),
+			'fragments': [{'path': path} for path in fragments],
+		})
+
+	def test_concurrent(self):
+		fragments = ['frag/%d' % i for i in range(FRAGMENT_COUNT)]
+		self.assertTrue(self.download({'concurrent_fragment_downloads': 4}, fragments))
+		self.assertEqual(self.read_result(), EXPECTED_CONTENT)
+
+	def test_skip_unavailable(self):
+		fragments = ['frag/%d' % i for i in range(FRAGMENT_COUNT)]
+		fragments[5] = 'missing/5'
+		for concurrency in (1, 4):
+			self.assertTrue(self.download({'concurrent_fragment_downloads': concurrency}, fragments))
+			self.assertEqual(
+				self.read_result(),
+				EXPECTED_CONTENT[:5 * FRAGMENT_SIZE] + EXPECTED_CONTENT[6 * FRAGMENT_SIZE:])
+			self.cleanup()
+
+	def test_first_fragment_is_fatal(self):
+		fragments = ['missing/0'] + ['frag/%d' % i for i in range(1, FRAGMENT_COUNT)]
+		for concurrency in (1, 4):
+			self.assertRaises(
+				DownloadError, self.download, {'concurrent_fragment_downloads': concurrency}, fragments)
+			self.cleanup()
+
+
+if __name__ == '__main__':
+	unittest.main()
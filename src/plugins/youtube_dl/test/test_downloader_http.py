@@ -3,6 +3,8 @@
 from __future__ import unicode_literals
 
 # Allow direct execution
+import io
+import json
 import os
 import re
 import sys
@@ -21,6 +23,9 @@ TEST_DIR = os.path.dirname(os.path.abspath(__file__))
 
 TEST_SIZE = 10 * 1024
 
+# large enough to be split into several segments by http_connections
+SEGMENTED_CONTENT = b''.join(('%07d' % i).encode('ascii') for i in range(3 * 1024 * 1024 // 7))
+
 
 class HTTPTestRequestHandler(compat_http_server.BaseHTTPRequestHandler):
 	def log_message(self, format, *args):
@@ -53,8 +58,45 @@ class HTTPTestRequestHandler(compat_http_server.BaseHTTPRequestHandler):
 		self.end_headers()
 		self.wfile.write(b'#' * size)
 
+	def serve_segmented(self):
+		content = SEGMENTED_CONTENT
+		status = 200
+		range_header = self.headers.get('Range')
+		if range_header:
+			mobj = re.search(r'^bytes=(\d+)-(\d+)?$', range_header)
+			start = int(mobj.group(1))
+			end = int(mobj.group(2)) if mobj.group(2) else len(content) - 1
+			self.server.requested_ranges.append((start, end))
+			content = content[start:end + 1]
+			status = 206
+		self.send_response(status)
+		self.send_header('Content-Type', 'video/mp4')
+		if range_header:
+			self.send_header('Content-Range', 'bytes %d-%d/%d' % (start, end, len(SEGMENTED_CONTENT)))
+		self.send_header('Content-Length', len(content))
+		self.end_headers()
+		self.wfile.write(content)
+
+	def serve_dropped_then_no_range(self):
+		# the first response breaks off in the middle, the retry ignores the Range header and sends everything
+		content = SEGMENTED_CONTENT[:TEST_SIZE]
+		self.server.dropped_requests.append(self.headers.get('Range'))
+		self.send_response(200)
+		self.send_header('Content-Type', 'video/mp4')
+		self.send_header('Content-Length', len(content))
+		self.end_headers()
+		if len(self.server.dropped_requests) == 1:
+			self.wfile.write(content[:len(content) // 2])
+			self.close_connection = True
+		else:
+			self.wfile.write(content)
+
 	def do_GET(self):
-		if self.path == '/regular':
+		if self.path == '/dropped-then-no-range':
+			self.serve_dropped_then_no_range()
+		elif self.path == '/segmented':
+			self.serve_segmented()
+		elif self.path == '/regular':
 			self.serve()
 		elif self.path == '/no-content-length':
 			self.serve(content_length=False)
@@ -81,6 +123,8 @@ class TestHttpFD(unittest.TestCase):
 	def setUp(self):
 		self.httpd = compat_http_server.HTTPServer(
 			('127.0.0.1', 0), HTTPTestRequestHandler)
+		self.httpd.requested_ranges = []
+		self.httpd.dropped_requests = []
 		self.port = http_server_port(self.httpd)
 		self.server_thread = threading.Thread(target=self.httpd.serve_forever)
 		self.server_thread.daemon = True
@@ -110,6 +154,85 @@ class TestHttpFD(unittest.TestCase):
 			'http_chunk_size': 1000,
 		})
 
+	def test_multiple_connections(self):
+		self.download_all({
+			'http_connections': 4,
+		})
+
+	def test_bandwidth_limiter(self):
+		class BandwidthLimiter(object):
+			def __init__(self):
+				self.lock = threading.Lock()
+				self.consumed = []
+
+			def consume(self, byte_count, host):
+				with self.lock:
+					self.consumed.append((byte_count, host))
+
+			def block_size(self, host):
+				return 100
+
+		for params in ({}, {'http_connections': 4}):
+			limiter = params['bandwidth_limiter'] = BandwidthLimiter()
+			self.download(params, 'regular')
+			self.assertEqual(sum(byte_count for byte_count, host in limiter.consumed), TEST_SIZE)
+			self.assertEqual(set(host for byte_count, host in limiter.consumed), set(['127.0.0.1']))
+			self.assertTrue(all(byte_count <= 100 for byte_count, host in limiter.consumed))
+
+	def download_segmented(self, params):
+		params['logger'] = FakeLogger()
+		ydl = YoutubeDL(params)
+		downloader = HttpFD(ydl, params)
+		self.assertTrue(downloader.real_download('testfile.mp4', {
+			'url': 'http://127.0.0.1:%d/segmented' % self.port,
+		}))
+		with open(encodeFilename('testfile.mp4'), 'rb') as f:
+			self.assertEqual(f.read(), SEGMENTED_CONTENT)
+		self.assertFalse(os.path.exists(encodeFilename('testfile.mp4.ytdl')))
+		try_rm(encodeFilename('testfile.mp4'))
+
+	def test_segmented(self):
+		self.download_segmented({'http_connections': 3})
+		# probe request plus one request per segment
+		self.assertEqual(len(self.httpd.requested_ranges), 4)
+
+	def interrupt_segmented(self, segment_size):
+		# preallocated .part file of a segmented download that was interrupted after the first segment
+		with open(encodeFilename('testfile.mp4.part'), 'wb') as f:
+			f.write(SEGMENTED_CONTENT[:segment_size] + b'\0' * (len(SEGMENTED_CONTENT) - segment_size))
+		with open(encodeFilename('testfile.mp4.ytdl'), 'w') as f:
+			f.write(json.dumps({'downloader': {
+				'total_bytes': len(SEGMENTED_CONTENT),
+				'segment_size': segment_size,
+				'completed_segments': [0],
+			}}))
+
+	def test_segmented_resume(self):
+		segment_size = 1024 * 1024
+		self.interrupt_segmented(segment_size)
+		self.download_segmented({'http_connections': 3})
+		requested_starts = sorted(start for start, end in self.httpd.requested_ranges[1:])
+		self.assertEqual(requested_starts, [segment_size, 2 * segment_size])
+
+	def test_segmented_resume_single_connection(self):
+		# the size of the preallocated .part file must not be taken for the number of downloaded bytes
+		segment_size = 1024 * 1024
+		self.interrupt_segmented(segment_size)
+		self.download_segmented({})
+		requested_starts = sorted(start for start, end in self.httpd.requested_ranges[1:])
+		self.assertEqual(requested_starts, [segment_size, 2 * segment_size])
+
+	def test_stream_restart(self):
+		# the part of the first response must not stay in front when the download starts over
+		params = {'logger': FakeLogger(), 'retries': 2}
+		downloader = HttpFD(YoutubeDL(params), params)
+		stream = io.BytesIO()
+		self.assertTrue(downloader.real_download(stream, {
+			'url': 'http://127.0.0.1:%d/dropped-then-no-range' % self.port,
+		}))
+		self.assertEqual(self.httpd.dropped_requests, [None, 'bytes=%d-' % (TEST_SIZE // 2)])
+		self.assertEqual(stream.getvalue(), SEGMENTED_CONTENT[:TEST_SIZE])
+
 
 if __name__ == '__main__':
 	unittest.main()
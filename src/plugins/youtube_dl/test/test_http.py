@@ -14,6 +14,7 @@ from youtube_dl import YoutubeDL
 from youtube_dl.compat import compat_http_server, compat_urllib_request
 import ssl
 import threading
+import time
 
 TEST_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -107,6 +108,73 @@ class TestHTTPS(unittest.TestCase):
 		self.assertEqual(r['entries'][0]['url'], 'https://127.0.0.1:%d/vid.mp4' % self.port)
 
 
+class KeepAliveRequestHandler(compat_http_server.BaseHTTPRequestHandler):
+	protocol_version = 'HTTP/1.1'
+	timeout = 0.2  # drop idle connections
+
+	def log_message(self, format, *args):
+		pass
+
+	def do_GET(self):
+		self.server.client_ports.append(self.client_address[1])
+		body = b'x' * 100000 if self.path == '/large' else b'keep-alive'
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/plain')
+		self.send_header('Content-Length', str(len(body)))
+		if self.path == '/close':
+			self.send_header('Connection', 'close')
+			self.close_connection = True
+		self.end_headers()
+		self.wfile.write(body)
+
+
+class TestKeepAlive(unittest.TestCase):
+	def setUp(self):
+		self.httpd = compat_http_server.HTTPServer(
+			('127.0.0.1', 0), KeepAliveRequestHandler)
+		self.httpd.client_ports = []
+		self.port = http_server_port(self.httpd)
+		self.server_thread = threading.Thread(target=self.httpd.serve_forever)
+		self.server_thread.daemon = True
+		self.server_thread.start()
+		self.ydl = YoutubeDL({'logger': FakeLogger()})
+
+	def tearDown(self):
+		self.ydl.connection_pool.clear()
+
+	def fetch(self, path):
+		return self.ydl.urlopen('http://127.0.0.1:%d%s' % (self.port, path)).read()
+
+	def test_reuse(self):
+		for _ in range(3):
+			self.assertEqual(self.fetch('/'), b'keep-alive')
+		self.assertEqual(len(set(self.httpd.client_ports)), 1)
+		self.assertEqual(self.ydl.connection_pool.misses, 1)
+		self.assertEqual(self.ydl.connection_pool.hits, 2)
+
+	def test_connection_close(self):
+		for _ in range(3):
+			self.assertEqual(self.fetch('/close'), b'keep-alive')
+		self.assertEqual(len(set(self.httpd.client_ports)), 3)
+		self.assertEqual(self.ydl.connection_pool.hits, 0)
+
+	def test_unread_response(self):
+		r = self.ydl.urlopen('http://127.0.0.1:%d/large' % self.port)
+		r.read(10)
+		r.close()
+		self.assertEqual(self.fetch('/'), b'keep-alive')
+		self.assertEqual(len(set(self.httpd.client_ports)), 2)
+		self.assertEqual(self.ydl.connection_pool.hits, 0)
+
+	def test_dropped_connection(self):
+		self.assertEqual(self.fetch('/'), b'keep-alive')
+		# the server times out the idle connection, the next request must not fail
+		time.sleep(0.5)
+		self.assertEqual(self.fetch('/'), b'keep-alive')
+		self.assertEqual(len(set(self.httpd.client_ports)), 2)
+		self.assertEqual(self.ydl.connection_pool.hits, 0)
+
+
 def _build_proxy_handler(name):
 	class HTTPTestRequestHandler(compat_http_server.BaseHTTPRequestHandler):
 		proxy_name = name
@@ -113,6 +113,29 @@ class TestJSInterpreter(unittest.TestCase):
         ''')
 		self.assertEqual(jsi.call_function('z'), 5)
 
+	def test_compiled(self):
+		jsi = JSInterpreter('''
+        var o={r:function(a){a.reverse()}};
+        function f(a){var x = [1, 2]; x[0] += a; o.r(x); return x[1] + (x).length;}
+        ''')
+		f = jsi.extract_function('f')
+		self.assertEqual(f([3]), 6)
+		# objects are created again on every call
+		self.assertEqual(f([5]), 8)
+
+		compiled = []
+		compile_statement = jsi.compile_statement
+
+		def count_compile(stmt, *args):
+			compiled.append(stmt)
+			return compile_statement(stmt, *args)
+		jsi.compile_statement = count_compile
+		f = jsi.extract_function('f')
+		self.assertEqual(f([3]), 6)
+		n_compiled = len(compiled)
+		self.assertEqual(f([3]), 6)
+		self.assertEqual(len(compiled), n_compiled)
+
 
 if __name__ == '__main__':
 	unittest.main()
@@ -13,6 +13,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Various small unit tests
 import io
 import json
+import threading
+import time
 import xml.etree.ElementTree
 
 from youtube_dl.utils import (
@@ -49,6 +51,7 @@ from youtube_dl.utils import (
 	ohdave_rsa_encrypt,
 	OnDemandPagedList,
 	orderedSet,
+	PagedList,
 	parse_age_limit,
 	parse_duration,
 	parse_filesize,
@@ -599,6 +602,16 @@ class TestUtil(unittest.TestCase):
 			got = iapl.getslice(*sliceargs)
 			self.assertEqual(got, expected)
 
+			self.assertEqual(list(pl.iterslice(*sliceargs)), expected)
+			self.assertEqual(list(iapl.iterslice(*sliceargs)), expected)
+
+			for prefetch in (1, 3):
+				pl = OnDemandPagedList(get_page, pagesize, prefetch=prefetch)
+				self.assertEqual(pl.getslice(*sliceargs), expected)
+				self.assertEqual(list(pl.iterslice(*sliceargs)), expected)
+				iapl = InAdvancePagedList(get_page, size // pagesize + 1, pagesize, prefetch=prefetch)
+				self.assertEqual(iapl.getslice(*sliceargs), expected)
+
 		testPL(5, 2, (), [0, 1, 2, 3, 4])
 		testPL(5, 2, (1,), [1, 2, 3, 4])
 		testPL(5, 2, (2,), [2, 3, 4])
@@ -607,6 +620,86 @@ class TestUtil(unittest.TestCase):
 		testPL(5, 2, (1, 4), [1, 2, 3])
 		testPL(5, 2, (2, 99), [2, 3, 4])
 		testPL(5, 2, (20, 99), [])
+		testPL(6, 2, (1, 6), [1, 2, 3, 4, 5])
+		testPL(6, 2, (), [0, 1, 2, 3, 4, 5])
+
+	def test_paged_list_iterslice(self):
+		fetched = []
+
+		def get_page(pagenum):
+			fetched.append(pagenum)
+			return range(pagenum * 3, min(pagenum * 3 + 3, 10))
+
+		pl = OnDemandPagedList(get_page, 3)
+		it = pl.iterslice(2, 8)
+		self.assertEqual(next(it), 2)
+		self.assertEqual(fetched, [0])
+		self.assertEqual(next(it), 3)
+		self.assertEqual(fetched, [0, 1])
+		self.assertEqual(list(it), [4, 5, 6, 7])
+		self.assertEqual(fetched, [0, 1, 2])
+		self.assertEqual(pl._cache, {})
+
+		# PagedList subclasses that only implement getslice() are iterated page by page as well
+		class SlicedList(PagedList):
+			_pagesize = 3
+
+			def getslice(self, start=0, end=None):
+				return list(get_page(start // 3))[start % 3:end - start // 3 * 3]
+
+		del fetched[:]
+		it = SlicedList().iterslice(2, 8)
+		self.assertEqual(next(it), 2)
+		self.assertEqual(fetched, [0])
+		self.assertEqual(list(it), [3, 4, 5, 6, 7])
+		self.assertEqual(fetched, [0, 1, 2])
+
+	def test_paged_list_prefetch(self):
+		fetched = []
+		lock = threading.Lock()
+
+		finished = []
+
+		def get_page(pagenum):
+			with lock:
+				fetched.append(pagenum)
+			time.sleep(0.05)
+			with lock:
+				finished.append(pagenum)
+			return range(pagenum * 3, min(pagenum * 3 + 3, 20))
+
+		pl = OnDemandPagedList(get_page, 3, prefetch=4)
+		start = time.time()
+		self.assertEqual(pl.getslice(), list(range(20)))
+		self.assertTrue(time.time() - start < 0.05 * 7)
+		self.assertEqual(sorted(fetched)[:7], list(range(7)))
+
+		# stops at the end of the slice
+		del fetched[:]
+		pl = OnDemandPagedList(get_page, 3, prefetch=4, use_cache=False)
+		self.assertEqual(pl.getslice(1, 7), list(range(1, 7)))
+		self.assertEqual(sorted(fetched), [0, 1, 2])
+
+		# the requests that were running are waited for, the queued ones are dropped
+		del fetched[:]
+		del finished[:]
+		it = pl.iterslice(0, 12)
+		self.assertEqual(next(it), 0)
+		it.close()
+		self.assertTrue(set(fetched) <= set([0, 1, 2, 3]))
+		self.assertEqual(sorted(finished), sorted(fetched))
+
+		del fetched[:]
+		iapl = InAdvancePagedList(get_page, 7, 3, prefetch=2)
+		self.assertEqual(iapl.getslice(3, 9), list(range(3, 9)))
+		self.assertEqual(sorted(fetched), [1, 2])
+
+		# the cache only keeps the recently used pages
+		pl = OnDemandPagedList(get_page, 3, cache_size=2)
+		self.assertEqual(pl.getslice(0, 12), list(range(12)))
+		self.assertEqual(list(pl._cache), [2, 3])
+		self.assertEqual(pl.getslice(6, 7), [6])
+		self.assertEqual(list(pl._cache), [3, 2])
 
 	def test_read_batch_urls(self):
 		f = io.StringIO('''\xef\xbb\xbf foo
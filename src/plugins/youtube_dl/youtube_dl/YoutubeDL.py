@@ -21,6 +21,7 @@ import shutil
 import subprocess
 import socket
 import sys
+import threading
 import time
 import tokenize
 import traceback
@@ -51,6 +52,7 @@ from .utils import (
 	DEFAULT_OUTTMPL,
 	determine_ext,
 	determine_protocol,
+	DownloadArchive,
 	DownloadError,
 	encode_compat_str,
 	encodeFilename,
@@ -60,9 +62,9 @@ from .utils import (
 	format_bytes,
 	formatSeconds,
 	GeoRestrictedError,
+	HTTPConnectionPool,
 	int_or_none,
 	ISO3166Utils,
-	locked_file,
 	make_HTTPS_handler,
 	MaxDownloadsReached,
 	orderedSet,
@@ -86,6 +88,7 @@ from .utils import (
 	UnavailableVideoError,
 	url_basename,
 	version_tuple,
+	WorkerPool,
 	write_json_file,
 	write_string,
 	YoutubeDLCookieJar,
@@ -93,7 +96,7 @@ from .utils import (
 	YoutubeDLHandler,
 )
 from .cache import Cache
-from .extractor import get_info_extractor, gen_extractor_classes, _LAZY_LOADER
+from .extractor import ExtractorIndex, get_info_extractor, gen_extractor_classes, _LAZY_LOADER
 from .extractor.openload import PhantomJSwrapper
 from .downloader import get_suitable_downloader
 from .downloader.rtmp import rtmpdump_version
@@ -170,6 +173,18 @@ class YoutubeDL(object):
   playlist_items:    Specific indices of playlist to download.
   playlistreverse:   Download playlist items in reverse order.
   playlistrandom:    Download playlist items in random order.
+  concurrent_extractions: Number of playlist entries to extract at the
+                     same time (default is 1). Entries are still reported,
+                     processed and downloaded one after another in order.
+  lazy_playlist:     Process the playlist entries while they are received
+                     from the extractor instead of collecting them first,
+                     and do not keep the results. The number of entries is
+                     unknown in advance then, and the returned playlist has
+                     no entries unless download is False or dump_single_json
+                     is set. Ignored with playlistreverse and playlistrandom.
+  playlist_prefetch: Number of playlist pages to fetch ahead in parallel
+                     for extractors which list the playlist pages with a
+                     PagedList.
   matchtitle:        Download only matching titles.
   rejecttitle:       Reject downloads for matching titles.
   logger:            Log messages to a logging.Logger instance.
@@ -205,7 +220,8 @@ class YoutubeDL(object):
                      downloaded. None for no limit.
   download_archive:  File name of a file where all downloads are recorded.
                      Videos already present in the file are not downloaded
-                     again.
+                     again. The file is indexed in a database next to it
+                     (see utils.DownloadArchive).
   cookiefile:        File name where cookies should be read from and dumped to.
   nocheckcertificate:Do not verify SSL certificates
   prefer_insecure:   Use HTTP instead of HTTPS to retrieve information.
@@ -297,13 +313,14 @@ class YoutubeDL(object):
   hls_prefer_native: Use the native HLS downloader instead of ffmpeg/avconv
                      if True, otherwise use ffmpeg/avconv if False, otherwise
                      use downloader suggested by extractor if None.
+                     Live streams are only downloaded natively if True.
 
   The following parameters are not used by YoutubeDL itself, they are used by
   the downloader (see youtube_dl/downloader/common.py):
-  nopart, updatetime, buffersize, ratelimit, min_filesize, max_filesize, test,
+  nopart, updatetime, buffersize, ratelimit, bandwidth_limiter, min_filesize, max_filesize, test,
   noresizebuffer, retries, continuedl, noprogress, consoletitle,
   xattr_set_filesize, external_downloader_args, hls_use_mpegts,
-  http_chunk_size.
+  http_chunk_size, http_connections, concurrent_fragment_downloads.
 
   The following options are used by the post processors:
   prefer_ffmpeg:     If False, use avconv instead of ffmpeg if both are available,
@@ -342,6 +359,11 @@ class YoutubeDL(object):
 			params = {}
 		self._ies = []
 		self._ies_instances = {}
+		self._ie_index = None
+		self._download_archive = None
+		self._prefetched_extractions = {}
+		# output of threads extracting playlist entries ahead, see _prefetch_extraction()
+		self._deferred_output = threading.local()
 		self._pps = []
 		self._progress_hooks = []
 		self._download_retcode = 0
@@ -451,6 +473,8 @@ class YoutubeDL(object):
 	def add_info_extractor(self, ie):
 		"""Add an InfoExtractor object to the end of the list."""
 		self._ies.append(ie)
+		if self._ie_index is not None:
+			self._ie_index.add(ie)
 		if not isinstance(ie, type):
 			self._ies_instances[ie.ie_key()] = ie
 			ie.set_downloader(self)
@@ -467,6 +491,15 @@ class YoutubeDL(object):
 			self.add_info_extractor(ie)
 		return ie
 
+	def suitable_info_extractors(self, url):
+		"""
+    Return the InfoExtractors that may be suitable for url, in the order
+    they are to be tried (GenericIE last)
+    """
+		if self._ie_index is None:
+			self._ie_index = ExtractorIndex(self._ies)
+		return self._ie_index.candidates(url)
+
 	def add_default_info_extractors(self):
 		"""
     Add the InfoExtractors returned by gen_extractors to the end of the list
@@ -503,8 +536,17 @@ class YoutubeDL(object):
 	def _write_string(self, s, out=None):
 		write_string(s, out=out, encoding=self.params.get('encoding'))
 
+	def _defer_output(self, method, *args):
+		calls = getattr(self._deferred_output, 'calls', None)
+		if calls is None:
+			return False
+		calls.append((method, args))
+		return True
+
 	def to_stdout(self, message, skip_eol=False, check_quiet=False):
 		"""Print message to stdout if not in quiet mode."""
+		if self._defer_output('to_stdout', message, skip_eol, check_quiet):
+			return
 		if self.params.get('logger'):
 			self.params['logger'].debug(message)
 		elif not check_quiet or not self.params.get('quiet', False):
@@ -517,6 +559,8 @@ class YoutubeDL(object):
 	def to_stderr(self, message):
 		"""Print message to stderr."""
 		assert isinstance(message, compat_str)
+		if self._defer_output('to_stderr', message):
+			return
 		if self.params.get('logger'):
 			self.params['logger'].error(message)
 		else:
@@ -598,6 +642,8 @@ class YoutubeDL(object):
     Print the message to stderr, it will be prefixed with 'WARNING:'
     If stderr is a tty file the 'WARNING:' will be colored
     '''
+		if self._defer_output('report_warning', message):
+			return
 		if self.params.get('logger') is not None:
 			self.params['logger'].warning(message)
 		else:
@@ -782,7 +828,7 @@ class YoutubeDL(object):
 		if ie_key:
 			ies = [self.get_info_extractor(ie_key)]
 		else:
-			ies = self._ies
+			ies = self.suitable_info_extractors(url)
 
 		for ie in ies:
 			if not ie.suitable(url):
@@ -794,7 +840,11 @@ class YoutubeDL(object):
 														'and will probably not work.')
 
 			try:
-				ie_result = ie.extract(url)
+				prefetched = self._prefetched_extractions.pop((ie.ie_key(), url), None)
+				if prefetched is not None:
+					ie_result = self._take_prefetched_extraction(prefetched)
+				else:
+					ie_result = ie.extract(url)
 				if ie_result is None:  # Finished already (backwards compatibility; listformats and friends should be moved here)
 					break
 				if isinstance(ie_result, list):
@@ -830,6 +880,75 @@ class YoutubeDL(object):
 		else:
 			self.report_error('no suitable InfoExtractor for URL %s' % url)
 
+	def _prefetch_extraction(self, pool, entry):
+		"""
+    Start extracting a playlist entry of type url or url_transparent in pool,
+    for extract_info() to pick up the result later. The output of the
+    extraction is deferred until then, so it still appears in order.
+    Returns the key of the prefetched extraction or None.
+    """
+		if entry.get('_type') not in ('url', 'url_transparent') or self.params.get('extract_flat', False):
+			return None
+		if self._match_entry(entry, incomplete=True) is not None:
+			return None
+		url = sanitize_url(entry['url'])
+		if entry.get('ie_key'):
+			ie_key = entry['ie_key']
+		else:
+			ie_key = next((
+				ie.ie_key() for ie in self.suitable_info_extractors(url) if ie.suitable(url)), None)
+			if ie_key is None:
+				return None
+		ie = self.get_info_extractor(ie_key)
+		if not ie.suitable(url):
+			return None
+		key = (ie.ie_key(), url)
+		if key not in self._prefetched_extractions:
+			self._prefetched_extractions[key] = pool.submit(self._extract_deferred, ie, url)
+		return key
+
+	def _prefetch_entries(self, entries, concurrency):
+		"""
+    Yield the playlist entries while the next ones are extracted ahead
+    in parallel, see _prefetch_extraction().
+    """
+		pool = WorkerPool(concurrency)
+		ahead = collections.deque()
+		key = None
+		entries = iter(entries)
+		try:
+			while True:
+				for entry in itertools.islice(entries, 2 * concurrency - len(ahead)):
+					ahead.append((entry, self._prefetch_extraction(pool, entry)))
+				if not ahead:
+					break
+				entry, key = ahead.popleft()
+				yield entry
+				# not picked up if the entry was skipped
+				self._prefetched_extractions.pop(key, None)
+		finally:
+			pool.shutdown()
+			self._prefetched_extractions.pop(key, None)
+			for entry, key in ahead:
+				self._prefetched_extractions.pop(key, None)
+
+	def _extract_deferred(self, ie, url):
+		self._deferred_output.calls = calls = []
+		try:
+			return calls, ie.extract(url), None
+		except Exception as e:
+			return calls, None, e
+		finally:
+			self._deferred_output.calls = None
+
+	def _take_prefetched_extraction(self, prefetched):
+		calls, ie_result, error = prefetched.result()
+		for method, args in calls:
+			getattr(self, method)(*args)
+		if error is not None:
+			raise error
+		return ie_result
+
 	def add_default_extra_info(self, ie_result, ie, url):
 		self.add_extra_info(ie_result, {
 			'extractor': ie.IE_NAME,
@@ -926,6 +1045,8 @@ class YoutubeDL(object):
 				playlistitems = orderedSet(iter_playlistitems(playlistitems_str))
 
 			ie_entries = ie_result['entries']
+			if isinstance(ie_entries, PagedList) and not ie_entries.prefetch:
+				ie_entries.prefetch = self.params.get('playlist_prefetch') or 0
 
 			def make_playlistitems_entries(list_ie_entries):
 				num_entries = len(list_ie_entries)
@@ -933,11 +1054,30 @@ class YoutubeDL(object):
 					list_ie_entries[i - 1] for i in playlistitems
 					if -num_entries <= i - 1 < num_entries]
 
+			def select_playlistitems(iter_ie_entries):
+				# only keep the requested entries while iterating
+				wanted = set(playlistitems)
+				selected = {}
+				for i, entry in enumerate(itertools.islice(iter_ie_entries, 0, max(playlistitems)), 1):
+					if i in wanted:
+						selected[i] = entry
+				return [selected[i] for i in playlistitems if i in selected]
+
 			def report_download(num_entries):
+				if num_entries is None:
+					self.to_screen(
+						'[%s] playlist %s: Downloading videos lazily' %
+						(ie_result['extractor'], playlist))
+					return
 				self.to_screen(
 					'[%s] playlist %s: Downloading %d videos' %
 					(ie_result['extractor'], playlist, num_entries))
 
+			lazy = self.params.get('lazy_playlist', False)
+			if lazy and (self.params.get('playlistreverse', False) or self.params.get('playlistrandom', False)):
+				self.report_warning('The playlist cannot be processed lazily in reverse or random order')
+				lazy = False
+
 			if isinstance(ie_entries, list):
 				n_all_entries = len(ie_entries)
 				if playlistitems:
@@ -949,7 +1089,14 @@ class YoutubeDL(object):
 					'[%s] playlist %s: Collected %d video ids (downloading %d of them)' %
 					(ie_result['extractor'], playlist, n_all_entries, n_entries))
 			elif isinstance(ie_entries, PagedList):
-				if playlistitems:
+				if lazy:
+					if playlistitems:
+						entries = itertools.chain.from_iterable(
+							ie_entries.getslice(item - 1, item) for item in playlistitems)
+					else:
+						entries = ie_entries.iterslice(playliststart, playlistend)
+					n_entries = None
+				elif playlistitems:
 					entries = []
 					for item in playlistitems:
 						entries.extend(ie_entries.getslice(
@@ -958,16 +1105,24 @@ class YoutubeDL(object):
 				else:
 					entries = ie_entries.getslice(
 						playliststart, playlistend)
-				n_entries = len(entries)
+				if not lazy:
+					n_entries = len(entries)
 				report_download(n_entries)
 			else:  # iterable
 				if playlistitems:
-					entries = make_playlistitems_entries(list(itertools.islice(
-						ie_entries, 0, max(playlistitems))))
+					if lazy:
+						entries = select_playlistitems(ie_entries)
+					else:
+						entries = make_playlistitems_entries(list(itertools.islice(
+							ie_entries, 0, max(playlistitems))))
+					n_entries = len(entries)
+				elif lazy:
+					entries = itertools.islice(ie_entries, playliststart, playlistend)
+					n_entries = None
 				else:
 					entries = list(itertools.islice(
 						ie_entries, playliststart, playlistend))
-				n_entries = len(entries)
+					n_entries = len(entries)
 				report_download(n_entries)
 
 			if self.params.get('playlistreverse', False):
@@ -978,35 +1133,50 @@ class YoutubeDL(object):
 
 			x_forwarded_for = ie_result.get('__x_forwarded_for_ip')
 
-			for i, entry in enumerate(entries, 1):
-				self.to_screen('[download] Downloading video %s of %s' % (i, n_entries))
-				# This __x_forwarded_for_ip thing is a bit ugly but requires
-				# minimal changes
-				if x_forwarded_for:
-					entry['__x_forwarded_for_ip'] = x_forwarded_for
-				extra = {
-					'n_entries': n_entries,
-					'playlist': playlist,
-					'playlist_id': ie_result.get('id'),
-					'playlist_title': ie_result.get('title'),
-					'playlist_uploader': ie_result.get('uploader'),
-					'playlist_uploader_id': ie_result.get('uploader_id'),
-					'playlist_index': i + playliststart,
-					'extractor': ie_result['extractor'],
-					'webpage_url': ie_result['webpage_url'],
-					'webpage_url_basename': url_basename(ie_result['webpage_url']),
-					'extractor_key': ie_result['extractor_key'],
-				}
-
-				reason = self._match_entry(entry, incomplete=True)
-				if reason is not None:
-					self.to_screen('[download] ' + reason)
-					continue
+			# with a lazy playlist, the entries are dropped as soon as they are processed
+			keep_results = not lazy or not download or self.params.get('dump_single_json', False)
 
-				entry_result = self.process_ie_result(entry,
-																							download=download,
-																							extra_info=extra)
-				playlist_results.append(entry_result)
+			concurrency = self.params.get('concurrent_extractions') or 1
+			if concurrency > 1:
+				entries = self._prefetch_entries(entries, concurrency)
+
+			try:
+				for i, entry in enumerate(entries, 1):
+					if n_entries is None:
+						self.to_screen('[download] Downloading video %s' % i)
+					else:
+						self.to_screen('[download] Downloading video %s of %s' % (i, n_entries))
+					# This __x_forwarded_for_ip thing is a bit ugly but requires
+					# minimal changes
+					if x_forwarded_for:
+						entry['__x_forwarded_for_ip'] = x_forwarded_for
+					extra = {
+						'n_entries': n_entries,
+						'playlist': playlist,
+						'playlist_id': ie_result.get('id'),
+						'playlist_title': ie_result.get('title'),
+						'playlist_uploader': ie_result.get('uploader'),
+						'playlist_uploader_id': ie_result.get('uploader_id'),
+						'playlist_index': i + playliststart,
+						'extractor': ie_result['extractor'],
+						'webpage_url': ie_result['webpage_url'],
+						'webpage_url_basename': url_basename(ie_result['webpage_url']),
+						'extractor_key': ie_result['extractor_key'],
+					}
+
+					reason = self._match_entry(entry, incomplete=True)
+					if reason is not None:
+						self.to_screen('[download] ' + reason)
+						continue
+
+					entry_result = self.process_ie_result(entry,
+																								download=download,
+																								extra_info=extra)
+					if keep_results:
+						playlist_results.append(entry_result)
+			finally:
+				if concurrency > 1:
+					entries.close()
 			ie_result['entries'] = playlist_results
 			self.to_screen('[download] Finished downloading playlist: %s' % playlist)
 			return ie_result
@@ -2078,7 +2248,7 @@ class YoutubeDL(object):
 		extractor = info_dict.get('extractor_key') or info_dict.get('ie_key')  # key in a playlist
 		if extractor is None:
 			# Try to find matching extractor for the URL and take its ie_key
-			for ie in self._ies:
+			for ie in self.suitable_info_extractors(info_dict['url']):
 				if ie.suitable(info_dict['url']):
 					extractor = ie.ie_key()
 					break
@@ -2095,15 +2265,7 @@ class YoutubeDL(object):
 		if not vid_id:
 			return False  # Incomplete video information
 
-		try:
-			with locked_file(fn, 'r', encoding='utf-8') as archive_file:
-				for line in archive_file:
-					if line.strip() == vid_id:
-						return True
-		except IOError as ioe:
-			if ioe.errno != errno.ENOENT:
-				raise
-		return False
+		return vid_id in self._get_download_archive(fn)
 
 	def record_download_archive(self, info_dict):
 		fn = self.params.get('download_archive')
@@ -2111,8 +2273,15 @@ class YoutubeDL(object):
 			return
 		vid_id = self._make_archive_id(info_dict)
 		assert vid_id
-		with locked_file(fn, 'a', encoding='utf-8') as archive_file:
-			archive_file.write(vid_id + '\n')
+		self._get_download_archive(fn).add(vid_id)
+
+	def _get_download_archive(self, fn):
+		# kept for the lifetime of this object, so the archive is not read again for every video
+		if self._download_archive is None or self._download_archive.filename != fn:
+			if self._download_archive is not None:
+				self._download_archive.close()
+			self._download_archive = DownloadArchive(fn)
+		return self._download_archive
 
 	@staticmethod
 	def format_resolution(format, default='unknown'):
@@ -2335,8 +2504,12 @@ class YoutubeDL(object):
 		proxy_handler = PerRequestProxyHandler(proxies)
 
 		debuglevel = 1 if self.params.get('debug_printtraffic') else 0
-		https_handler = make_HTTPS_handler(self.params, debuglevel=debuglevel)
-		ydlh = YoutubeDLHandler(self.params, debuglevel=debuglevel)
+		# shared by both handlers, its hits and misses show how many connections were reused
+		self.connection_pool = HTTPConnectionPool()
+		https_handler = make_HTTPS_handler(
+			self.params, debuglevel=debuglevel, connection_pool=self.connection_pool)
+		ydlh = YoutubeDLHandler(
+			self.params, debuglevel=debuglevel, connection_pool=self.connection_pool)
 		data_handler = compat_urllib_request_DataHandler()
 
 		# When passing our own FileHandler instance, build_opener won't add the
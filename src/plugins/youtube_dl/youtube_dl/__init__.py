@@ -188,6 +188,14 @@ def _real_main(argv=None):
 		opts.retries = parse_retries(opts.retries)
 	if opts.fragment_retries is not None:
 		opts.fragment_retries = parse_retries(opts.fragment_retries)
+	if opts.concurrent_fragment_downloads is not None and opts.concurrent_fragment_downloads <= 0:
+		parser.error('number of concurrent fragments must be positive')
+	if opts.http_connections is not None and opts.http_connections <= 0:
+		parser.error('number of http connections must be positive')
+	if opts.concurrent_extractions is not None and opts.concurrent_extractions <= 0:
+		parser.error('number of concurrent extractions must be positive')
+	if opts.playlist_prefetch is not None and opts.playlist_prefetch < 0:
+		parser.error('number of prefetched playlist pages must not be negative')
 	if opts.buffersize is not None:
 		numeric_buffersize = FileDownloader.parse_bytes(opts.buffersize)
 		if numeric_buffersize is None:
@@ -352,9 +360,11 @@ def _real_main(argv=None):
 		'fragment_retries': opts.fragment_retries,
 		'skip_unavailable_fragments': opts.skip_unavailable_fragments,
 		'keep_fragments': opts.keep_fragments,
+		'concurrent_fragment_downloads': opts.concurrent_fragment_downloads,
 		'buffersize': opts.buffersize,
 		'noresizebuffer': opts.noresizebuffer,
 		'http_chunk_size': opts.http_chunk_size,
+		'http_connections': opts.http_connections,
 		'continuedl': opts.continue_dl,
 		'noprogress': opts.noprogress,
 		'progress_with_newline': opts.progress_with_newline,
@@ -362,6 +372,9 @@ def _real_main(argv=None):
 		'playlistend': opts.playlistend,
 		'playlistreverse': opts.playlist_reverse,
 		'playlistrandom': opts.playlist_random,
+		'lazy_playlist': opts.lazy_playlist,
+		'concurrent_extractions': opts.concurrent_extractions,
+		'playlist_prefetch': opts.playlist_prefetch,
 		'noplaylist': opts.noplaylist,
 		'logtostderr': opts.outtmpl == '-',
 		'consoletitle': opts.consoletitle,
@@ -1,8 +1,13 @@
 from __future__ import unicode_literals
 
+import binascii
 from math import ceil
 
-from .compat import compat_b64decode
+from .compat import (
+	compat_b64decode,
+	compat_struct_pack,
+	compat_struct_unpack,
+)
 from .utils import bytes_to_intlist, intlist_to_bytes
 
 BLOCK_SIZE_BYTES = 16
@@ -18,20 +23,34 @@ def aes_ctr_decrypt(data, key, counter):
                              returns the next counter block
   @returns {int[]}           decrypted data
   """
-	expanded_key = key_expansion(key)
 	block_count = int(ceil(float(len(data)) / BLOCK_SIZE_BYTES))
+	counter_blocks = b''.join(intlist_to_bytes(counter.next_value()) for i in range(block_count))
+
+	return bytes_to_intlist(_xor_bytes(
+		intlist_to_bytes(data), _encrypt_blocks(counter_blocks, intlist_to_bytes(key))))
 
-	decrypted_data = []
-	for i in range(block_count):
-		counter_block = counter.next_value()
-		block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
-		block += [0] * (BLOCK_SIZE_BYTES - len(block))
 
-		cipher_counter_block = aes_encrypt(counter_block, expanded_key)
-		decrypted_data += xor(block, cipher_counter_block)
-	decrypted_data = decrypted_data[:len(data)]
+def aes_ctr_decrypt_bytes(data, key, initial_counter):
+	"""
+  Decrypt with aes in counter mode, incrementing the whole counter block as
+  a 128-bit big-endian number
 
-	return decrypted_data
+  @param {bytes} data             cipher
+  @param {bytes} key              16/24/32-Byte cipher key
+  @param {bytes} initial_counter  16-Byte counter block of the first cipher block
+  @returns {bytes}                decrypted data
+  """
+	counter = _bytes_to_int(initial_counter)
+	decrypted_data = []
+	for start in range(0, len(data), _BATCH_SIZE_BYTES):
+		cipher = data[start:start + _BATCH_SIZE_BYTES]
+		first_counter = counter + start // BLOCK_SIZE_BYTES
+		counter_blocks = b''.join(
+			_int_to_bytes((first_counter + i) & 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF, BLOCK_SIZE_BYTES)
+			for i in range(int(ceil(float(len(cipher)) / BLOCK_SIZE_BYTES))))
+		decrypted_data.append(_xor_bytes(cipher, _encrypt_blocks(counter_blocks, key)))
+
+	return b''.join(decrypted_data)
 
 
 def aes_cbc_decrypt(data, key, iv):
@@ -43,21 +62,34 @@ def aes_cbc_decrypt(data, key, iv):
   @param {int[]} iv          16-Byte IV
   @returns {int[]}           decrypted data
   """
-	expanded_key = key_expansion(key)
-	block_count = int(ceil(float(len(data)) / BLOCK_SIZE_BYTES))
+	return bytes_to_intlist(aes_cbc_decrypt_bytes(
+		intlist_to_bytes(data), intlist_to_bytes(key), intlist_to_bytes(iv)))
 
-	decrypted_data = []
-	previous_cipher_block = iv
-	for i in range(block_count):
-		block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
-		block += [0] * (BLOCK_SIZE_BYTES - len(block))
 
-		decrypted_block = aes_decrypt(block, expanded_key)
-		decrypted_data += xor(decrypted_block, previous_cipher_block)
-		previous_cipher_block = block
-	decrypted_data = decrypted_data[:len(data)]
+def aes_cbc_decrypt_bytes(data, key, iv):
+	"""
+  Decrypt with aes in CBC mode. The padding is not removed.
+
+  @param {bytes} data        cipher, bytes or a memoryview
+  @param {bytes} key         16/24/32-Byte cipher key
+  @param {bytes} iv          16-Byte IV
+  @returns {bytes}           decrypted data
+  """
+	length = len(data)
+	padding = -length % BLOCK_SIZE_BYTES
+	if padding:
+		data = bytes(data) + b'\0' * padding
 
-	return decrypted_data
+	decrypted_data = []
+	previous_cipher_block = bytes(iv)
+	for start in range(0, len(data), _BATCH_SIZE_BYTES):
+		cipher = bytes(data[start:start + _BATCH_SIZE_BYTES])
+		# all blocks of the batch are decrypted at once, and then combined with the previous cipher blocks
+		decrypted_data.append(_xor_bytes(
+			_decrypt_blocks(cipher, key), previous_cipher_block + cipher[:-BLOCK_SIZE_BYTES]))
+		previous_cipher_block = cipher[-BLOCK_SIZE_BYTES:]
+
+	return b''.join(decrypted_data)[:length]
 
 
 def aes_cbc_encrypt(data, key, iv):
@@ -69,23 +101,19 @@ def aes_cbc_encrypt(data, key, iv):
   @param {int[]} iv          16-Byte IV
   @returns {int[]}           encrypted data
   """
-	expanded_key = key_expansion(key)
-	block_count = int(ceil(float(len(data)) / BLOCK_SIZE_BYTES))
+	round_keys = _round_keys(intlist_to_bytes(key))[1]
+	remaining_length = -len(data) % BLOCK_SIZE_BYTES
+	padded_data = intlist_to_bytes(data + [remaining_length] * remaining_length)
+	data_words = compat_struct_unpack('>%dI' % (len(padded_data) // 4), padded_data)
+	c0, c1, c2, c3 = compat_struct_unpack('>4I', intlist_to_bytes(iv))
 
-	encrypted_data = []
-	previous_cipher_block = iv
-	for i in range(block_count):
-		block = data[i * BLOCK_SIZE_BYTES: (i + 1) * BLOCK_SIZE_BYTES]
-		remaining_length = BLOCK_SIZE_BYTES - len(block)
-		block += [remaining_length] * remaining_length
-		mixed_block = xor(block, previous_cipher_block)
+	encrypted_words = []
+	for i in range(0, len(data_words), 4):
+		c0, c1, c2, c3 = _encrypt_block((
+			data_words[i] ^ c0, data_words[i + 1] ^ c1, data_words[i + 2] ^ c2, data_words[i + 3] ^ c3), round_keys)
+		encrypted_words.extend((c0, c1, c2, c3))
 
-		encrypted_block = aes_encrypt(mixed_block, expanded_key)
-		encrypted_data += encrypted_block
-
-		previous_cipher_block = encrypted_block
-
-	return encrypted_data
+	return bytes_to_intlist(compat_struct_pack('>%dI' % len(encrypted_words), *encrypted_words))
 
 
 def key_expansion(data):
@@ -180,7 +208,7 @@ def aes_decrypt_text(data, password, key_size_bytes):
   """
 	NONCE_LENGTH_BYTES = 8
 
-	data = bytes_to_intlist(compat_b64decode(data))
+	data = compat_b64decode(data)
 	password = bytes_to_intlist(password.encode('utf-8'))
 
 	key = password[:key_size_bytes] + [0] * (key_size_bytes - len(password))
@@ -189,16 +217,8 @@ def aes_decrypt_text(data, password, key_size_bytes):
 	nonce = data[:NONCE_LENGTH_BYTES]
 	cipher = data[NONCE_LENGTH_BYTES:]
 
-	class Counter(object):
-		__value = nonce + [0] * (BLOCK_SIZE_BYTES - NONCE_LENGTH_BYTES)
-
-		def next_value(self):
-			temp = self.__value
-			self.__value = inc(self.__value)
-			return temp
-
-	decrypted_data = aes_ctr_decrypt(cipher, key, Counter())
-	plaintext = intlist_to_bytes(decrypted_data)
+	plaintext = aes_ctr_decrypt_bytes(
+		cipher, intlist_to_bytes(key), nonce + b'\0' * (BLOCK_SIZE_BYTES - NONCE_LENGTH_BYTES))
 
 	return plaintext
 
@@ -358,4 +378,157 @@ def inc(data):
 	return data
 
 
-__all__ = ['aes_encrypt', 'key_expansion', 'aes_ctr_decrypt', 'aes_cbc_decrypt', 'aes_decrypt_text']
+# aes_cbc_encrypt() has to encrypt one block after another, and works on four
+# 32-bit big-endian words per block, one column of the state each. A round
+# of aes takes one lookup per byte in the T-tables, which combine the S-box
+# and the mix columns step.
+
+def _make_t_tables(sbox, matrix_column):
+	t0 = tuple(
+		rijndael_mul(s, matrix_column[0]) << 24 | rijndael_mul(s, matrix_column[1]) << 16 |
+		rijndael_mul(s, matrix_column[2]) << 8 | rijndael_mul(s, matrix_column[3])
+		for s in sbox)
+	t1 = tuple((t >> 8 | t << 24) & 0xFFFFFFFF for t in t0)
+	t2 = tuple((t >> 8 | t << 24) & 0xFFFFFFFF for t in t1)
+	t3 = tuple((t >> 8 | t << 24) & 0xFFFFFFFF for t in t2)
+	return t0, t1, t2, t3
+
+
+_TE0, _TE1, _TE2, _TE3 = _make_t_tables(SBOX, (2, 1, 1, 3))
+# the S-box shifted into place for the last round
+_SBOX_SHIFTED = tuple(tuple(s << shift for s in SBOX) for shift in (24, 16, 8, 0))
+
+_round_keys_cache = {}
+
+
+def _round_keys(key):
+	""" The round keys for key, as 16 bytes and as tuple of 4 words each """
+	round_keys = _round_keys_cache.get(key)
+	if round_keys is None:
+		expanded_key = intlist_to_bytes(key_expansion(bytes_to_intlist(key)))
+		words = compat_struct_unpack('>%dI' % (len(expanded_key) // 4), expanded_key)
+		round_keys = (
+			[expanded_key[i:i + BLOCK_SIZE_BYTES] for i in range(0, len(expanded_key), BLOCK_SIZE_BYTES)],
+			[words[i:i + 4] for i in range(0, len(words), 4)])
+		if len(_round_keys_cache) >= 32:
+			_round_keys_cache.clear()
+		_round_keys_cache[key] = round_keys
+	return round_keys
+
+
+def _encrypt_block(block, round_keys, te0=_TE0, te1=_TE1, te2=_TE2, te3=_TE3, sbox=_SBOX_SHIFTED):
+	k = round_keys[0]
+	s0, s1, s2, s3 = block[0] ^ k[0], block[1] ^ k[1], block[2] ^ k[2], block[3] ^ k[3]
+	for k in round_keys[1:-1]:
+		s0, s1, s2, s3 = (
+			te0[s0 >> 24] ^ te1[(s1 >> 16) & 255] ^ te2[(s2 >> 8) & 255] ^ te3[s3 & 255] ^ k[0],
+			te0[s1 >> 24] ^ te1[(s2 >> 16) & 255] ^ te2[(s3 >> 8) & 255] ^ te3[s0 & 255] ^ k[1],
+			te0[s2 >> 24] ^ te1[(s3 >> 16) & 255] ^ te2[(s0 >> 8) & 255] ^ te3[s1 & 255] ^ k[2],
+			te0[s3 >> 24] ^ te1[(s0 >> 16) & 255] ^ te2[(s1 >> 8) & 255] ^ te3[s2 & 255] ^ k[3])
+	k = round_keys[-1]
+	s24, s16, s8, s0_ = sbox
+	return (
+		s24[s0 >> 24] ^ s16[(s1 >> 16) & 255] ^ s8[(s2 >> 8) & 255] ^ s0_[s3 & 255] ^ k[0],
+		s24[s1 >> 24] ^ s16[(s2 >> 16) & 255] ^ s8[(s3 >> 8) & 255] ^ s0_[s0 & 255] ^ k[1],
+		s24[s2 >> 24] ^ s16[(s3 >> 16) & 255] ^ s8[(s0 >> 8) & 255] ^ s0_[s1 & 255] ^ k[2],
+		s24[s3 >> 24] ^ s16[(s0 >> 16) & 255] ^ s8[(s1 >> 8) & 255] ^ s0_[s2 & 255] ^ k[3])
+
+
+# The blocks of counter mode and of CBC decryption are independent of each
+# other, so whole batches of blocks go through each step of aes at once:
+# bytes.translate() with tables combining the (inverse) S-box and the factors
+# of the (inverse) mix columns step, slices that move the bytes of all blocks
+# into place for the (inverse) shift rows and mix columns steps, and XOR on
+# the batch as one big integer. The decryption uses the equivalent inverse
+# cipher, whose round keys are in reverse order and have the inverse mix
+# columns step applied.
+
+_BATCH_SIZE_BYTES = 4096 * BLOCK_SIZE_BYTES
+
+try:
+	int.from_bytes
+
+	def _bytes_to_int(data):
+		return int.from_bytes(data, 'big')
+
+	def _int_to_bytes(value, length):
+		return value.to_bytes(length, 'big')
+except AttributeError:  # Python 2
+	def _bytes_to_int(data):
+		return int(binascii.hexlify(data), 16) if data else 0
+
+	def _int_to_bytes(value, length):
+		return binascii.unhexlify('%0*x' % (2 * length, value))
+
+
+def _xor_bytes(data1, data2):
+	""" XOR data1 with the start of data2 """
+	return _int_to_bytes(_bytes_to_int(data1) ^ _bytes_to_int(data2[:len(data1)]), len(data1))
+
+
+def _make_round_steps(sbox, matrix_row, shift_rows_positions):
+	""" The translation tables and the positions of the bytes for each factor of matrix_row """
+	steps = []
+	for k, factor in enumerate(matrix_row):
+		table = intlist_to_bytes([rijndael_mul(s, factor) for s in sbox])
+		# the byte of the column rotated by k, after shifting the rows
+		positions = [shift_rows_positions[c * 4 + (r + k) % 4] for c in range(4) for r in range(4)]
+		steps.append((table, positions))
+	return steps
+
+
+_SHIFT_ROWS_POSITIONS = [((c + r) & 0b11) * 4 + r for c in range(4) for r in range(4)]
+_SHIFT_ROWS_INV_POSITIONS = [((c - r) & 0b11) * 4 + r for c in range(4) for r in range(4)]
+_ENCRYPT_ROUND_STEPS = _make_round_steps(SBOX, MIX_COLUMN_MATRIX[0], _SHIFT_ROWS_POSITIONS)
+_ENCRYPT_LAST_STEP = (intlist_to_bytes(SBOX), _SHIFT_ROWS_POSITIONS)
+_DECRYPT_ROUND_STEPS = _make_round_steps(SBOX_INV, MIX_COLUMN_MATRIX_INV[0], _SHIFT_ROWS_INV_POSITIONS)
+_DECRYPT_LAST_STEP = (intlist_to_bytes(SBOX_INV), _SHIFT_ROWS_INV_POSITIONS)
+
+
+def _move_bytes(data, positions):
+	""" Set byte i of each block to byte positions[i] of the block """
+	moved = bytearray(len(data))
+	for i, position in enumerate(positions):
+		moved[i::BLOCK_SIZE_BYTES] = data[position::BLOCK_SIZE_BYTES]
+	return bytes(moved)
+
+
+def _crypt_blocks(data, round_keys, round_steps, last_step):
+	block_count = len(data) // BLOCK_SIZE_BYTES
+	state = _bytes_to_int(data) ^ _bytes_to_int(round_keys[0] * block_count)
+	for round_key in round_keys[1:-1]:
+		state_bytes = _int_to_bytes(state, len(data))
+		state = _bytes_to_int(round_key * block_count)
+		for table, positions in round_steps:
+			state ^= _bytes_to_int(_move_bytes(state_bytes.translate(table), positions))
+	table, positions = last_step
+	state_bytes = _int_to_bytes(state, len(data))
+	return _int_to_bytes(
+		_bytes_to_int(_move_bytes(state_bytes.translate(table), positions)) ^
+		_bytes_to_int(round_keys[-1] * block_count), len(data))
+
+
+def _encrypt_blocks(data, key):
+	""" Encrypt whole blocks of data, like aes_encrypt() each """
+	return _crypt_blocks(data, _round_keys(key)[0], _ENCRYPT_ROUND_STEPS, _ENCRYPT_LAST_STEP)
+
+
+def _decrypt_blocks(data, key):
+	""" Decrypt whole blocks of data, like aes_decrypt() each """
+	round_keys = _decryption_round_keys_cache.get(key)
+	if round_keys is None:
+		round_keys = _round_keys(key)[0][::-1]
+		round_keys[1:-1] = [
+			intlist_to_bytes(mix_columns_inv(bytes_to_intlist(round_key))) for round_key in round_keys[1:-1]]
+		if len(_decryption_round_keys_cache) >= 32:
+			_decryption_round_keys_cache.clear()
+		_decryption_round_keys_cache[key] = round_keys
+	return _crypt_blocks(data, round_keys, _DECRYPT_ROUND_STEPS, _DECRYPT_LAST_STEP)
+
+
+_decryption_round_keys_cache = {}
+
+
+__all__ = [
+	'aes_encrypt', 'key_expansion', 'aes_ctr_decrypt', 'aes_ctr_decrypt_bytes', 'aes_cbc_decrypt',
+	'aes_cbc_decrypt_bytes', 'aes_decrypt_text']
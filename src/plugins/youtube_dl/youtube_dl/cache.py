@@ -1,23 +1,49 @@
 from __future__ import unicode_literals
 
+import copy
 import errno
 import io
 import json
 import os
 import re
 import shutil
+import threading
+import time
 import traceback
 
 from .compat import compat_getenv
 from .utils import (
 	expand_path,
+	sqlite3,
 	write_json_file,
 )
 
 
 class Cache(object):
+	"""
+  Stores JSON data by section and key in cache.sqlite in the cache dir.
+
+  The database is shared by all processes using the same cache dir. Entries
+  that were loaded or stored are also kept in memory, so each one is only read
+  from the database once per process. Entries expire after the TTL of their
+  section, and the least recently used entries are evicted when the data of all
+  entries exceeds MAX_SIZE bytes. The JSON files that were used as cache before
+  are moved into the database when it is opened. Without SQLite, the entries
+  are still stored in one JSON file per key.
+  """
+
+	# seconds until the entries of a section expire, others never do
+	SECTION_TTL = {
+		'youtube-sigfuncs': 30 * 24 * 60 * 60,
+	}
+	MAX_SIZE = 16 * 1024 * 1024
+
 	def __init__(self, ydl):
 		self._ydl = ydl
+		self._lock = threading.Lock()
+		self._db = None
+		self._db_failed = sqlite3 is None
+		self._memory = {}  # (section, key) -> (data, expiry time)
 
 	def _get_root_dir(self):
 		res = self._ydl.params.get('cachedir')
@@ -37,6 +63,96 @@ class Cache(object):
 	def enabled(self):
 		return self._ydl.params.get('cachedir') is not False
 
+	def _expiry(self, section, stored):
+		ttl = self.SECTION_TTL.get(section)
+		return None if ttl is None else stored + ttl
+
+	def _connect(self):
+		""" Return the database connection, or None if the JSON files have to be used """
+		if self._db is not None or self._db_failed:
+			return self._db
+		root_dir = self._get_root_dir()
+		try:
+			try:
+				os.makedirs(root_dir)
+			except OSError as ose:
+				if ose.errno != errno.EEXIST:
+					raise
+			db = sqlite3.connect(
+				os.path.join(root_dir, 'cache.sqlite'), timeout=60, isolation_level=None, check_same_thread=False)
+			try:
+				db.execute('PRAGMA journal_mode=WAL')
+			except sqlite3.Error:
+				pass  # e.g. on network filesystems, the default journal works as well
+			db.execute(
+				'CREATE TABLE IF NOT EXISTS cache ('
+				'section TEXT, key TEXT, data TEXT, size INTEGER, stored REAL, accessed REAL, '
+				'PRIMARY KEY (section, key))')
+			db.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+		except (sqlite3.Error, OSError):
+			self._ydl.report_warning(
+				'Opening cache database in %r failed: %s' % (root_dir, traceback.format_exc()))
+			self._db_failed = True
+			return None
+		self._db = db
+		try:
+			self._migrate_json_files(root_dir)
+		except (sqlite3.Error, OSError):
+			# e.g. the database is locked, the files are moved the next time it is opened
+			self._ydl.report_warning(
+				'Moving the cache files in %r into the database failed: %s' % (root_dir, traceback.format_exc()))
+		return db
+
+	def _migrate_json_files(self, root_dir):
+		migrated = []
+		self._db.execute('BEGIN IMMEDIATE')
+		try:
+			for section in os.listdir(root_dir):
+				section_dir = os.path.join(root_dir, section)
+				if not os.path.isdir(section_dir):
+					continue
+				for fn in os.listdir(section_dir):
+					key, ext = os.path.splitext(fn)
+					if ext != '.json':
+						continue
+					cache_fn = os.path.join(section_dir, fn)
+					try:
+						with io.open(cache_fn, 'r', encoding='utf-8') as cachef:
+							data = json.dumps(json.load(cachef))
+						stored = os.path.getmtime(cache_fn)
+					except (IOError, OSError, ValueError):
+						continue
+					self._db.execute(
+						'INSERT OR IGNORE INTO cache (section, key, data, size, stored, accessed) '
+						'VALUES (?, ?, ?, ?, ?, ?)', (section, key, data, len(data), stored, stored))
+					migrated.append(cache_fn)
+			self._db.execute('COMMIT')
+		except BaseException:
+			self._db.execute('ROLLBACK')
+			raise
+		for cache_fn in migrated:
+			try:
+				os.remove(cache_fn)
+				os.rmdir(os.path.dirname(cache_fn))
+			except OSError:
+				pass  # other files left in the section dir
+
+	def _evict(self, now):
+		for section, ttl in self.SECTION_TTL.items():
+			self._db.execute('DELETE FROM cache WHERE section = ? AND stored < ?', (section, now - ttl))
+		total_size = self._db.execute('SELECT SUM(size) FROM cache').fetchone()[0] or 0
+		if total_size <= self.MAX_SIZE:
+			return
+		evicted = []
+		for section, key, size in self._db.execute('SELECT section, key, size FROM cache ORDER BY accessed'):
+			if total_size <= self.MAX_SIZE:
+				break
+			evicted.append((section, key))
+			total_size -= size
+		self._db.executemany('DELETE FROM cache WHERE section = ? AND key = ?', evicted)
+		for entry in evicted:
+			self._memory.pop(entry, None)
+
 	def store(self, section, key, data, dtype='json'):
 		assert dtype in ('json',)
 
@@ -45,23 +161,35 @@ class Cache(object):
 
 		fn = self._get_cache_fn(section, key, dtype)
 		try:
-			try:
-				os.makedirs(os.path.dirname(fn))
-			except OSError as ose:
-				if ose.errno != errno.EEXIST:
+			with self._lock:
+				now = time.time()
+				self._memory[(section, key)] = (copy.deepcopy(data), self._expiry(section, now))
+				db = self._connect()
+				if db is None:
+					try:
+						os.makedirs(os.path.dirname(fn))
+					except OSError as ose:
+						if ose.errno != errno.EEXIST:
+							raise
+					write_json_file(data, fn)
+					return
+				json_data = json.dumps(data)
+				db.execute('BEGIN IMMEDIATE')
+				try:
+					db.execute(
+						'INSERT OR REPLACE INTO cache (section, key, data, size, stored, accessed) '
+						'VALUES (?, ?, ?, ?, ?, ?)', (section, key, json_data, len(json_data), now, now))
+					self._evict(now)
+					db.execute('COMMIT')
+				except BaseException:
+					db.execute('ROLLBACK')
 					raise
-			write_json_file(data, fn)
 		except Exception:
 			tb = traceback.format_exc()
 			self._ydl.report_warning(
 				'Writing cache to %r failed: %s' % (fn, tb))
 
-	def load(self, section, key, dtype='json', default=None):
-		assert dtype in ('json',)
-
-		if not self.enabled:
-			return default
-
+	def _load_file(self, section, key, dtype):
 		cache_fn = self._get_cache_fn(section, key, dtype)
 		try:
 			try:
@@ -76,8 +204,51 @@ class Cache(object):
 					'Cache retrieval from %s failed (%s)' % (cache_fn, file_size))
 		except IOError:
 			pass  # No cache available
+		return None
 
-		return default
+	def _load_db(self, db, section, key):
+		row = db.execute(
+			'SELECT data, stored FROM cache WHERE section = ? AND key = ?', (section, key)).fetchone()
+		if row is None:
+			return None
+		json_data, stored = row
+		expiry = self._expiry(section, stored)
+		if expiry is not None and expiry < time.time():
+			return None
+		try:
+			data = json.loads(json_data)
+		except ValueError:
+			self._ydl.report_warning(
+				'Cache retrieval of %s/%s failed (%d bytes)' % (section, key, len(json_data)))
+			return None
+		db.execute(
+			'UPDATE cache SET accessed = ? WHERE section = ? AND key = ?', (time.time(), section, key))
+		self._memory[(section, key)] = (data, expiry)
+		return data
+
+	def load(self, section, key, dtype='json', default=None):
+		assert dtype in ('json',)
+
+		if not self.enabled:
+			return default
+
+		self._get_cache_fn(section, key, dtype)  # validates section and key
+		with self._lock:
+			data, expiry = self._memory.get((section, key), (None, None))
+			if expiry is not None and expiry < time.time():
+				data = None
+			if data is None and os.path.isdir(self._get_root_dir()):
+				db = self._connect()
+				if db is None:
+					data = self._load_file(section, key, dtype)
+				else:
+					try:
+						data = self._load_db(db, section, key)
+					except sqlite3.Error:
+						self._ydl.report_warning(
+							'Cache retrieval of %s/%s failed: %s' % (section, key, traceback.format_exc()))
+		# the callers may modify what they get
+		return default if data is None else copy.deepcopy(data)
 
 	def remove(self):
 		if not self.enabled:
@@ -88,6 +259,12 @@ class Cache(object):
 		if not any((term in cachedir) for term in ('cache', 'tmp')):
 			raise Exception('Not removing directory %s - this does not look like a cache dir' % cachedir)
 
+		with self._lock:
+			self._memory.clear()
+			if self._db is not None:
+				self._db.close()
+				self._db = None
+
 		self._ydl.to_screen(
 			'Removing cache dir %s .' % cachedir, skip_eol=True)
 		if os.path.exists(cachedir):
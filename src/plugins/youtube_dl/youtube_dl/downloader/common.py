@@ -32,6 +32,11 @@ class FileDownloader(object):
   verbose:            Print additional info to stdout.
   quiet:              Do not print messages to stdout.
   ratelimit:          Download speed limit, in bytes/sec.
+  bandwidth_limiter:  An object shared by downloads that are limited together.
+                      Its consume(byte_count, host) method blocks until
+                      byte_count more bytes from host are within its limits,
+                      and block_size(host) returns the largest number of bytes
+                      to read at once, or None if there is no limit.
   retries:            Number of times to retry for HTTP error 5xx
   buffersize:         Size of download buffer in bytes.
   noresizebuffer:     Do not automatically resize the download buffer.
@@ -178,6 +183,18 @@ class FileDownloader(object):
 		if speed > rate_limit:
 			time.sleep(max((byte_counter // rate_limit) - elapsed, 0))
 
+	def throttle(self, byte_count, host):
+		"""Sleep until the bandwidth_limiter allows byte_count more bytes from host."""
+		bandwidth_limiter = self.params.get('bandwidth_limiter')
+		if bandwidth_limiter is not None:
+			bandwidth_limiter.consume(byte_count, host)
+
+	def limit_block_size(self, block_size, host):
+		"""Reduce block_size, so that the bandwidth_limiter does not have to sleep long."""
+		bandwidth_limiter = self.params.get('bandwidth_limiter')
+		max_block_size = bandwidth_limiter and bandwidth_limiter.block_size(host)
+		return block_size if max_block_size is None else min(block_size, max_block_size)
+
 	def temp_name(self, filename):
 		"""Returns a temporary filename for the given filename."""
 		if self.params.get('nopart', False) or filename == '-' or \
@@ -329,12 +346,12 @@ class FileDownloader(object):
     Return True on success and False otherwise
     """
 
-		nooverwrites_and_exists = (
-			self.params.get('nooverwrites', False) and
-			os.path.exists(encodeFilename(filename))
-		)
-
 		if not hasattr(filename, 'write'):
+			nooverwrites_and_exists = (
+				self.params.get('nooverwrites', False) and
+				os.path.exists(encodeFilename(filename))
+			)
+
 			continuedl_and_exists = (
 				self.params.get('continuedl', True) and
 				os.path.isfile(encodeFilename(filename)) and
@@ -1,16 +1,22 @@
 from __future__ import division, unicode_literals
 
+import collections
+import io
 import os
 import time
 import json
+import threading
 
 from .common import FileDownloader
 from .http import HttpFD
+from ..compat import compat_urllib_error
 from ..utils import (
+	DownloadError,
 	error_to_compat_str,
 	encodeFilename,
 	sanitize_open,
 	sanitized_Request,
+	WorkerPool,
 )
 
 
@@ -30,7 +36,11 @@ class FragmentFD(FileDownloader):
   skip_unavailable_fragments:
                       Skip unavailable fragments (DASH and hlsnative only)
   keep_fragments:     Keep downloaded fragments on disk after downloading is
-                      finished
+                      finished (otherwise fragments are downloaded into memory
+                      and never written to separate files)
+  concurrent_fragment_downloads:
+                      Number of fragments to download at the same time
+                      (default is 1, DASH, hlsnative and ISM only)
 
   For each incomplete fragment download youtube-dl keeps on disk a special
   bookkeeping file with download state and metadata (in future such files will
@@ -96,18 +106,202 @@ class FragmentFD(FileDownloader):
 		frag_index_stream.close()
 
 	def _download_fragment(self, ctx, frag_url, info_dict, headers=None):
-		fragment_filename = '%s-Frag%d' % (ctx['tmpfilename'], ctx['fragment_index'])
-		success = ctx['dl'].download(fragment_filename, {
+		success, frag_content, frag_sanitized = self._fetch_fragment(
+			ctx, ctx['dl'], ctx['fragment_index'], frag_url, info_dict, headers)
+		if success:
+			ctx['fragment_filename_sanitized'] = frag_sanitized
+		return success, frag_content
+
+	def _fetch_fragment(self, ctx, dl, frag_index, frag_url, info_dict, headers=None):
+		frag_info = {
 			'url': frag_url,
 			'http_headers': headers or info_dict.get('http_headers'),
-		})
-		if not success:
-			return False, None
+		}
+		if not self.params.get('keep_fragments', False):
+			frag_buffer = io.BytesIO()
+			if not dl.download(frag_buffer, frag_info):
+				return False, None, None
+			return True, frag_buffer.getvalue(), None
+		fragment_filename = '%s-Frag%d' % (ctx['tmpfilename'], frag_index)
+		if not dl.download(fragment_filename, frag_info):
+			return False, None, None
 		down, frag_sanitized = sanitize_open(fragment_filename, 'rb')
-		ctx['fragment_filename_sanitized'] = frag_sanitized
 		frag_content = down.read()
 		down.close()
-		return True, frag_content
+		return True, frag_content, frag_sanitized
+
+	def _download_fragments(self, ctx, fragments, info_dict, pack_func=None, decrypt_func=None):
+		"""
+		Download fragments and append them to ctx['dest_stream'] in the given order
+
+		fragments is a list of dicts with the keys frag_index (1-based, used for
+		resuming), url and optionally headers and fatal (abort the download if
+		this fragment is unavailable, no matter of skip_unavailable_fragments).
+		Fragments with a frag_index not greater than ctx['fragment_index'] have
+		been appended or skipped already.
+		pack_func(frag_content, fragment) may transform the content of a
+		fragment right before it is appended, e.g. to write a header in front
+		of it. It is always called in order of fragments.
+		decrypt_func(frag_content, fragment) transforms the content of a
+		fragment as soon as it is fetched. It runs in a pool of worker threads,
+		so the fragments are decrypted while the next ones are fetched, and it
+		may be called for several fragments at once and out of order.
+
+		Up to concurrent_fragment_downloads fragments are fetched at the same
+		time. Fetched fragments wait in a bounded reorder buffer until all of
+		their predecessors have been appended, so at most twice as many
+		fragments as concurrent downloads are held in memory.
+		Returns True on success and False otherwise.
+		"""
+		fragment_retries = self.params.get('fragment_retries', 0)
+		skip_unavailable_fragments = self.params.get('skip_unavailable_fragments', True)
+		concurrency = max(int(self.params.get('concurrent_fragment_downloads') or 1), 1)
+
+		def is_fatal(fragment):
+			return fragment.get('fatal', False) or not skip_unavailable_fragments
+
+		def fetch(fragment, dl):
+			count = 0
+			while count <= fragment_retries:
+				try:
+					return self._fetch_fragment(
+						ctx, dl, fragment['frag_index'], fragment['url'], info_dict, fragment.get('headers'))
+				except compat_urllib_error.HTTPError as err:
+					# Unavailable (possibly temporary) fragments may be served, e.g. YouTube
+					# often returns 404 for a DASH fragment that succeeds when it is retried
+					# with the same request data. First we try to retry then either skip or abort.
+					# See https://github.com/rg3/youtube-dl/issues/10165,
+					# https://github.com/rg3/youtube-dl/issues/10448).
+					count += 1
+					if count <= fragment_retries:
+						self.report_retry_fragment(err, fragment['frag_index'], count, fragment_retries)
+				except DownloadError:
+					# Don't retry fragment if error occurred during HTTP downloading
+					# itself since it has own retry settings
+					if is_fatal(fragment):
+						raise
+					break
+			return None
+
+		def skip(fragment):
+			self.report_skip_fragment(fragment['frag_index'])
+			ctx['fragment_index'] = fragment['frag_index']
+			if self.__do_ytdl_file(ctx):
+				self._write_ytdl_file(ctx)
+
+		decrypt_pool = WorkerPool(concurrency) if decrypt_func is not None else None
+		shared = {'bytes': 0}
+
+		def decrypt(fragment, result):
+			""" Start decrypting the content of a fetch result, result() of the task waits for it """
+			if decrypt_pool is None or not isinstance(result, tuple) or not result[0]:
+				return result
+			success, frag_content, frag_sanitized = result
+			return success, decrypt_pool.submit(decrypt_func, frag_content, fragment), frag_sanitized
+
+		def append(fragment, result, concurrent):
+			if result is None:
+				if not is_fatal(fragment):
+					skip(fragment)
+					return True
+				self.report_error('giving up after %s fragment retries' % fragment_retries)
+				return False
+			success, frag_content, frag_sanitized = result
+			if not success:
+				return False
+			if decrypt_pool is not None:
+				frag_content = frag_content.result()
+			if concurrent:
+				# fragment downloaders of worker threads do not report progress
+				shared['bytes'] += len(frag_content)
+				ctx['frag_progress_hook']({
+					'status': 'finished',
+					'total_bytes': len(frag_content),
+					'speed': self.calc_speed(ctx['started'], time.time(), shared['bytes']),
+				})
+			if pack_func is not None:
+				frag_content = pack_func(frag_content, fragment)
+			# the .ytdl file must point behind this fragment, even if predecessors were skipped
+			ctx['fragment_index'] = fragment['frag_index']
+			ctx['fragment_filename_sanitized'] = frag_sanitized
+			self._append_fragment(ctx, frag_content)
+			return True
+
+		pending = [f for f in fragments if f['frag_index'] > ctx['fragment_index']]
+
+		def download_sequentially():
+			# the previous fragment is decrypted while the next one is fetched
+			decrypting = collections.deque()
+			for fragment in pending:
+				result = decrypt(fragment, fetch(fragment, ctx['dl']))
+				decrypting.append((fragment, result))
+				# failed fetches are handled right away
+				while decrypting and (len(decrypting) > 1 or not isinstance(result, tuple) or not result[0]):
+					if not append(*decrypting.popleft(), concurrent=False):
+						return False
+			while decrypting:
+				if not append(*decrypting.popleft(), concurrent=False):
+					return False
+			return True
+
+		def download_concurrently():
+			# fetched fragments that are not appended yet are limited to this number
+			window = concurrency * 2
+			cond = threading.Condition()
+			results = {}  # {position in pending: fetch result (with a decryption task) or exception}
+			shared.update({'next': 0, 'appended': 0, 'abort': False})
+
+			def worker():
+				dl = self._make_frag_downloader()
+				while True:
+					with cond:
+						while (not shared['abort'] and shared['next'] < len(pending) and
+									 shared['next'] >= shared['appended'] + window):
+							cond.wait()
+						if shared['abort'] or shared['next'] >= len(pending):
+							return
+						position = shared['next']
+						shared['next'] += 1
+					try:
+						result = decrypt(pending[position], fetch(pending[position], dl))
+					except Exception as e:
+						result = e
+					with cond:
+						results[position] = result
+						cond.notify_all()
+
+			threads = [threading.Thread(target=worker) for _ in range(min(concurrency, len(pending)))]
+			for thread in threads:
+				thread.daemon = True
+				thread.start()
+
+			try:
+				for position, fragment in enumerate(pending):
+					with cond:
+						while position not in results:
+							cond.wait()
+						result = results.pop(position)
+						shared['appended'] += 1
+						cond.notify_all()
+					if isinstance(result, Exception):
+						raise result
+					if not append(fragment, result, True):
+						return False
+			finally:
+				with cond:
+					shared['abort'] = True
+					cond.notify_all()
+				for thread in threads:
+					thread.join()
+			return True
+
+		try:
+			if concurrency == 1 or len(pending) < 2:
+				return download_sequentially()
+			return download_concurrently()
+		finally:
+			if decrypt_pool is not None:
+				decrypt_pool.shutdown()
 
 	def _append_fragment(self, ctx, frag_content):
 		try:
@@ -116,9 +310,22 @@ class FragmentFD(FileDownloader):
 		finally:
 			if self.__do_ytdl_file(ctx):
 				self._write_ytdl_file(ctx)
-			if not self.params.get('keep_fragments', False):
-				os.remove(encodeFilename(ctx['fragment_filename_sanitized']))
-			del ctx['fragment_filename_sanitized']
+			ctx.pop('fragment_filename_sanitized', None)
+
+	def _make_frag_downloader(self):
+		return HttpQuietDownloader(
+			self.ydl,
+			{
+				'continuedl': True,
+				'quiet': True,
+				'noprogress': True,
+				'ratelimit': self.params.get('ratelimit'),
+				'bandwidth_limiter': self.params.get('bandwidth_limiter'),
+				'retries': self.params.get('retries', 0),
+				'nopart': self.params.get('nopart', False),
+				'test': self.params.get('test', False),
+			}
+		)
 
 	def _prepare_frag_download(self, ctx):
 		if 'live' not in ctx:
@@ -133,18 +340,7 @@ class FragmentFD(FileDownloader):
 		self.to_screen(
 			'[%s] Total fragments: %s' % (self.FD_NAME, total_frags_str))
 		self.report_destination(ctx['filename'])
-		dl = HttpQuietDownloader(
-			self.ydl,
-			{
-				'continuedl': True,
-				'quiet': True,
-				'noprogress': True,
-				'ratelimit': self.params.get('ratelimit'),
-				'retries': self.params.get('retries', 0),
-				'nopart': self.params.get('nopart', False),
-				'test': self.params.get('test', False),
-			}
-		)
+		dl = self._make_frag_downloader()
 		tmpfilename = self.temp_name(ctx['filename'])
 		open_mode = 'wb'
 		resume_len = 0
@@ -229,6 +425,13 @@ class FragmentFD(FileDownloader):
 				state['downloaded_bytes'] += frag_total_bytes - ctx['prev_frag_downloaded_bytes']
 				ctx['complete_frags_downloaded_bytes'] = state['downloaded_bytes']
 				ctx['prev_frag_downloaded_bytes'] = 0
+				if s.get('speed') is not None:
+					# reported by concurrent downloads, which have no per-fragment progress
+					state['speed'] = ctx['speed'] = s['speed']
+					if not ctx['live']:
+						state['eta'] = self.calc_eta(
+							start, time_now, estimated_size,
+							state['downloaded_bytes'])
 			else:
 				frag_downloaded_bytes = s['downloaded_bytes']
 				state['downloaded_bytes'] += frag_downloaded_bytes - ctx['prev_frag_downloaded_bytes']
@@ -242,6 +445,7 @@ class FragmentFD(FileDownloader):
 			self._hook_progress(state)
 
 		ctx['dl'].add_progress_hook(frag_progress_hook)
+		ctx['frag_progress_hook'] = frag_progress_hook
 
 		return start
 
@@ -2,23 +2,24 @@ from __future__ import unicode_literals
 
 import re
 import binascii
+import threading
+import time
 
 try:
 	from Crypto.Cipher import AES
-
-	can_decrypt_frag = True
 except ImportError:
-	can_decrypt_frag = False
+	AES = None  # the pure python implementation is used
 
 from .fragment import FragmentFD
 from .external import FFmpegFD
 
+from ..aes import aes_cbc_decrypt_bytes
 from ..compat import (
-	compat_urllib_error,
 	compat_urlparse,
 	compat_struct_pack,
 )
 from ..utils import (
+	error_to_compat_str,
 	parse_m3u8_attributes,
 	update_url_query,
 )
@@ -51,31 +52,18 @@ class HlsFD(FragmentFD):
 			# 4. https://tools.ietf.org/html/draft-pantos-http-live-streaming-17#section-4.3.3.5
 		)
 		check_results = [not re.search(feature, manifest) for feature in UNSUPPORTED_FEATURES]
-		is_aes128_enc = '#EXT-X-KEY:METHOD=AES-128' in manifest
-		check_results.append(can_decrypt_frag or not is_aes128_enc)
-		check_results.append(not (is_aes128_enc and r'#EXT-X-BYTERANGE' in manifest))
-		check_results.append(not info_dict.get('is_live'))
 		return all(check_results)
 
-	def real_download(self, filename, info_dict):
-		man_url = info_dict['url']
-		self.to_screen('[%s] Downloading m3u8 manifest' % self.FD_NAME)
+	def _parse_fragments(self, s, man_url, info_dict, last_media_sequence=-1, first_frag_index=1):
+		"""
+		Parse the m3u8 media playlist s in a single pass
 
-		urlh = self.ydl.urlopen(self._prepare_url(info_dict, man_url))
-		man_url = urlh.geturl()
-		s = urlh.read().decode('utf-8', 'ignore')
-
-		if not self.can_download(s, info_dict):
-			if info_dict.get('extra_param_to_segment_url'):
-				self.report_error('pycrypto not found. Please install it.')
-				return False
-			self.report_warning(
-				'hlsnative has detected features it does not support, '
-				'extraction will be delegated to ffmpeg')
-			fd = FFmpegFD(self.ydl, self.params)
-			for ph in self._progress_hooks:
-				fd.add_progress_hook(ph)
-			return fd.real_download(filename, info_dict)
+		Returns a dict with the media fragments after last_media_sequence,
+		numbered from first_frag_index (see FragmentFD._download_fragments()),
+		the number of skipped ad fragments among them, the media sequence
+		number of the first and of the last fragment in the playlist, the
+		target duration and whether the playlist has ended.
+		"""
 
 		def is_ad_fragment_start(s):
 			return (s.startswith('#ANVATO-SEGMENT-INFO') and 'type=ad' in s or
@@ -85,128 +73,197 @@ class HlsFD(FragmentFD):
 			return (s.startswith('#ANVATO-SEGMENT-INFO') and 'type=master' in s or
 							s.startswith('#UPLYNK-SEGMENT') and s.endswith(',segment'))
 
-		media_frags = 0
-		ad_frags = 0
-		ad_frag_next = False
-		for line in s.splitlines():
-			line = line.strip()
-			if not line:
-				continue
-			if line.startswith('#'):
-				if is_ad_fragment_start(line):
-					ad_frag_next = True
-				elif is_ad_fragment_end(line):
-					ad_frag_next = False
-				continue
-			if ad_frag_next:
-				ad_frags += 1
-				continue
-			media_frags += 1
-
-		ctx = {
-			'filename': filename,
-			'total_frags': media_frags,
-			'ad_frags': ad_frags,
-		}
-
-		self._prepare_and_start_frag_download(ctx)
-
-		fragment_retries = self.params.get('fragment_retries', 0)
-		skip_unavailable_fragments = self.params.get('skip_unavailable_fragments', True)
-		test = self.params.get('test', False)
-
 		extra_query = None
 		extra_param_to_segment_url = info_dict.get('extra_param_to_segment_url')
 		if extra_param_to_segment_url:
 			extra_query = compat_urlparse.parse_qs(extra_param_to_segment_url)
-		i = 0
+		playlist = {
+			'fragments': [],
+			'ad_frags': 0,
+			'first_media_sequence': None,
+			'last_media_sequence': last_media_sequence,
+			'target_duration': None,
+			'end_list': False,
+		}
+		fragments = playlist['fragments']
 		media_sequence = 0
 		decrypt_info = {'METHOD': 'NONE'}
 		byte_range = {}
-		frag_index = 0
 		ad_frag_next = False
 		for line in s.splitlines():
 			line = line.strip()
-			if line:
-				if not line.startswith('#'):
-					if ad_frag_next:
-						continue
-					frag_index += 1
-					if frag_index <= ctx['fragment_index']:
-						continue
+			if not line:
+				continue
+			if not line.startswith('#'):
+				if playlist['first_media_sequence'] is None:
+					playlist['first_media_sequence'] = media_sequence
+				# fragments of earlier refreshes of a live playlist are only counted
+				if media_sequence <= last_media_sequence:
+					pass
+				elif ad_frag_next:
+					playlist['ad_frags'] += 1
+				else:
 					frag_url = (
 						line
 						if re.match(r'^https?://', line)
 						else compat_urlparse.urljoin(man_url, line))
 					if extra_query:
 						frag_url = update_url_query(frag_url, extra_query)
-					count = 0
-					headers = info_dict.get('http_headers', {})
-					if byte_range:
-						headers['Range'] = 'bytes=%d-%d' % (byte_range['start'], byte_range['end'])
-					while count <= fragment_retries:
-						try:
-							success, frag_content = self._download_fragment(
-								ctx, frag_url, info_dict, headers)
-							if not success:
-								return False
-							break
-						except compat_urllib_error.HTTPError as err:
-							# Unavailable (possibly temporary) fragments may be served.
-							# First we try to retry then either skip or abort.
-							# See https://github.com/rg3/youtube-dl/issues/10165,
-							# https://github.com/rg3/youtube-dl/issues/10448).
-							count += 1
-							if count <= fragment_retries:
-								self.report_retry_fragment(err, frag_index, count, fragment_retries)
-					if count > fragment_retries:
-						if skip_unavailable_fragments:
-							i += 1
-							media_sequence += 1
-							self.report_skip_fragment(frag_index)
-							continue
-						self.report_error(
-							'giving up after %s fragment retries' % fragment_retries)
-						return False
-					if decrypt_info['METHOD'] == 'AES-128':
-						iv = decrypt_info.get('IV') or compat_struct_pack('>8xq', media_sequence)
-						decrypt_info['KEY'] = decrypt_info.get('KEY') or self.ydl.urlopen(
-							self._prepare_url(info_dict, decrypt_info['URI'])).read()
-						frag_content = AES.new(
-							decrypt_info['KEY'], AES.MODE_CBC, iv).decrypt(frag_content)
-					self._append_fragment(ctx, frag_content)
-					# We only download the first fragment during the test
-					if test:
-						break
-					i += 1
-					media_sequence += 1
-				elif line.startswith('#EXT-X-KEY'):
-					decrypt_url = decrypt_info.get('URI')
-					decrypt_info = parse_m3u8_attributes(line[11:])
-					if decrypt_info['METHOD'] == 'AES-128':
-						if 'IV' in decrypt_info:
-							decrypt_info['IV'] = binascii.unhexlify(decrypt_info['IV'][2:].zfill(32))
-						if not re.match(r'^https?://', decrypt_info['URI']):
-							decrypt_info['URI'] = compat_urlparse.urljoin(
-								man_url, decrypt_info['URI'])
-						if extra_query:
-							decrypt_info['URI'] = update_url_query(decrypt_info['URI'], extra_query)
-						if decrypt_url != decrypt_info['URI']:
-							decrypt_info['KEY'] = None
-				elif line.startswith('#EXT-X-MEDIA-SEQUENCE'):
-					media_sequence = int(line[22:])
-				elif line.startswith('#EXT-X-BYTERANGE'):
-					splitted_byte_range = line[17:].split('@')
-					sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else byte_range['end']
-					byte_range = {
-						'start': sub_range_start,
-						'end': sub_range_start + int(splitted_byte_range[0]),
+					fragment = {
+						'frag_index': first_frag_index + len(fragments),
+						'url': frag_url,
+						'decrypt_info': decrypt_info,
+						'media_sequence': media_sequence,
 					}
-				elif is_ad_fragment_start(line):
-					ad_frag_next = True
-				elif is_ad_fragment_end(line):
-					ad_frag_next = False
+					# the other fragments use the http_headers of info_dict
+					if byte_range:
+						fragment['headers'] = dict(info_dict.get('http_headers', {}))
+						fragment['headers']['Range'] = 'bytes=%d-%d' % (byte_range['start'], byte_range['end'] - 1)
+					fragments.append(fragment)
+				playlist['last_media_sequence'] = max(media_sequence, playlist['last_media_sequence'])
+				media_sequence += 1
+			elif line.startswith('#EXT-X-KEY'):
+				decrypt_info = parse_m3u8_attributes(line[11:])
+				if decrypt_info['METHOD'] == 'AES-128':
+					if 'IV' in decrypt_info:
+						decrypt_info['IV'] = binascii.unhexlify(decrypt_info['IV'][2:].zfill(32))
+					if not re.match(r'^https?://', decrypt_info['URI']):
+						decrypt_info['URI'] = compat_urlparse.urljoin(
+							man_url, decrypt_info['URI'])
+					if extra_query:
+						decrypt_info['URI'] = update_url_query(decrypt_info['URI'], extra_query)
+			elif line.startswith('#EXT-X-MEDIA-SEQUENCE'):
+				media_sequence = int(line[22:])
+			elif line.startswith('#EXT-X-TARGETDURATION'):
+				playlist['target_duration'] = float(line[22:])
+			elif line.startswith('#EXT-X-ENDLIST'):
+				playlist['end_list'] = True
+			elif line.startswith('#EXT-X-BYTERANGE'):
+				splitted_byte_range = line[17:].split('@')
+				sub_range_start = int(splitted_byte_range[1]) if len(splitted_byte_range) == 2 else byte_range['end']
+				byte_range = {
+					'start': sub_range_start,
+					'end': sub_range_start + int(splitted_byte_range[0]),
+				}
+			elif is_ad_fragment_start(line):
+				ad_frag_next = True
+			elif is_ad_fragment_end(line):
+				ad_frag_next = False
+		return playlist
+
+	def _download_manifest(self, man_url, info_dict):
+		urlh = self.ydl.urlopen(self._prepare_url(info_dict, man_url))
+		return urlh.geturl(), urlh.read().decode('utf-8', 'ignore')
+
+	def real_download(self, filename, info_dict):
+		man_url = info_dict['url']
+		self.to_screen('[%s] Downloading m3u8 manifest' % self.FD_NAME)
+
+		man_url, s = self._download_manifest(man_url, info_dict)
+
+		if not self.can_download(s, info_dict):
+			if info_dict.get('extra_param_to_segment_url'):
+				self.report_error('hlsnative does not support the encryption of this stream.')
+				return False
+			self.report_warning(
+				'hlsnative has detected features it does not support, '
+				'extraction will be delegated to ffmpeg')
+			fd = FFmpegFD(self.ydl, self.params)
+			for ph in self._progress_hooks:
+				fd.add_progress_hook(ph)
+			return fd.real_download(filename, info_dict)
+
+		playlist = self._parse_fragments(s, man_url, info_dict)
+		fragments = playlist['fragments']
+		if self.params.get('test', False):
+			# We only download the first fragment during the test
+			fragments = fragments[:1]
+			playlist['end_list'] = True
+		# live playlists are refreshed until they end
+		live = bool(info_dict.get('is_live')) and not playlist['end_list']
+
+		ctx = {
+			'filename': filename,
+			'total_frags': len(fragments),
+			'ad_frags': playlist['ad_frags'],
+			'live': live,
+		}
+
+		self._prepare_and_start_frag_download(ctx)
+
+		keys = {}  # {key uri: key}
+		keys_lock = threading.Lock()
+
+		def get_key(uri):
+			# the fragments are decrypted in several threads, each key is only fetched once
+			with keys_lock:
+				if uri not in keys:
+					keys[uri] = self.ydl.urlopen(self._prepare_url(info_dict, uri)).read()
+				return keys[uri]
+
+		def decrypt_fragment(frag_content, fragment):
+			decrypt_info = fragment['decrypt_info']
+			if decrypt_info['METHOD'] != 'AES-128':
+				return frag_content
+			iv = decrypt_info.get('IV') or compat_struct_pack('>8xq', fragment['media_sequence'])
+			key = get_key(decrypt_info['URI'])
+			if AES is None:
+				return aes_cbc_decrypt_bytes(frag_content, key, iv)
+			return AES.new(key, AES.MODE_CBC, iv).decrypt(frag_content)
+
+		def download_fragments(fragments):
+			is_encrypted = any(f['decrypt_info']['METHOD'] == 'AES-128' for f in fragments)
+			return self._download_fragments(
+				ctx, fragments, info_dict, decrypt_func=decrypt_fragment if is_encrypted else None)
+
+		if not live:
+			if not download_fragments(fragments):
+				return False
+		else:
+			try:
+				if not self._download_live_fragments(ctx, man_url, info_dict, playlist, download_fragments):
+					return False
+			except KeyboardInterrupt:
+				# like for ffmpeg, what has been recorded of a live stream is kept
+				self.to_screen('[%s] Interrupted by user' % self.FD_NAME)
 
 		self._finish_frag_download(ctx)
 
 		return True
+
+	def _download_live_fragments(self, ctx, man_url, info_dict, playlist, download_fragments):
+		"""
+		Download the fragments of playlist and those that are appended to the
+		live playlist at man_url, until it ends or stops being updated
+		"""
+		target_duration = playlist['target_duration'] or 10
+		refreshed = last_update = time.time()
+		while True:
+			if not download_fragments(playlist['fragments']):
+				return False
+			if playlist['end_list']:
+				return True
+			if playlist['fragments'] or playlist['ad_frags']:
+				last_update = refreshed
+				# the server adds a fragment within the target duration, otherwise check again sooner
+				delay = target_duration
+			elif time.time() - last_update > 3 * target_duration:
+				self.to_screen('[%s] Live playlist has not been updated, stopping' % self.FD_NAME)
+				return True
+			else:
+				delay = target_duration / 2
+			time.sleep(max(refreshed + delay - time.time(), 0))
+			refreshed = time.time()
+			last_media_sequence = playlist['last_media_sequence']
+			try:
+				man_url, s = self._download_manifest(man_url, info_dict)
+			except IOError as err:
+				self.report_warning('Refreshing the live playlist failed: %s' % error_to_compat_str(err))
+				playlist = dict(playlist, fragments=[], ad_frags=0)
+				continue
+			playlist = self._parse_fragments(
+				s, man_url, info_dict, last_media_sequence, ctx['fragment_index'] + 1)
+			target_duration = playlist['target_duration'] or target_duration
+			missed = (playlist['first_media_sequence'] or 0) - last_media_sequence - 1
+			if missed > 0:
+				self.report_warning('%d fragments of the live stream were missed' % missed)
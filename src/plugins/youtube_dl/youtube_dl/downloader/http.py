@@ -1,8 +1,11 @@
 from __future__ import unicode_literals
 
 import errno
+import io
+import json
 import os
 import socket
+import threading
 import time
 import random
 import re
@@ -11,6 +14,7 @@ from .common import FileDownloader
 from ..compat import (
 	compat_str,
 	compat_urllib_error,
+	compat_urllib_parse_urlparse,
 )
 from ..utils import (
 	ContentTooShortError,
@@ -25,6 +29,26 @@ from ..utils import (
 
 
 class HttpFD(FileDownloader):
+	"""
+  Downloader for plain HTTP(S) resources.
+
+  Instead of a filename, real_download() also accepts a writable file object
+  (e.g. io.BytesIO), which is written to without any temporary file.
+
+  Available options (besides those of FileDownloader):
+
+  http_connections:   Number of connections a single download is split into.
+                      Byte ranges are fetched in parallel and written to their
+                      offsets in a preallocated file. Completed ranges are
+                      recorded in the .ytdl file, so resuming only fetches the
+                      missing ones. Falls back to a single connection if the
+                      server does not support ranges (default is 1)
+  """
+
+	# limits for the size of the byte ranges of a segmented download
+	_MIN_SEGMENT_SIZE = 1024 * 1024
+	_MAX_SEGMENT_SIZE = 16 * 1024 * 1024
+
 	def real_download(self, filename, info_dict):
 		url = info_dict['url']
 
@@ -35,8 +59,12 @@ class HttpFD(FileDownloader):
 
 		ctx = DownloadContext()
 		ctx.filename = filename
-		ctx.tmpfilename = self.temp_name(filename)
+		host = compat_urllib_parse_urlparse(url).hostname
+		ctx.to_stream = hasattr(filename, 'write')
+		ctx.tmpfilename = filename if ctx.to_stream else self.temp_name(filename)
 		ctx.stream = None
+		# where the download starts within a stream, it is written again from there when a resume fails
+		ctx.stream_start = filename.tell() if ctx.to_stream else None
 
 		# Do not include the Accept-Encoding header
 		headers = {'Youtubedl-no-compression': 'True'}
@@ -45,6 +73,16 @@ class HttpFD(FileDownloader):
 			headers.update(add_headers)
 
 		is_test = self.params.get('test', False)
+		connections = self.params.get('http_connections') or 1
+		to_file = not ctx.to_stream and filename != '-'
+		# the .part file of a segmented download is preallocated, so its size is no resume length for a single
+		# connection; such a download is resumed segmented, even with a single connection
+		segments_state = to_file and self.params.get('continuedl', True) and self._read_segments_file(filename)
+		if (connections > 1 or segments_state) and not is_test and to_file:
+			result = self._download_segmented(filename, info_dict, headers, connections)
+			if result is not None:
+				return result
+
 		chunk_size = self._TEST_FILE_SIZE if is_test else (
 			info_dict.get('downloader_options', {}).get('http_chunk_size') or
 			self.params.get('http_chunk_size') or 0)
@@ -56,7 +94,10 @@ class HttpFD(FileDownloader):
 		ctx.start_time = time.time()
 		ctx.chunk_size = None
 
-		if self.params.get('continuedl', True):
+		if to_file and os.path.isfile(encodeFilename(self.ytdl_filename(filename))):
+			# left by a segmented download that could not be resumed, the download starts over
+			os.remove(encodeFilename(self.ytdl_filename(filename)))
+		elif self.params.get('continuedl', True) and not ctx.to_stream:
 			# Establish possible resume length
 			if os.path.isfile(encodeFilename(ctx.tmpfilename)):
 				ctx.resume_len = os.path.getsize(
@@ -77,6 +118,16 @@ class HttpFD(FileDownloader):
 		class NextFragment(Exception):
 			pass
 
+		def restart():
+			# resuming is not possible, so the download starts over; 'wb' truncates a file,
+			# but a stream has to be truncated here or the bytes written so far would stay in front
+			self.report_unable_to_resume()
+			ctx.resume_len = 0
+			ctx.open_mode = 'wb'
+			if ctx.to_stream:
+				filename.seek(ctx.stream_start)
+				filename.truncate()
+
 		def set_range(req, start, end):
 			range_header = 'bytes=%d-' % start
 			if end:
@@ -134,9 +185,7 @@ class HttpFD(FileDownloader):
 					# Content-Range is either not present or invalid. Assuming remote webserver is
 					# trying to send the whole file, resume is not possible, so wiping the local file
 					# and performing entire redownload
-					self.report_unable_to_resume()
-					ctx.resume_len = 0
-					ctx.open_mode = 'wb'
+					restart()
 				ctx.data_len = int_or_none(ctx.data.info().get('Content-length', None))
 				return
 			except (compat_urllib_error.HTTPError,) as err:
@@ -172,9 +221,7 @@ class HttpFD(FileDownloader):
 							raise SucceedDownload()
 						else:
 							# The length does not match, we start the download over
-							self.report_unable_to_resume()
-							ctx.resume_len = 0
-							ctx.open_mode = 'wb'
+							restart()
 							return
 				elif err.code < 500 or err.code >= 600:
 					# Unexpected HTTP error
@@ -211,7 +258,7 @@ class HttpFD(FileDownloader):
 					return False
 
 			byte_counter = 0 + ctx.resume_len
-			block_size = ctx.block_size
+			block_size = self.limit_block_size(ctx.block_size, host)
 			start = time.time()
 
 			# measure time over whole while-loop, so slow_down() and best_block_size() work together properly
@@ -219,7 +266,7 @@ class HttpFD(FileDownloader):
 			before = start  # start measuring
 
 			def retry(e):
-				to_stdout = ctx.tmpfilename == '-'
+				to_stdout = ctx.tmpfilename == '-' or ctx.to_stream
 				if not to_stdout:
 					ctx.stream.close()
 				ctx.stream = None
@@ -246,7 +293,9 @@ class HttpFD(FileDownloader):
 					break
 
 				# Open destination file just in time
-				if ctx.stream is None:
+				if ctx.stream is None and ctx.to_stream:
+					ctx.stream = filename
+				elif ctx.stream is None:
 					try:
 						ctx.stream, ctx.tmpfilename = sanitize_open(
 							ctx.tmpfilename, ctx.open_mode)
@@ -272,6 +321,7 @@ class HttpFD(FileDownloader):
 
 				# Apply rate limit
 				self.slow_down(start, now, byte_counter - ctx.resume_len)
+				self.throttle(len(data_block), host)
 
 				# end measuring of one loop run
 				now = time.time()
@@ -280,6 +330,7 @@ class HttpFD(FileDownloader):
 				# Adjust block size
 				if not self.params.get('noresizebuffer', False):
 					block_size = self.best_block_size(after - before, len(data_block))
+				block_size = self.limit_block_size(block_size, host)
 
 				before = after
 
@@ -313,7 +364,7 @@ class HttpFD(FileDownloader):
 				self.to_stderr('\n')
 				self.report_error('Did not get any data blocks')
 				return False
-			if ctx.tmpfilename != '-':
+			if ctx.tmpfilename != '-' and not ctx.to_stream:
 				ctx.stream.close()
 
 			if data_len is not None and byte_counter != data_len:
@@ -325,7 +376,7 @@ class HttpFD(FileDownloader):
 			self.try_rename(ctx.tmpfilename, ctx.filename)
 
 			# Update file modification time
-			if self.params.get('updatetime', True):
+			if self.params.get('updatetime', True) and not ctx.to_stream:
 				info_dict['filetime'] = self.try_utime(ctx.filename, ctx.data.info().get('last-modified', None))
 
 			self._hook_progress({
@@ -354,3 +405,193 @@ class HttpFD(FileDownloader):
 
 		self.report_error('giving up after %s retries' % retries)
 		return False
+
+	def _read_segments_file(self, filename):
+		try:
+			with io.open(encodeFilename(self.ytdl_filename(filename)), 'r', encoding='utf-8') as stream:
+				return json.loads(stream.read())['downloader']
+		except (IOError, OSError, ValueError, KeyError, TypeError):
+			return None
+
+	def _write_segments_file(self, filename, total_bytes, segment_size, completed):
+		stream, _ = sanitize_open(self.ytdl_filename(filename), 'w')
+		stream.write(json.dumps({
+			'downloader': {
+				'total_bytes': total_bytes,
+				'segment_size': segment_size,
+				'completed_segments': sorted(completed),
+			},
+		}))
+		stream.close()
+
+	def _download_segmented(self, filename, info_dict, headers, connections):
+		"""
+		Download byte ranges of the resource over several connections at once
+
+		Returns None if the server ignores Range requests or if a partial
+		download of a single connection exists (the caller shall fall back to
+		a single connection), True on success and False otherwise.
+		"""
+		url = info_dict['url']
+		host = compat_urllib_parse_urlparse(url).hostname
+		tmpfilename = self.temp_name(filename)
+		continuedl = self.params.get('continuedl', True)
+		state = self._read_segments_file(filename) if continuedl else None
+		if state is None and continuedl and os.path.isfile(encodeFilename(tmpfilename)):
+			return None
+
+		request = sanitized_Request(url, None, headers)
+		request.add_header('Range', 'bytes=0-0')
+		try:
+			probe = self.ydl.urlopen(request)
+		except compat_urllib_error.HTTPError:
+			return None
+		content_range = probe.headers.get('Content-Range')
+		last_modified = probe.headers.get('last-modified')
+		probe.close()
+		mobj = re.search(r'bytes 0-0/(\d+)', content_range or '')
+		if not mobj:
+			return None
+		data_len = int(mobj.group(1))
+		if data_len < 2 * self._MIN_SEGMENT_SIZE:
+			# not worth it
+			return None
+
+		min_data_len = self.params.get('min_filesize')
+		max_data_len = self.params.get('max_filesize')
+		if min_data_len is not None and data_len < min_data_len:
+			self.to_screen('\r[download] File is smaller than min-filesize (%s bytes < %s bytes). Aborting.' % (
+				data_len, min_data_len))
+			return False
+		if max_data_len is not None and data_len > max_data_len:
+			self.to_screen(
+				'\r[download] File is larger than max-filesize (%s bytes > %s bytes). Aborting.' % (data_len, max_data_len))
+			return False
+
+		completed = set()
+		segment_size = min(max(-(-data_len // connections), self._MIN_SEGMENT_SIZE), self._MAX_SEGMENT_SIZE)
+		if (state is not None and state.get('total_bytes') == data_len and
+						os.path.isfile(encodeFilename(tmpfilename)) and
+						os.path.getsize(encodeFilename(tmpfilename)) == data_len):
+			segment_size = state['segment_size']
+			completed = set(state['completed_segments'])
+		segments = [
+			(start, min(start + segment_size, data_len) - 1)
+			for start in range(0, data_len, segment_size)]
+		if completed:
+			self.to_screen('[download] Resuming download, %d of %d segments are complete' % (
+				len(completed), len(segments)))
+
+		try:
+			stream, tmpfilename = sanitize_open(tmpfilename, 'r+b' if completed else 'wb')
+			stream.truncate(data_len)
+			stream.close()
+		except (OSError, IOError) as err:
+			self.report_error('unable to open for writing: %s' % str(err))
+			return False
+		filename = self.undo_temp_name(tmpfilename)
+		self.report_destination(filename)
+		self._write_segments_file(filename, data_len, segment_size, completed)
+
+		lock = threading.Lock()
+		todo = [i for i in range(len(segments)) if i not in completed]
+		resume_len = sum(segments[i][1] - segments[i][0] + 1 for i in completed)
+		shared = {'downloaded': resume_len, 'error': None}
+		retries = self.params.get('retries', 0)
+		block_size = self.params.get('buffersize', 1024)
+		start_time = time.time()
+
+		def fetch_segment(index, stream):
+			start, end = segments[index]
+			count = 0
+			while True:
+				offset = start
+				try:
+					request = sanitized_Request(url, None, headers)
+					request.add_header('Range', 'bytes=%d-%d' % (start, end))
+					data = self.ydl.urlopen(request)
+					content_range = data.headers.get('Content-Range') or ''
+					if not content_range.startswith('bytes %d-' % start):
+						raise ContentTooShortError(0, end - start + 1)
+					stream.seek(start)
+					read_size = self.limit_block_size(block_size, host)
+					while offset <= end:
+						data_block = data.read(min(read_size, end + 1 - offset))
+						if not data_block:
+							break
+						stream.write(data_block)
+						offset += len(data_block)
+						with lock:
+							shared['downloaded'] += len(data_block)
+							byte_counter = shared['downloaded'] - resume_len
+						# the rate limit applies to all connections together
+						self.slow_down(start_time, None, byte_counter)
+						self.throttle(len(data_block), host)
+						read_size = self.limit_block_size(block_size, host)
+					if offset <= end:
+						raise ContentTooShortError(offset - start, end - start + 1)
+					return
+				except (compat_urllib_error.HTTPError, socket.error, ContentTooShortError) as err:
+					if isinstance(err, compat_urllib_error.HTTPError) and (err.code < 500 or err.code >= 600):
+						raise
+					with lock:
+						shared['downloaded'] -= offset - start
+					count += 1
+					if count > retries:
+						raise
+					self.report_retry(err, count, retries)
+
+		def worker():
+			with io.open(encodeFilename(tmpfilename), 'r+b') as stream:
+				while True:
+					with lock:
+						if not todo or shared['error'] is not None:
+							return
+						index = todo.pop(0)
+					try:
+						fetch_segment(index, stream)
+						stream.flush()
+					except Exception as err:
+						with lock:
+							shared['error'] = err
+						return
+					with lock:
+						completed.add(index)
+						self._write_segments_file(filename, data_len, segment_size, completed)
+
+		threads = [threading.Thread(target=worker) for _ in range(min(connections, len(todo)))]
+		for thread in threads:
+			thread.daemon = True
+			thread.start()
+		while True:
+			alive = [thread for thread in threads if thread.is_alive()]
+			if not alive:
+				break
+			alive[0].join(0.5)
+			now = time.time()
+			downloaded = shared['downloaded']
+			self._hook_progress({
+				'status': 'downloading',
+				'downloaded_bytes': downloaded,
+				'total_bytes': data_len,
+				'tmpfilename': tmpfilename,
+				'filename': filename,
+				'eta': self.calc_eta(start_time, now, data_len - resume_len, downloaded - resume_len),
+				'speed': self.calc_speed(start_time, now, downloaded - resume_len),
+				'elapsed': now - start_time,
+			})
+		if shared['error'] is not None:
+			raise shared['error']
+
+		os.remove(encodeFilename(self.ytdl_filename(filename)))
+		self.try_rename(tmpfilename, filename)
+		if self.params.get('updatetime', True):
+			info_dict['filetime'] = self.try_utime(filename, last_modified)
+		self._hook_progress({
+			'downloaded_bytes': data_len,
+			'total_bytes': data_len,
+			'filename': filename,
+			'status': 'finished',
+			'elapsed': time.time() - start_time,
+		})
+		return True
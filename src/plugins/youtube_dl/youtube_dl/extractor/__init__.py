@@ -1,5 +1,18 @@
 from __future__ import unicode_literals
 
+import re
+
+try:
+	from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+	import sre_parse
+
+from ..compat import (
+	compat_chr,
+	compat_str,
+)
+from .common import InfoExtractor
+
 try:
 	from .lazy_extractors import *
 	from .lazy_extractors import _ALL_CLASSES
@@ -45,3 +58,193 @@ def list_extractors(age_limit):
 def get_info_extractor(ie_name):
 	"""Returns the info extractor class with the given ie_name"""
 	return globals()[ie_name + 'IE']
+
+
+_ALNUM_RE = re.compile(r'[A-Za-z0-9]')
+_SEPARATOR_RE = re.compile(r'[^A-Za-z0-9]+')
+_URL_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_REPEATS = tuple(
+	getattr(sre_parse, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+	if hasattr(sre_parse, name))
+_DEFAULT_SUITABLE = set([InfoExtractor.suitable.__func__])
+if _LAZY_LOADER:
+	_DEFAULT_SUITABLE.add(LazyLoadExtractor.suitable.__func__)
+# longer prefixes are cut, which only makes them match more URLs
+_MAX_PREFIX_LENGTH = 8
+
+
+def _is_separator(code):
+	return _ALNUM_RE.match(compat_chr(code)) is None
+
+
+def _flatten(parsed):
+	# a group is matched in sequence just like its contents
+	for op, av in parsed:
+		if op == sre_parse.SUBPATTERN:
+			for item in _flatten(av[-1]):
+				yield item
+		else:
+			yield op, av
+
+
+def _run_requirements(run, left_bounded):
+	pieces = _SEPARATOR_RE.split(run)
+	# only pieces followed by a separator within the run are complete tokens
+	keys = [('=', piece.lower()) for piece in pieces[1:-1] if piece]
+	if left_bounded and pieces[0]:
+		if len(pieces) > 1:
+			keys.append(('=', pieces[0].lower()))
+		else:
+			keys.append(('^', pieces[0][:_MAX_PREFIX_LENGTH].lower()))
+	return keys
+
+
+def _scan(parsed, bounded):
+	"""
+  Return the requirements that every string matching the parsed regular
+  expression fulfills and whether it ends with a separator (a character other
+  than an ASCII letter or digit), given whether it is preceded by one (or
+  by nothing at all).
+
+  A requirement is either a key, ('=', token) for a complete token (a run of
+  letters and digits between separators) or ('^', prefix) for a token
+  starting with prefix, or ('|', alternatives) if one of the lists of
+  requirements in alternatives applies. Errs on the side of returning less.
+  """
+	clauses = []
+	run = []
+	left_bounded = False
+	for op, av in _flatten(parsed):
+		if op == sre_parse.LITERAL:
+			if not run:
+				left_bounded = bounded
+			run.append(compat_chr(av))
+			bounded = _is_separator(av)
+			continue
+		if op == sre_parse.AT:
+			# zero-width, ^ or $ within a literal only make it unmatchable
+			continue
+		if run:
+			clauses.extend(_run_requirements(''.join(run), left_bounded))
+			run = []
+		if op == sre_parse.BRANCH:
+			alternatives = [_scan(alternative, bounded) for alternative in av[1]]
+			if all(alt_clauses for alt_clauses, _ in alternatives):
+				clauses.append(('|', [alt_clauses for alt_clauses, _ in alternatives]))
+			bounded = all(alt_bounded for _, alt_bounded in alternatives)
+		elif op in _REPEATS:
+			rep_clauses, rep_bounded = _scan(av[2], False)
+			if av[0] >= 1:
+				clauses.extend(rep_clauses)
+				bounded = rep_bounded
+			else:
+				bounded = bounded and rep_bounded
+		elif op == sre_parse.IN:
+			bounded = all(o == sre_parse.LITERAL and _is_separator(a) for o, a in av)
+		else:
+			bounded = False
+	if run:
+		clauses.extend(_run_requirements(''.join(run), left_bounded))
+	return clauses, bounded
+
+
+_REQUIREMENTS_CACHE = {}
+
+
+def _extractor_requirements(ie):
+	klass = ie if isinstance(ie, type) else type(ie)
+	clauses = _REQUIREMENTS_CACHE.get(klass)
+	if clauses is None:
+		clauses = []
+		valid_url = getattr(klass, '_VALID_URL', None)
+		# an extractor with its own suitable() may accept URLs _VALID_URL does not
+		if (klass.suitable.__func__ in _DEFAULT_SUITABLE and
+				isinstance(valid_url, compat_str)):
+			try:
+				clauses = _scan(sre_parse.parse(valid_url), True)[0]
+			except Exception:
+				pass
+		_REQUIREMENTS_CACHE[klass] = clauses
+	return clauses
+
+
+def _requirement_keys(requirement):
+	if requirement[0] != '|':
+		return set([requirement])
+	return set().union(*(
+		_requirement_keys(r) for alternative in requirement[1] for r in alternative))
+
+
+class ExtractorIndex(object):
+	"""
+  Narrows down the extractors that may be suitable for a URL.
+
+  Every string matching the _VALID_URL of an extractor contains certain
+  tokens, e.g. "vimeo" for r'https?://(?:www\\.)?vimeo\\.com/'. Each extractor
+  is indexed by its most selective requirement, so only the extractors
+  indexed by the tokens of a URL and those without any requirement need to
+  be tried. Candidates keep the order in which extractors were added, with
+  the exception of GenericIE, which always comes last.
+  """
+
+	def __init__(self, ies=()):
+		ies = list(ies)
+		self._key_counts = {}
+		for ie in ies:
+			for key in set().union(*map(_requirement_keys, _extractor_requirements(ie))):
+				self._key_counts[key] = self._key_counts.get(key, 0) + 1
+		self._count = 0
+		self._by_key = {}
+		self._unindexed = []
+		self._all = []
+		for ie in ies:
+			self.add(ie)
+
+	def _select(self, requirements):
+		""" Return the cost and keys of the most selective of requirements """
+		best = None
+		for requirement in requirements:
+			if requirement[0] == '|':
+				selected = [self._select(alternative) for alternative in requirement[1]]
+				cost = sum(c for c, _ in selected)
+				keys = set().union(*(k for _, k in selected))
+			else:
+				# short prefixes match too many URLs, no matter how rare they are
+				cost = self._key_counts.get(requirement, 0) + (
+					100 if requirement[0] == '^' and len(requirement[1]) < 4 else 0)
+				keys = set([requirement])
+			if best is None or (cost, sorted(keys)) < (best[0], sorted(best[1])):
+				best = cost, keys
+		return best
+
+	def add(self, ie):
+		""" Add an extractor (class or instance) behind all others """
+		position = float('inf') if ie.ie_key() == 'Generic' else self._count
+		self._count += 1
+		entry = (position, ie)
+		self._all.append(entry)
+		requirements = _extractor_requirements(ie)
+		if not requirements:
+			self._unindexed.append(entry)
+			return
+		for key in self._select(requirements)[1]:
+			self._by_key.setdefault(key, []).append(entry)
+
+	def candidates(self, url):
+		""" Return the extractors that may be suitable for url, in order """
+		if not isinstance(url, compat_str) or re.search(r'[^\x00-\x7f]', url):
+			# non-ASCII characters may match ASCII ones case-insensitively
+			entries = self._all
+		else:
+			found = {}
+			for entry in self._unindexed:
+				found[id(entry)] = entry
+			for token in set(_URL_TOKEN_RE.findall(url.lower())):
+				keys = [('=', token)] + [
+					('^', token[:length])
+					for length in range(1, min(len(token), _MAX_PREFIX_LENGTH) + 1)]
+				for key in keys:
+					for entry in self._by_key.get(key, ()):
+						found[id(entry)] = entry
+			entries = found.values()
+		return [ie for _, ie in sorted(entries, key=lambda entry: entry[0])]
@@ -1107,9 +1107,9 @@ class YoutubeIE(YoutubeBaseInfoExtractor):
 		}
 	]
 
-	def __init__(self, *args, **kwargs):
-		super(YoutubeIE, self).__init__(*args, **kwargs)
-		self._player_cache = {}
+	# signature functions by player, shared by all instances so that each
+	# player is only downloaded and compiled once per process
+	_player_cache = {}
 
 	def report_video_info_webpage_download(self, video_id):
 		"""Report attempt to download video info webpage."""
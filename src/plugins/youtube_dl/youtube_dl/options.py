@@ -267,6 +267,15 @@ def parseOpts(overrideArguments=None):
 		'--playlist-items',
 		dest='playlist_items', metavar='ITEM_SPEC', default=None,
 		help='Playlist video items to download. Specify indices of the videos in the playlist separated by commas like: "--playlist-items 1,2,5,8" if you want to download videos indexed 1, 2, 5, 8 in the playlist. You can specify range: "--playlist-items 1-3,7,10-13", it will download the videos at index 1, 2, 3, 7, 10, 11, 12 and 13.')
+	selection.add_option(
+		'--concurrent-extractions',
+		dest='concurrent_extractions', metavar='N', default=1, type=int,
+		help='Number of playlist videos to extract at the same time (default is %default). '
+				 'Videos are still downloaded one after another in playlist order')
+	selection.add_option(
+		'--playlist-prefetch',
+		dest='playlist_prefetch', metavar='N', default=0, type=int,
+		help='Number of playlist pages to fetch ahead in parallel, for sites which support it (default is %default)')
 	selection.add_option(
 		'--match-title',
 		dest='matchtitle', metavar='REGEX',
@@ -470,6 +479,10 @@ def parseOpts(overrideArguments=None):
 		'--abort-on-unavailable-fragment',
 		action='store_false', dest='skip_unavailable_fragments',
 		help='Abort downloading when some fragment is not available')
+	downloader.add_option(
+		'--concurrent-fragments',
+		dest='concurrent_fragment_downloads', metavar='N', default=1, type=int,
+		help='Number of fragments to download at the same time (default is %default) (DASH, hlsnative and ISM)')
 	downloader.add_option(
 		'--keep-fragments',
 		action='store_true', dest='keep_fragments', default=False,
@@ -487,6 +500,11 @@ def parseOpts(overrideArguments=None):
 		dest='http_chunk_size', metavar='SIZE', default=None,
 		help='Size of a chunk for chunk-based HTTP downloading (e.g. 10485760 or 10M) (default is disabled). '
 				 'May be useful for bypassing bandwidth throttling imposed by a webserver (experimental)')
+	downloader.add_option(
+		'--http-connections',
+		dest='http_connections', metavar='N', default=1, type=int,
+		help='Number of connections to split a single HTTP download into (default is %default). '
+				 'Byte ranges are downloaded in parallel, resuming only downloads missing ranges')
 	downloader.add_option(
 		'--test',
 		action='store_true', dest='test', default=False,
@@ -499,6 +517,11 @@ def parseOpts(overrideArguments=None):
 		'--playlist-random',
 		action='store_true',
 		help='Download playlist videos in random order')
+	downloader.add_option(
+		'--lazy-playlist',
+		action='store_true', dest='lazy_playlist', default=False,
+		help='Process playlist videos as they are received instead of collecting them first. '
+				 'Keeps memory usage constant for very long playlists, but the number of videos is unknown in advance')
 	downloader.add_option(
 		'--xattr-set-filesize',
 		dest='xattr_set_filesize', action='store_true',
@@ -506,7 +529,7 @@ def parseOpts(overrideArguments=None):
 	downloader.add_option(
 		'--hls-prefer-native',
 		dest='hls_prefer_native', action='store_true', default=None,
-		help='Use the native HLS downloader instead of ffmpeg')
+		help='Use the native HLS downloader instead of ffmpeg, also for live streams')
 	downloader.add_option(
 		'--hls-prefer-ffmpeg',
 		dest='hls_prefer_native', action='store_false', default=None,
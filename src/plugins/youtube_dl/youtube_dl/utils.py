@@ -7,6 +7,7 @@ import base64
 import binascii
 import calendar
 import codecs
+import collections
 import contextlib
 import ctypes
 import datetime
@@ -25,15 +26,22 @@ import os
 import platform
 import random
 import re
+import select
 import socket
 import ssl
 import subprocess
 import sys
 import tempfile
+import threading
 import traceback
 import xml.etree.ElementTree
 import zlib
 
+try:
+	import sqlite3
+except ImportError:  # Python built without SQLite
+	sqlite3 = None
+
 from .compat import (
 	compat_HTMLParseError,
 	compat_HTMLParser,
@@ -942,6 +950,148 @@ def _create_http_connection(ydl_handler, http_class, is_https, *args, **kwargs):
 	return hc
 
 
+class HTTPConnectionPool(object):
+	"""
+	Idle persistent HTTP(S) connections shared by the handlers of one opener.
+
+	Connections are keyed by everything that determines where they lead to:
+	scheme, host, tunnel host (HTTPS over HTTP proxies) and SOCKS proxy.
+	hits counts requests that reused an idle connection, misses those that
+	had to open a new one.
+	"""
+
+	def __init__(self, max_idle_per_host=8):
+		self.max_idle_per_host = max_idle_per_host
+		self.hits = 0
+		self.misses = 0
+		self._idle = {}
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def _is_alive(conn):
+		if conn.sock is None:
+			return False
+		try:
+			# an idle connection must not have anything to read: either the
+			# server has closed it or it sent garbage
+			readable, _, _ = select.select([conn.sock], [], [], 0)
+		except (socket.error, ValueError):
+			return False
+		return not readable
+
+	def get(self, key):
+		"""Return an idle connection for key or None if a new one is needed"""
+		while True:
+			with self._lock:
+				conns = self._idle.get(key)
+				if not conns:
+					self.misses += 1
+					return None
+				conn = conns.pop()
+			if self._is_alive(conn):
+				with self._lock:
+					self.hits += 1
+				return conn
+			conn.close()
+
+	def put(self, key, conn):
+		with self._lock:
+			conns = self._idle.setdefault(key, [])
+			if len(conns) < self.max_idle_per_host:
+				conns.append(conn)
+				return
+		conn.close()
+
+	def clear(self):
+		with self._lock:
+			conns = [conn for key_conns in self._idle.values() for conn in key_conns]
+			self._idle.clear()
+		for conn in conns:
+			conn.close()
+
+
+class _PooledHTTPResponse(compat_http_client.HTTPResponse):
+	# Called with True once the body has been read completely (the connection
+	# may serve the next request) or with False if the response is closed early
+	_pool_release = None
+
+	def close(self):
+		release, self._pool_release = self._pool_release, None
+		compat_http_client.HTTPResponse.close(self)
+		if release is not None:
+			release(False)
+
+	def _close_conn(self):
+		compat_http_client.HTTPResponse._close_conn(self)
+		release, self._pool_release = self._pool_release, None
+		if release is not None:
+			release(not self.will_close)
+
+
+def _pooled_open(ydl_handler, http_class, pool_key, req, **kwargs):
+	"""
+	Like AbstractHTTPHandler.do_open(), but take the connection from
+	ydl_handler._connection_pool and return it there as soon as the response
+	has been read completely, unless either side asked for Connection: close.
+	"""
+	host = req.host
+	if not host:
+		raise compat_urllib_error.URLError('no host given')
+	pool = ydl_handler._connection_pool
+	key = pool_key + (host, req._tunnel_host)
+
+	headers = dict(req.unredirected_hdrs)
+	headers.update(dict((k, v) for k, v in req.headers.items() if k not in headers))
+	headers = dict((name.title(), val) for name, val in headers.items())
+	tunnel_headers = {}
+	if req._tunnel_host and 'Proxy-Authorization' in headers:
+		tunnel_headers['Proxy-Authorization'] = headers.pop('Proxy-Authorization')
+	request_kwargs = {}
+	if sys.version_info >= (3, 6):
+		request_kwargs['encode_chunked'] = req.has_header('Transfer-encoding')
+	# a request whose body is a stream can not be sent twice
+	can_resend = req.data is None or isinstance(req.data, bytes)
+
+	while True:
+		h = pool.get(key)
+		reused = h is not None
+		if reused:
+			h.timeout = req.timeout
+			if req.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+				h.sock.settimeout(req.timeout)
+		else:
+			h = http_class(host, timeout=req.timeout, **kwargs)
+			h.set_debuglevel(ydl_handler._debuglevel)
+			h.response_class = _PooledHTTPResponse
+			if req._tunnel_host:
+				h.set_tunnel(req._tunnel_host, headers=tunnel_headers)
+		try:
+			try:
+				h.request(req.get_method(), req.selector, req.data, headers, **request_kwargs)
+			except socket.error as err:
+				raise compat_urllib_error.URLError(err)
+			r = h.getresponse()
+		except Exception as err:
+			h.close()
+			if reused and can_resend and isinstance(err, (
+					compat_urllib_error.URLError, socket.error, compat_http_client.HTTPException)):
+				# the server has dropped the idle connection in the meantime
+				continue
+			raise
+		break
+
+	if not r.will_close:
+		def release(reusable):
+			if reusable:
+				pool.put(key, h)
+			else:
+				h.close()
+		r._pool_release = release
+	r.url = req.get_full_url()
+	r.msg = r.reason
+	return r
+
+
 def handle_youtubedl_headers(headers):
 	filtered_headers = headers
 
@@ -968,9 +1118,13 @@ class YoutubeDLHandler(compat_urllib_request.HTTPHandler):
 
   Andrew Rowls, the author of that code, agreed to release it to the
   public domain.
+
+  Connections are kept alive and reused by later requests to the same host
+  if a HTTPConnectionPool is passed as connection_pool (Python 3 only).
   """
 
 	def __init__(self, params, *args, **kwargs):
+		self._connection_pool = kwargs.pop('connection_pool', None)
 		compat_urllib_request.HTTPHandler.__init__(self, *args, **kwargs)
 		self._params = params
 
@@ -982,9 +1136,10 @@ class YoutubeDLHandler(compat_urllib_request.HTTPHandler):
 			conn_class = make_socks_conn_class(conn_class, socks_proxy)
 			del req.headers['Ytdl-socks-proxy']
 
-		return self.do_open(functools.partial(
-			_create_http_connection, self, conn_class, False),
-			req)
+		http_class = functools.partial(_create_http_connection, self, conn_class, False)
+		if self._connection_pool is not None and sys.version_info >= (3, 0):
+			return _pooled_open(self, http_class, ('http', socks_proxy), req)
+		return self.do_open(http_class, req)
 
 	@staticmethod
 	def deflate(data):
@@ -1120,6 +1275,7 @@ def make_socks_conn_class(base_class, socks_proxy):
 
 class YoutubeDLHTTPSHandler(compat_urllib_request.HTTPSHandler):
 	def __init__(self, params, https_conn_class=None, *args, **kwargs):
+		self._connection_pool = kwargs.pop('connection_pool', None)
 		compat_urllib_request.HTTPSHandler.__init__(self, *args, **kwargs)
 		self._https_conn_class = https_conn_class or compat_http_client.HTTPSConnection
 		self._params = params
@@ -1138,9 +1294,10 @@ class YoutubeDLHTTPSHandler(compat_urllib_request.HTTPSHandler):
 			conn_class = make_socks_conn_class(conn_class, socks_proxy)
 			del req.headers['Ytdl-socks-proxy']
 
-		return self.do_open(functools.partial(
-			_create_http_connection, self, conn_class, True),
-			req, **kwargs)
+		http_class = functools.partial(_create_http_connection, self, conn_class, True)
+		if self._connection_pool is not None and sys.version_info >= (3, 0):
+			return _pooled_open(self, http_class, ('https', socks_proxy), req, **kwargs)
+		return self.do_open(http_class, req, **kwargs)
 
 
 class YoutubeDLCookieJar(compat_cookiejar.MozillaCookieJar):
@@ -1591,12 +1748,12 @@ else:
 
 class locked_file(object):
 	def __init__(self, filename, mode, encoding=None):
-		assert mode in ['r', 'a', 'w']
+		assert mode in ['r', 'rb', 'a', 'w']
 		self.f = io.open(filename, mode, encoding=encoding)
 		self.mode = mode
 
 	def __enter__(self):
-		exclusive = self.mode != 'r'
+		exclusive = self.mode not in ('r', 'rb')
 		try:
 			_lock_file(self.f, exclusive)
 		except IOError:
@@ -1619,6 +1776,143 @@ class locked_file(object):
 	def read(self, *args):
 		return self.f.read(*args)
 
+	def seek(self, *args):
+		return self.f.seek(*args)
+
+
+class DownloadArchive(object):
+	"""
+  The video IDs recorded in a download archive file, one per line.
+
+  The plain text file stays the authoritative format that IDs are appended
+  to. For lookups, its lines are indexed in an SQLite database next to it
+  (filename + '.sqlite') that all processes using the archive share. The
+  index remembers up to which offset the file has been indexed, so the file
+  is read once and afterwards only what has been appended to it since, no
+  matter by which process. Without SQLite, or if the index can not be
+  written, each process keeps the IDs in memory instead, read from the file
+  the same incremental way.
+  """
+
+	def __init__(self, filename):
+		self.filename = filename
+		self._lock = threading.Lock()
+		self._file_state = None  # (size, inode) of the file when last synchronized
+		self._ids = None
+		self._offset = 0
+		self._db = None
+		if sqlite3 is not None:
+			try:
+				self._db = sqlite3.connect(
+					filename + '.sqlite', timeout=60, isolation_level=None, check_same_thread=False)
+				self._db.execute('CREATE TABLE IF NOT EXISTS archive (id TEXT PRIMARY KEY)')
+				self._db.execute('CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value)')
+			except sqlite3.Error:
+				self._db = None
+		if self._db is None:
+			self._ids = set()
+
+	def _stat(self):
+		try:
+			st = os.stat(encodeFilename(self.filename))
+		except OSError as e:
+			if e.errno != errno.ENOENT:
+				raise
+			return 0, None
+		return st.st_size, st.st_ino
+
+	def _read_lines(self, offset):
+		""" Return the IDs of the complete lines after offset and the offset behind them """
+		try:
+			with locked_file(self.filename, 'rb') as f:
+				f.seek(offset)
+				data = f.read()
+		except IOError as ioe:
+			if ioe.errno != errno.ENOENT:
+				raise
+			return [], offset
+		# a line that is still being written is read next time
+		data = data[:data.rfind(b'\n') + 1]
+		ids = [line.strip() for line in data.decode('utf-8').splitlines()]
+		return [vid_id for vid_id in ids if vid_id], offset + len(data)
+
+	def _sync(self):
+		file_state = self._stat()
+		if file_state == self._file_state:
+			return
+		if self._db is None:
+			if file_state[1] != (self._file_state or (0, None))[1] or file_state[0] < self._offset:
+				# replaced or truncated
+				self._ids.clear()
+				self._offset = 0
+			ids, self._offset = self._read_lines(self._offset)
+			self._ids.update(ids)
+		else:
+			try:
+				self._sync_index(file_state)
+			except sqlite3.Error:
+				# e.g. the index is read-only
+				self._use_memory()
+				return self._sync()
+		self._file_state = file_state
+
+	def _sync_index(self, file_state):
+		# indexing is serialized across processes by the write lock of the database
+		self._db.execute('BEGIN IMMEDIATE')
+		try:
+			state = dict(self._db.execute('SELECT key, value FROM state'))
+			offset = state.get('offset', 0)
+			if state.get('inode') != file_state[1] or file_state[0] < offset:
+				self._db.execute('DELETE FROM archive')
+				offset = 0
+			ids, offset = self._read_lines(offset)
+			self._db.executemany(
+				'INSERT OR IGNORE INTO archive (id) VALUES (?)', [(vid_id,) for vid_id in ids])
+			self._db.executemany(
+				'INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)',
+				[('offset', offset), ('inode', file_state[1])])
+			self._db.execute('COMMIT')
+		except BaseException:
+			self._db.execute('ROLLBACK')
+			raise
+
+	def _use_memory(self):
+		""" Give up the index, the IDs are read from the file into memory from now on """
+		self._db.close()
+		self._db = None
+		self._ids = set()
+		self._offset = 0
+		self._file_state = None
+
+	def __contains__(self, vid_id):
+		with self._lock:
+			self._sync()
+			if self._db is None:
+				return vid_id in self._ids
+			return self._db.execute(
+				'SELECT 1 FROM archive WHERE id = ?', (vid_id,)).fetchone() is not None
+
+	def add(self, vid_id):
+		with self._lock:
+			with locked_file(self.filename, 'a', encoding='utf-8') as archive_file:
+				archive_file.write(vid_id + '\n')
+			# the line is indexed again by the next synchronization, which is harmless
+			if self._db is not None:
+				try:
+					self._db.execute('INSERT OR IGNORE INTO archive (id) VALUES (?)', (vid_id,))
+				except sqlite3.Error:
+					self._use_memory()
+			if self._db is None:
+				self._ids.add(vid_id)
+
+	def close(self):
+		if self._db is not None:
+			self._db.close()
+			self._db = None
+			self._ids = set()
+			self._file_state = None
+			self._offset = 0
+
 
 def get_filesystem_encoding():
 	encoding = sys.getfilesystemencoding()
@@ -2064,91 +2358,252 @@ def detect_exe_version(output, version_re=None, unrecognized='present'):
 		return unrecognized
 
 
+class CancelledError(YoutubeDLError):
+	"""Raised by the result of a WorkerPool task that was dropped."""
+	pass
+
+
+class WorkerPool(object):
+	"""
+  Runs functions in up to size daemon threads, which are started on demand.
+
+  submit() returns a task whose result() waits for the function to finish
+  and returns its result or raises its exception. shutdown() drops the tasks
+  that have not been started yet and waits for the running ones.
+  """
+
+	class Task(object):
+		def __init__(self, func, args, kwargs):
+			self._call = (func, args, kwargs)
+			self._done = threading.Event()
+			self._result = None
+			self._error = None
+
+		def run(self):
+			func, args, kwargs = self._call
+			try:
+				self._result = func(*args, **kwargs)
+			except BaseException as e:
+				self._error = e
+			finally:
+				self._call = None
+				self._done.set()
+
+		def cancel(self):
+			self._call = None
+			self._error = CancelledError()
+			self._done.set()
+
+		def done(self):
+			return self._done.is_set()
+
+		def result(self):
+			self._done.wait()
+			if self._error is not None:
+				raise self._error
+			return self._result
+
+	def __init__(self, size):
+		self.size = max(size, 1)
+		self._tasks = collections.deque()
+		self._cond = threading.Condition()
+		self._threads = []
+		self._idle = 0
+		self._closed = False
+
+	def submit(self, func, *args, **kwargs):
+		task = self.Task(func, args, kwargs)
+		with self._cond:
+			if self._closed:
+				raise CancelledError('WorkerPool has been shut down')
+			self._tasks.append(task)
+			if self._idle < len(self._tasks) and len(self._threads) < self.size:
+				thread = threading.Thread(target=self._work)
+				thread.daemon = True
+				thread.start()
+				self._threads.append(thread)
+			self._cond.notify()
+		return task
+
+	def _work(self):
+		while True:
+			with self._cond:
+				while not self._tasks and not self._closed:
+					self._idle += 1
+					self._cond.wait()
+					self._idle -= 1
+				if not self._tasks:
+					return
+				task = self._tasks.popleft()
+			task.run()
+
+	def shutdown(self, wait=True):
+		with self._cond:
+			self._closed = True
+			while self._tasks:
+				self._tasks.popleft().cancel()
+			self._cond.notify_all()
+		if wait:
+			for thread in self._threads:
+				if thread is not threading.current_thread():
+					thread.join()
+
+
 class PagedList(object):
+	# Number of pages to fetch ahead in background threads while the
+	# current page is consumed. Set by the extractor or by YoutubeDL.
+	prefetch = 0
+	_prefetch_pool = None
+
 	def __len__(self):
 		# This is only useful for tests
 		return len(self.getslice())
 
+	def iterslice(self, start=0, end=None):
+		"""
+    Iterate over the same entries as getslice(start, end), but only fetch
+    the next page when the previous one has been consumed.
+    """
+		while end is None or start < end:
+			stop = start - start % self._pagesize + self._pagesize
+			if end is not None:
+				stop = min(stop, end)
+			page = self.getslice(start, stop)
+			for entry in page:
+				yield entry
+			if len(page) < stop - start:
+				break
+			start = stop
+
+	def _is_cached(self, pagenum):
+		return False
+
+	def _get_page(self, pagenum, lastpage=None):
+		"""
+    Return the entries of page pagenum. With prefetch, the following pages
+    up to lastpage are fetched in the background meanwhile. While lastpage
+    is unknown, this may request up to prefetch pages past the actual last
+    page, which are cancelled or waited for by _stop_prefetch().
+    """
+		if self.prefetch <= 0:
+			return list(self._pagefunc(pagenum))
+		if self._prefetch_pool is None:
+			self._prefetch_pool = WorkerPool(self.prefetch)
+			self._prefetched = {}
+		upto = pagenum + self.prefetch
+		if lastpage is not None:
+			upto = min(upto, lastpage)
+		for nextpage in range(pagenum + 1, upto + 1):
+			if nextpage not in self._prefetched and not self._is_cached(nextpage):
+				self._prefetched[nextpage] = self._prefetch_pool.submit(
+					lambda n: list(self._pagefunc(n)), nextpage)
+		task = self._prefetched.pop(pagenum, None)
+		if task is None:
+			return list(self._pagefunc(pagenum))
+		return task.result()
+
+	def _stop_prefetch(self):
+		# drop the pages that were queued but are not needed for the slice, and wait
+		# for the running requests, so none of them outlives the slice
+		if self._prefetch_pool is not None:
+			self._prefetch_pool.shutdown(wait=True)
+			self._prefetch_pool = None
+			self._prefetched = None
+
 
 class OnDemandPagedList(PagedList):
-	def __init__(self, pagefunc, pagesize, use_cache=True):
+	def __init__(self, pagefunc, pagesize, use_cache=True, prefetch=0, cache_size=100):
 		self._pagefunc = pagefunc
 		self._pagesize = pagesize
 		self._use_cache = use_cache
+		self.prefetch = prefetch
+		# the number of pages is only known after a page was not full
+		self._lastpage = None
 		if use_cache:
-			self._cache = {}
+			self._cache = collections.OrderedDict()
+			self._cache_size = cache_size
 
 	def getslice(self, start=0, end=None):
-		res = []
-		for pagenum in itertools.count(start // self._pagesize):
-			firstid = pagenum * self._pagesize
-			nextfirstid = pagenum * self._pagesize + self._pagesize
-			if start >= nextfirstid:
-				continue
+		return list(self._iterslice(start, end, self._use_cache))
 
-			page_results = None
-			if self._use_cache:
-				page_results = self._cache.get(pagenum)
-			if page_results is None:
-				page_results = list(self._pagefunc(pagenum))
-			if self._use_cache:
-				self._cache[pagenum] = page_results
-
-			startv = (
-				start % self._pagesize
-				if firstid <= start < nextfirstid
-				else 0)
-
-			endv = (
-				((end - 1) % self._pagesize) + 1
-				if (end is not None and firstid <= end <= nextfirstid)
-				else None)
-
-			if startv != 0 or endv is not None:
-				page_results = page_results[startv:endv]
-			res.extend(page_results)
-
-			# A little optimization - if current page is not "full", ie. does
-			# not contain page_size videos then we can assume that this page
-			# is the last one - there are no more ids on further pages -
-			# i.e. no need to query again.
-			if len(page_results) + startv < self._pagesize:
-				break
+	def iterslice(self, start=0, end=None):
+		# the pages are only needed once here, so they are not added to the cache
+		return self._iterslice(start, end, False)
 
-			# If we got the whole page, but the next page is not interesting,
-			# break out early as well
-			if end == nextfirstid:
-				break
-		return res
+	def _is_cached(self, pagenum):
+		return self._use_cache and pagenum in self._cache
+
+	def _iterslice(self, start, end, keep):
+		lastpage = self._lastpage
+		if end is not None:
+			endpage = max(end - 1, start) // self._pagesize
+			lastpage = endpage if lastpage is None else min(lastpage, endpage)
+		try:
+			for pagenum in itertools.count(start // self._pagesize):
+				firstid = pagenum * self._pagesize
+				if end is not None and firstid >= end:
+					break
+
+				page_results = None
+				if self._use_cache:
+					page_results = self._cache.pop(pagenum, None)
+				cached = page_results is not None
+				if not cached:
+					page_results = self._get_page(pagenum, lastpage)
+				if self._use_cache and (keep or cached):
+					# least recently used pages first
+					self._cache[pagenum] = page_results
+					while len(self._cache) > self._cache_size:
+						self._cache.popitem(last=False)
+
+				for entry in page_results[max(start - firstid, 0):None if end is None else end - firstid]:
+					yield entry
+
+				# A little optimization - if current page is not "full", ie. does
+				# not contain page_size videos then we can assume that this page
+				# is the last one - there are no more ids on further pages -
+				# i.e. no need to query again.
+				if len(page_results) < self._pagesize:
+					self._lastpage = pagenum
+					break
+		finally:
+			self._stop_prefetch()
 
 
 class InAdvancePagedList(PagedList):
-	def __init__(self, pagefunc, pagecount, pagesize):
+	def __init__(self, pagefunc, pagecount, pagesize, prefetch=0):
 		self._pagefunc = pagefunc
 		self._pagecount = pagecount
 		self._pagesize = pagesize
+		self.prefetch = prefetch
 
 	def getslice(self, start=0, end=None):
-		res = []
+		return list(self.iterslice(start, end))
+
+	def iterslice(self, start=0, end=None):
 		start_page = start // self._pagesize
 		end_page = (
-			self._pagecount if end is None else (end // self._pagesize + 1))
+			self._pagecount if end is None else min(end // self._pagesize + 1, self._pagecount))
 		skip_elems = start - start_page * self._pagesize
 		only_more = None if end is None else end - start
-		for pagenum in range(start_page, end_page):
-			page = list(self._pagefunc(pagenum))
-			if skip_elems:
-				page = page[skip_elems:]
-				skip_elems = None
-			if only_more is not None:
-				if len(page) < only_more:
-					only_more -= len(page)
-				else:
-					page = page[:only_more]
-					res.extend(page)
-					break
-			res.extend(page)
-		return res
+		lastpage = end_page - 1 if end is None else min(end_page - 1, max(end - 1, start) // self._pagesize)
+		try:
+			for pagenum in range(start_page, end_page):
+				page = self._get_page(pagenum, lastpage)
+				if skip_elems:
+					page = page[skip_elems:]
+					skip_elems = None
+				if only_more is not None:
+					if len(page) < only_more:
+						only_more -= len(page)
+					else:
+						for entry in page[:only_more]:
+							yield entry
+						break
+				for entry in page:
+					yield entry
+		finally:
+			self._stop_prefetch()
 
 
 def uppercase_escape(s):
@@ -1,7 +1,62 @@
-import os, re
+import os, re, sys
+import base64, hashlib, json, subprocess, zlib
 
 from core.pluginbase import *
+
+YOUTUBE_DL_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_dl")
+LAZY_EXTRACTORS = os.path.join(YOUTUBE_DL_ROOT, "youtube_dl", "extractor", "lazy_extractors.py")
+
+
+def lazy_extractors_fingerprint():
+	""" fingerprint of everything lazy_extractors.py is generated from (size and mtime of each source file) """
+	extractor_dir = os.path.dirname(LAZY_EXTRACTORS)
+	sources = [os.path.join(extractor_dir, f) for f in sorted(os.listdir(extractor_dir))
+						 if f.endswith(".py") and f != os.path.basename(LAZY_EXTRACTORS)]
+	sources += [os.path.join(YOUTUBE_DL_ROOT, "devscripts", f)
+							for f in ("lazy_load_template.py", "make_lazy_extractors.py")]
+	md5 = hashlib.md5()
+	for source in sources:
+		st = os.stat(source)
+		md5.update(("%s:%d:%d\n" % (os.path.basename(source), st.st_size, st.st_mtime)).encode("utf-8"))
+	return md5.hexdigest()
+
+
+def update_lazy_extractors():
+	"""
+	make youtube_dl import only the extractor modules that are actually used, by (re)generating
+	its lazy_extractors.py whenever it is missing or the extractor sources have changed since
+	this has to happen before youtube_dl is imported (also by forked worker processes, which inherit it),
+	the generator runs in a separate interpreter, so this process never imports all extractors
+	"""
+	header = "# fingerprint: %s\n" % lazy_extractors_fingerprint()
+	try:
+		with open(LAZY_EXTRACTORS, encoding="utf-8") as f:
+			if f.readline() == header:
+				return
+		# a stale index must not be used by the generator itself
+		os.remove(LAZY_EXTRACTORS)
+	except OSError:
+		pass
+	if getattr(sys, "frozen", False):
+		return  # no interpreter to run the generator with
+	tmp_filename = LAZY_EXTRACTORS + ".tmp"
+	try:
+		subprocess.check_call([sys.executable, os.path.join("devscripts", "make_lazy_extractors.py"), tmp_filename],
+													cwd=YOUTUBE_DL_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+		with open(tmp_filename, encoding="utf-8") as f:
+			source = f.read()
+		with open(tmp_filename, "w", encoding="utf-8") as f:
+			f.write(header + source)
+		os.replace(tmp_filename, LAZY_EXTRACTORS)
+	except (OSError, subprocess.CalledProcessError) as e:
+		print("Could not generate %s (%s), all extractors will be loaded" % (LAZY_EXTRACTORS, e))
+
+
+update_lazy_extractors()
+
 from .youtube_dl.youtube_dl import *
+from .youtube_dl.youtube_dl.compat import compat_urllib_error
+from .youtube_dl.youtube_dl.utils import DownloadError
 from xml.etree.ElementTree import Element, tostring
 
 
@@ -11,15 +66,34 @@ class YoutubeDLPlugin(Plugin):
 
 	def __init__(self, process=None):
 		Plugin.__init__(self, process)
+		self._ydl = None  # warm YoutubeDL object, kept for the lifetime of the process
+		self._ydl_params = None  # params of self._ydl right after initialization
 
-	def extract(self, url):
-		ydl = YoutubeDL(dict(password=None, username=None, skip_download=True, verbose=False))
+	def _engine(self, **params):
+		"""
+		return the YoutubeDL object of this process, reset to its initial state plus params
+		extractor instances (with their caches, e.g. the signature functions), the url opener and the
+		cookie jar survive between tasks, so only the first task has to pay for their initialization
+		"""
+		if self._ydl is None:
+			self._ydl = YoutubeDL(dict(password=None, username=None, verbose=False))
+			self._ydl_params = dict(self._ydl.params)
+		ydl = self._ydl
+		ydl.params = dict(self._ydl_params, **params)
+		ydl._progress_hooks = list(params.get("progress_hooks", []))
+		ydl._download_retcode = 0
+		ydl._num_downloads = 0
+		return ydl
+
+	def extract(self, task_id, url):
+		ydl = self._engine(skip_download=True)
 		info = ydl.extract_info(url, download=False)
 		item = Element('item', url=url, status="Available",
 									 title=info.get('title', ''),
 									 host=info.get('extractor', ''),
 									 description=info.get('description', ''),
-									 thumbnail=info.get('thumbnail', ''))
+									 thumbnail=info.get('thumbnail', ''),
+									 info=serialize_info(ydl.filter_requested_info(info)))
 		formats = {}  # <format>	Elements	by	extension
 		for f in info.get('formats', []):
 			extension = f.get('ext')
@@ -32,25 +106,52 @@ class YoutubeDLPlugin(Plugin):
 				item.append(formats[extension])
 			formats[extension].append(optn)
 		xml = tostring(item, encoding="unicode")
-		self.send_result(task_id=url, result_object=xml, is_ready=True)
+		self.send_result(task_id=task_id, result_object=xml, is_ready=True)
 
-	def download(self, url, path, filename, download_url, player_url, plugin_specific):
+	def download(self, task_id, url, path, filename, download_url, player_url, plugin_specific, info=None):
 
 		def __hook(d):
-			self.send_result(url, d)
+			self.send_result(task_id, d)
 
 		destination = os.path.join(path, filename)
-		ydl = YoutubeDL(dict(password=None, username=None, format=plugin_specific, progress_hooks=[__hook],
-												 nopart=True, noprogress=True, ratelimit=None, retries=10, updatetime=False,
-												 subtitleslang=None, subtitlesformat="srt", onlysubtitles=False, allsubtitles=False,
-												 skip_download=False, verbose=False, outtmpl=destination))
+		ydl = self._engine(format=plugin_specific, progress_hooks=[__hook],
+											 nopart=True, noprogress=True, ratelimit=None, retries=10, updatetime=False,
+											 subtitleslang=None, subtitlesformat="srt", onlysubtitles=False, allsubtitles=False,
+											 skip_download=False, outtmpl=destination, concurrent_fragment_downloads=4,
+											 bandwidth_limiter=getattr(self._process, "bandwidth_limiter", None))
+		if info is not None:
+			try:
+				# start right from the formats that were resolved by extract()
+				ydl.process_ie_result(deserialize_info(info), download=True)
+				return
+			except DownloadError as e:
+				if not has_expired(e):
+					raise
 		ydl.download([url])
 
 
+def serialize_info(info):
+	""" compact (compressed) string representation of an info dict, suitable for an xml attribute """
+	data = json.dumps(info, separators=(',', ':')).encode("utf-8")
+	return base64.b64encode(zlib.compress(data)).decode("ascii")
+
+
+def deserialize_info(info):
+	""" counterpart of serialize_info() """
+	return json.loads(zlib.decompress(base64.b64decode(info)).decode("utf-8"))
+
+
+def has_expired(download_error):
+	""" whether a DownloadError was caused by a media url that isn't valid anymore, so extraction is needed again """
+	exc_info = getattr(download_error, "exc_info", None)
+	error = exc_info[1] if exc_info else None
+	return isinstance(error, compat_urllib_error.HTTPError) and error.code in (403, 410)
+
+
 def test():
 	#	try:	from	plugins.youtubedlplugin	import	test;test()
 	def dummy(*args, **kwargs):
 		print(args, kwargs)
 
 	YoutubeDLPlugin.send_result = dummy
-	YoutubeDLPlugin().extract("https://www.youtube.com/watch?v=IsBOoY2zvC0")
+	YoutubeDLPlugin().extract("test", "https://www.youtube.com/watch?v=IsBOoY2zvC0")
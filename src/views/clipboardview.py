@@ -5,52 +5,45 @@ __author__ = "C. Wilhelm"
 ___license___ = "GPL v3"
 
 
-class ComboBoxDelegate(QStyledItemDelegate):
-	def __init__(self, clipboard_view, clipboard_model):
-		QStyledItemDelegate.__init__(self, clipboard_view)
-		self._model = clipboard_model
-
+class ComboBoxDelegate(StyledCellDelegate):
 	def createEditor(self, parent_widget, option, index):
 		num_col = index.column()
 		element = index.internalPointer()
+		combo = QComboBox(parent_widget)
 		if num_col == 8:
-			combo = self._model.combo_boxes_format[element]
-			combo.currentIndexChanged.connect(lambda y: self._format_changed(element))
+			combo.addItems([format.extension for format in element.formats])
 		elif num_col == 9:
-			combo = self._model.combo_boxes_quality[element]
-			combo.currentIndexChanged.connect(lambda y: self._quality_changed(element))
+			combo.addItems([option.quality for option in element.format(element.get("selected")).options])
 		else:
 			raise Exception("Only Columns 8, 9 are handled by ComboBoxDelegate")
-		combo.setMaximumHeight(self.sizeHint(option, index).height())  # workaround for (qt?) bug when editing labels
-		combo.setParent(parent_widget)
+		# the choice is written to the model at once, the editor is closed again afterwards
+		combo.activated.connect(lambda y: self._commit(combo))
+		QTimer.singleShot(0, combo.showPopup)
 		return combo
 
-	def _format_changed(self, element):
-		format_combobox = self._model.combo_boxes_format[element]
-		quality_combobox = self._model.combo_boxes_quality[element]
-		selected_extension = format_combobox.currentText()
-		selected_quality = self._model.getSelectedQuality(element, selected_extension)
-		element.set("selected", selected_extension)
-		# override combobox-items with the quality options avaiable currently selected extension
-		quality_combobox.clear()
-		for option in element.findall("format[@extension='" + selected_extension + "']/option"):
-			quality_combobox.addItem(option.get("quality"))
-		quality_combobox.setCurrentIndex(quality_combobox.findText(selected_quality))
+	def _commit(self, combo):
+		self.commitData.emit(combo)
+		self.closeEditor.emit(combo, QAbstractItemDelegate.NoHint)
+
+	def setEditorData(self, combo, index):
+		combo.setCurrentIndex(combo.findText(index.data()))
 
-	def _quality_changed(self, element):
-		quality_combobox = self._model.combo_boxes_quality[element]
-		selected_extension = element.get("selected", element.find("format").attrib["extension"])
-		selected_format = element.find("format[@extension='%s']" % selected_extension)
-		selected_quality = quality_combobox.currentText()
-		selected_format.attrib["selected"] = selected_quality
+	def setModelData(self, combo, model, index):
+		model.setData(index, combo.currentText(), Qt.EditRole)
 
 	def paint(self, painter, option, index):
-		# QItemDelegate.paint() takes care of the background color
-		QStyledItemDelegate.paint(self, painter, option, index)
 		element = index.internalPointer()
-		if element.tag == 'item':
-			# force the item into "edit" mode, so the combobox is shown
-			self.parent().openPersistentEditor(index)
+		if element.tag != 'item':
+			QStyledItemDelegate.paint(self, painter, option, index)
+			return
+		self.paintBackground(painter, option, index)
+		combo = QStyleOptionComboBox()
+		combo.rect = option.rect
+		combo.state = option.state | QStyle.State_Enabled
+		combo.currentText = index.data() or ""
+		style = self.style(option)
+		style.drawComplexControl(QStyle.CC_ComboBox, combo, painter, option.widget)
+		style.drawControl(QStyle.CE_ComboBoxLabel, combo, painter, option.widget)
 
 
 class ClipBoardView(QueueTreeView):
@@ -59,8 +52,10 @@ class ClipBoardView(QueueTreeView):
 
 	def __init__(self, main_window, settings, download_view):
 		QueueTreeView.__init__(self, main_window, settings, ClipBoardModel(main_window, settings))
-		self.setItemDelegateForColumn(8, ComboBoxDelegate(self, self.model()))
-		self.setItemDelegateForColumn(9, ComboBoxDelegate(self, self.model()))
+		self.setItemDelegateForColumn(8, ComboBoxDelegate(self))
+		self.setItemDelegateForColumn(9, ComboBoxDelegate(self))
+		self.setEditTriggers(QAbstractItemView.SelectedClicked | QAbstractItemView.DoubleClicked |
+												 QAbstractItemView.EditKeyPressed)
 		self.download_view = download_view
 
 		self.downloadSelectedAction = QAction('Download Selected', self, triggered=self.downloadSelected)
@@ -83,8 +78,8 @@ class ClipBoardView(QueueTreeView):
 
 	def downloadAll(self):
 		for element in list(self.model()._root):
-			if element.attrib.get("status") == "Available":
-				element.attrib["status"] = "Queued"
+			if element.get("status") == "Available":
+				element.set("status", "Queued")
 			self.download_view.addClipboardElement(element)
 		self.removeAll()
 
@@ -93,8 +88,8 @@ class ClipBoardView(QueueTreeView):
 		elements = [index.internalPointer() for index in self.selectionModel().selectedRows()]
 		self.removeSelected()  # this will detach otherwise problematic parent->child relationships
 		for element in elements:  # the element objects were not garbage-collected, as they're still in that list
-			if element.attrib.get("status") == "Available":
-				element.attrib["status"] = "Queued"
+			if element.get("status") == "Available":
+				element.set("status", "Queued")
 			self.download_view.addClipboardElement(element)
 
 	def addURL(self, url):
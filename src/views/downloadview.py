@@ -6,23 +6,22 @@ __author__ = "C. Wilhelm"
 ___license___ = "GPL v3"
 
 
-class ProgressBarDelegate(QStyledItemDelegate):
-	def __init__(self, parent_widget, model):
-		QStyledItemDelegate.__init__(self, parent_widget)
-		self._model = model
-
-	def createEditor(self, parent_widget, option, index):
-		element = index.internalPointer()
-		progressbar = self._model.progress_bars[element]
-		progressbar.setMaximumHeight(self.sizeHint(option, index).height())
-		progressbar.setParent(parent_widget)
-		return progressbar
-
+class ProgressBarDelegate(StyledCellDelegate):
 	def paint(self, painter, option, index):
-		QStyledItemDelegate.paint(self, painter, option, index)  # takes care of background color
 		element = index.internalPointer()
-		if element.tag == 'item':
-			self.parent().openPersistentEditor(index)  # forces the item into "edit" mode
+		if element.tag != 'item':
+			QStyledItemDelegate.paint(self, painter, option, index)
+			return
+		self.paintBackground(painter, option, index)
+		progressbar = QStyleOptionProgressBar()
+		progressbar.rect = option.rect
+		progressbar.state = option.state | QStyle.State_Enabled
+		progressbar.minimum = 0
+		progressbar.maximum = 100
+		progressbar.progress = int(index.data() or 0)
+		progressbar.text = "%d%%" % progressbar.progress
+		progressbar.textVisible = True
+		self.style(option).drawControl(QStyle.CE_ProgressBar, progressbar, painter, option.widget)
 
 
 class DownloadView(QueueTreeView):
@@ -31,7 +30,7 @@ class DownloadView(QueueTreeView):
 
 	def __init__(self, main_window, settings):
 		QueueTreeView.__init__(self, main_window, settings, DownloadModel(main_window, settings))
-		self.setItemDelegateForColumn(10, ProgressBarDelegate(self, self.model()))
+		self.setItemDelegateForColumn(10, ProgressBarDelegate(self))
 
 		self.openFolderAction = QAction('Open Folder', self, triggered=self.openFolder)
 		self.pauseSelectedAction = QAction('Pause Selected', self, triggered=self.pauseSelected)
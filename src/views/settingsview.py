@@ -97,8 +97,11 @@ class SettingsDialog(QDialog):
 		self.folderChooserLabel = self.mapper.map(self.folderChooser, "DefaultDownloadFolder")
 		self.filenameChooser = QLineEdit()
 		self.filenameChooserLabel = self.mapper.map(self.filenameChooser, "DefaultFileName")
+		self.hostLimitsChooser = QLineEdit()
+		self.hostLimitsChooserLabel = self.mapper.map(self.hostLimitsChooser, "HostSpeedLimits")
 		layout.addRow(self.folderChooserLabel, self.folderChooser)
 		layout.addRow(self.filenameChooserLabel, self.filenameChooser)
+		layout.addRow(self.hostLimitsChooserLabel, self.hostLimitsChooser)
 		# group.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
 		self.folderChooserLabel.setToolTip("Select a folder where downloaded files may land by default.\n"
 																			 "You can set different folders on a per-item basis\n"
@@ -108,6 +111,9 @@ class SettingsDialog(QDialog):
 																				 "%EXTENSION% → transform to uppercase (MP4)\n"
 																				 "%exTenSiOn% or something like that → no transformation\n\n"
 																				 "Available Keywords: title, url, host, extension, quality")
+		self.hostLimitsChooserLabel.setToolTip("Limit the Download Speed of single Hosts in kb/s, e.g.\n"
+																					 '{"example.com": 500, "videos.example.org": 100}\n'
+																					 "A Host's Subdomains share its Limit.")
 		pair = QWidget()
 		pairlayout = QHBoxLayout()
 		pair.setLayout(pairlayout)
@@ -156,8 +162,22 @@ class SettingsDialog(QDialog):
 		self.mapper.toFirst()
 		self.exec_()
 
+	def checkHostLimits(self):
+		try:
+			limits = json.loads(self.hostLimitsChooser.text() or "{}")
+			if not isinstance(limits, dict):
+				raise ValueError
+			for limit in limits.values():
+				float(limit)
+		except (TypeError, ValueError):
+			msg = QMessageBox(self)
+			msg.setText('Speed Limits per Host must be written like\n{"example.com": 500}. Please try again!')
+			msg.exec_()
+			return False
+		return True
+
 	def submit(self):
-		if self.folderChooser.checkPermissions(self.folderChooser.text()):
+		if self.folderChooser.checkPermissions(self.folderChooser.text()) and self.checkHostLimits():
 			self.mapper.submit()
 			extension_options = self.extensionOrderWidget.optionsList()
 			quality_options = self.qualityOrderWidget.optionsList()
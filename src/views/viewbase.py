@@ -54,6 +54,23 @@ class IntuitiveTreeView(QTreeView):
 		self.setStretchLastSection(False)
 
 
+class StyledCellDelegate(QStyledItemDelegate):
+	"""
+	base for delegates that paint a control into each item cell with QStyle primitives instead of showing a widget,
+	so the number of widgets does not grow with the number of rows; editors only exist while a cell is edited
+	"""
+
+	def style(self, option):
+		return option.widget.style() if option.widget is not None else QApplication.style()
+
+	def paintBackground(self, painter, option, index):
+		""" takes care of background and selection color, without the text of the cell """
+		background = QStyleOptionViewItem(option)
+		self.initStyleOption(background, index)
+		background.text = ""
+		self.style(option).drawControl(QStyle.CE_ItemViewItem, background, painter, option.widget)
+
+
 class QueueTreeView(IntuitiveTreeView):
 	_ignored_columns = []  # columns that would break the table layout, e.g. multiline descriptions, thumbnails
 	_visible_columns = []  # columns that weren't deselected by the user or by default NOTE: order is relevant!